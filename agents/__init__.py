@@ -1,11 +1,36 @@
-from .cv_parser_agent import CVParserAgent
-from .jd_matcher_agent import JDMatcherAgent
-from .feedback_agent import FeedbackAgent
-from .summary_agent import SummaryAgent
+"""Agent package.
+
+Agents are imported lazily on first attribute access so that importing
+``agents`` (e.g. in a worker process that only parses PDFs) does not pull
+in the embedding / LLM client libraries of the other agents.
+"""
+import importlib
+
+_AGENT_MODULES = {
+    "CVParserAgent": ".cv_parser_agent",
+    "JDMatcherAgent": ".jd_matcher_agent",
+    "FeedbackAgent": ".feedback_agent",
+    "SummaryAgent": ".summary_agent",
+    "ATSScorer": ".ats_scorer",
+}
 
 __all__ = [
     "CVParserAgent",
     "JDMatcherAgent",
     "FeedbackAgent",
-    "SummaryAgent"
+    "SummaryAgent",
+    "ATSScorer"
 ]
+
+
+def __getattr__(name):
+    module_name = _AGENT_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
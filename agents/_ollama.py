@@ -0,0 +1,111 @@
+"""Factories for the Ollama client objects used by the agents.
+
+langchain_ollama is imported inside the factories so that importing an agent
+module stays cheap; the client library is only loaded when an agent is built.
+With CV_OLLAMA_ENDPOINTS set, the factories return clients that spread
+requests over the endpoint pool (endpoint_pool.py) instead of OLLAMA_HOST.
+"""
+import os
+import time
+
+from . import metrics
+from .scheduler import get_scheduler
+
+_NS = 1e9
+
+
+def _keep_alive(value: str) -> int:
+    """Seconds from "1800", "30m", "2h" or "45s"; negative keeps the model loaded indefinitely"""
+    value = value.strip().lower()
+    unit = {"s": 1, "m": 60, "h": 3600}.get(value[-1:])
+    return int(float(value[:-1]) * unit) if unit else int(value)
+
+
+# Sent with every request (and each warm-up, see warmup.py) so models stay loaded between analyses
+KEEP_ALIVE = _keep_alive(os.environ.get("CV_OLLAMA_KEEP_ALIVE", "30m"))
+
+
+def make_llm(model_name: str, num_predict: int = None):
+    """Create a text-generation client for model_name, optionally capped at num_predict generated tokens"""
+    from .endpoint_pool import PooledLLM, get_pool
+
+    pool = get_pool()
+    if pool is not None:
+        return PooledLLM(pool, model_name, num_predict=num_predict, keep_alive=KEEP_ALIVE)
+    from langchain_ollama import OllamaLLM
+
+    return OllamaLLM(model=model_name, num_predict=num_predict, keep_alive=KEEP_ALIVE)
+
+
+def make_embeddings(model_name: str):
+    """Create an embeddings client for model_name"""
+    from .endpoint_pool import PooledEmbeddings, get_pool
+
+    pool = get_pool()
+    if pool is not None:
+        return PooledEmbeddings(pool, model_name, keep_alive=KEEP_ALIVE)
+    from langchain_ollama import OllamaEmbeddings
+
+    return OllamaEmbeddings(model=model_name, keep_alive=KEEP_ALIVE)
+
+
+def is_model_missing(error: Exception) -> bool:
+    """Whether a call failed because its model is not pulled on the Ollama server (or no pooled endpoint serves it)"""
+    from .endpoint_pool import ModelUnavailable
+
+    if isinstance(error, ModelUnavailable) or getattr(error, "status_code", None) == 404:
+        return True
+    # ollama.ResponseError: 'model "llama3.2:1b" not found, try pulling it first'
+    message = str(error).lower()
+    return "model" in message and "not found" in message
+
+
+def generate_text(llm, prompt: str, operation: str = "generate") -> str:
+    """Run prompt through llm and record prefill / generation timings.
+
+    Ollama reports prompt evaluation (prefill) and token generation durations
+    in the final response, which langchain exposes as generation_info.
+    The call waits for an "llm" scheduler slot first (see scheduler.py).
+    """
+    start = time.perf_counter()
+    try:
+        with get_scheduler("llm").slot():
+            result = llm.generate([prompt])
+    except Exception:
+        metrics.incr("llm_errors", operation=operation)
+        raise
+    finally:
+        metrics.observe("llm_total", time.perf_counter() - start, operation=operation)
+
+    generation = result.generations[0][0]
+    info = generation.generation_info or {}
+    if info.get("prompt_eval_duration") is not None:
+        metrics.observe("llm_prefill", info["prompt_eval_duration"] / _NS, operation=operation)
+    if info.get("eval_duration") is not None:
+        metrics.observe("llm_generation", info["eval_duration"] / _NS, operation=operation)
+    if info.get("load_duration") is not None:
+        metrics.observe("llm_model_load", info["load_duration"] / _NS, operation=operation)
+    if info.get("eval_count"):
+        metrics.incr("llm_generated_tokens", info["eval_count"], operation=operation)
+    return generation.text
+
+
+def stream_text(llm, prompt: str, operation: str = "generate"):
+    """Yield generated text chunks for prompt, recording time to first token and total time"""
+    start = time.perf_counter()
+    first_token = True
+    scheduler = get_scheduler("llm")
+    ticket = scheduler.acquire()
+    try:
+        for chunk in llm.stream(prompt):
+            if first_token:
+                # With streaming, time to first token approximates prefill
+                metrics.observe("llm_first_token", time.perf_counter() - start, operation=operation)
+                first_token = False
+            yield chunk
+    except Exception:
+        metrics.incr("llm_errors", operation=operation)
+        raise
+    finally:
+        scheduler.release(ticket)
+        metrics.observe("llm_total", time.perf_counter() - start, operation=operation)
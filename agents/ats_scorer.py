@@ -0,0 +1,358 @@
+"""Deterministic, keyword-based ATS scoring.
+
+Applicant tracking systems mostly check whether the terms of a job
+description appear in a CV. The scorer does the same without an LLM:
+
+1. Keywords are extracted from the job description once (and cached): skills
+   from a taxonomy with their aliases (e.g. "k8s" for Kubernetes), plus the
+   most salient other words and two-word phrases. Each keyword is weighted by
+   whether it sits in a required or a preferred part of the description.
+2. The CV sections are tokenized into an inverted index (term -> positions),
+   so each keyword, including multi-word phrases, is a few dictionary lookups.
+3. The score combines the weighted keyword match rate with checks for the
+   section headings and contact details ATS parsers look for.
+
+Scoring a CV takes well under a millisecond once its index exists, so whole
+batches can be scored before any embedding or LLM call is made.
+"""
+import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from . import metrics
+
+# Canonical skill -> alternative spellings; matching is on tokens, so "CI/CD" also matches "ci cd"
+SKILL_TAXONOMY = {
+    'Python': (), 'Java': (), 'JavaScript': ('js',), 'TypeScript': (), 'C++': ('cpp',), 'C#': ('csharp',),
+    'Go': ('golang',), 'Rust': (), 'Scala': (), 'Kotlin': (), 'Swift': (), 'PHP': (), 'Ruby': (), 'R': (),
+    'SQL': (), 'PostgreSQL': ('postgres',), 'MySQL': (), 'MongoDB': ('mongo',), 'Redis': (),
+    'Elasticsearch': ('elastic search',), 'Kafka': ('apache kafka',), 'Spark': ('apache spark', 'pyspark'),
+    'Airflow': ('apache airflow',), 'Snowflake': (), 'Hadoop': (),
+    'React': ('react.js', 'reactjs'), 'Angular': ('angularjs',), 'Vue': ('vue.js', 'vuejs'),
+    'Node.js': ('node', 'nodejs'), 'Django': (), 'Flask': (), 'FastAPI': (), 'Spring': ('spring boot',),
+    'AWS': ('amazon web services',), 'Azure': ('microsoft azure',), 'GCP': ('google cloud', 'google cloud platform'),
+    'Docker': (), 'Kubernetes': ('k8s',), 'Terraform': (), 'Ansible': (), 'Linux': (), 'Git': (),
+    'Jenkins': (), 'GitHub Actions': (), 'CI/CD': ('cicd', 'continuous integration', 'continuous delivery'),
+    'Machine Learning': ('ml',), 'Deep Learning': (), 'Data Science': (), 'AI': ('artificial intelligence',),
+    'NLP': ('natural language processing',), 'Computer Vision': (), 'LLM': ('llms', 'large language models'),
+    'TensorFlow': (), 'PyTorch': (), 'Scikit-learn': ('sklearn',), 'Pandas': (), 'NumPy': (),
+    'Tableau': (), 'Power BI': ('powerbi',), 'Excel': (),
+    'Agile': (), 'Scrum': (), 'Kanban': (), 'DevOps': (), 'REST': ('restful', 'rest api', 'rest apis'),
+    'GraphQL': (), 'Microservices': ('microservice',),
+}
+
+# Weight of a keyword by where it appears in the job description
+IMPORTANCE_WEIGHTS = {"required": 3.0, "general": 2.0, "preferred": 1.0}
+SKILL_WEIGHT = 1.5
+# Share of the score that comes from keywords; the rest comes from the section checks
+KEYWORD_SHARE = 0.8
+DEFAULT_MAX_PHRASES = 20
+
+_TOKEN_RE = re.compile(r"[^\W_][\w+#]*(?:\.[\w+#]+)*")
+_SEGMENT_RE = re.compile(r"\n+|(?<=[.;!?])\s+")
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n")
+_PREFERRED_RE = re.compile(
+    r"\b(?:preferred|nice[\s-]to[\s-]have|bonus|a plus|desirable|ideally|advantageous|an advantage|optional)\b", re.I)
+_REQUIRED_RE = re.compile(
+    r"\b(?:required|requirements?|must|essential|mandatory|minimum|qualifications|you have|you will have)\b", re.I)
+_SECTION_HEADINGS = {
+    "summary": re.compile(r"\b(?:summary|profile|objective|about me)\b", re.I),
+    "experience": re.compile(r"\b(?:experience|employment|work history)\b", re.I),
+    "education": re.compile(r"\b(?:education|academic|qualifications)\b", re.I),
+    "skills": re.compile(r"\b(?:skills|competencies|technologies|expertise)\b", re.I),
+}
+# Job description sections that end a requirements or nice-to-have list, even without a colon
+_OTHER_SECTION_RE = re.compile(
+    r"^(?:about (?:us|the (?:company|team|role))|who we are|what we offer|we offer|benefits|perks|compensation|"
+    r"salary|responsibilities|what you(?:'ll| will) do|how to apply|equal (?:employment )?opportunit(?:y|ies)|eeo)\b",
+    re.I)
+
+
+def _stem(token: str) -> str:
+    """Fold simple plurals so "APIs" matches "API" (applied to both sides)"""
+    if not token.isalpha():
+        return token
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")) and not (
+            len(token) > 4 and token.endswith("is")):
+        return token[:-1]
+    return token
+
+
+_STOPWORDS = frozenset(_stem(word) for word in """
+a about above across after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each etc few for from further had has have having he
+her here hers him his how i if in into is it its itself just may me might more most must my no nor not of off on
+once only or other our ours out over own per same shall she should so some such than that the their them then
+there these they this those through to too under until up upon us very via was we were what when where which while
+who whom why will with within without would you your yours
+ability able apply applicant applicants background build building closely deliver design designing develop
+developing drive ensure fast junior large lead leading maintain maintaining manage managing new paced senior
+small support thing based benefits bonus candidate candidates collaborate company demonstrated desirable desired environment equivalent essential excellent experience experienced familiarity
+following good great help ideal ideally including join knowledge looking mandatory minimum nice opportunity plus
+position preferred proficiency proficient proven related required requirement requirements responsibilities
+responsible role salary skill skills solid strong team understanding using work working year years
+""".split())
+
+
+class Keyword(NamedTuple):
+    term: str
+    phrases: Tuple[Tuple[str, ...], ...]  # token sequences, any of which counts as a match
+    importance: str
+    weight: float
+    kind: str  # "skill" or "phrase"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased, plural-folded word tokens; keeps "c++", "c#", "node.js" and version numbers whole"""
+    return [_stem(token) for token in _TOKEN_RE.findall(text.casefold())]
+
+
+def content_terms(text: str) -> List[str]:
+    """tokenize() without stopwords and bare numbers (the terms lexical retrieval matches on)"""
+    return [token for token in tokenize(text) if token not in _STOPWORDS and any(c.isalpha() for c in token)]
+
+
+_SKILL_PHRASES = {
+    skill: tuple(dict.fromkeys(tuple(tokenize(form)) for form in (skill,) + aliases))
+    for skill, aliases in SKILL_TAXONOMY.items()
+}
+# First token -> skills with a phrase starting with it, so a text is scanned once for all skills
+_SKILLS_BY_FIRST_TOKEN: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+for _skill, _phrases in _SKILL_PHRASES.items():
+    for _phrase in _phrases:
+        _SKILLS_BY_FIRST_TOKEN.setdefault(_phrase[0], []).append((_phrase, _skill))
+
+
+def _segments(job_description: str) -> Iterable[Tuple[str, str]]:
+    """
+    (text, importance) of each line or sentence
+
+    Headings like "Nice to have:" carry over to what follows, until the next
+    heading, a non-requirements section ("Benefits", "About us") or the blank
+    line that ends the list.
+    """
+    mode = "general"
+    for paragraph in _PARAGRAPH_RE.split(job_description):
+        # A blank line right after "Requirements:" does not end the list; one after its items does
+        in_list = False
+        for segment in _SEGMENT_RE.split(paragraph):
+            # Markdown heading marks only at the start, so "C#" keeps its "#"
+            segment = segment.strip(" \t-*•").lstrip("# ")
+            if not segment:
+                continue
+            head, colon, rest = segment.partition(":")
+            heading = head if colon else segment
+            marked = "preferred" if _PREFERRED_RE.search(heading) else "required" if _REQUIRED_RE.search(heading) else None
+            # "Requirements:", "Nice to have", "Benefits" and "Location: Berlin" are headings; "Python" on its own is not
+            if len(heading.split()) <= 6 and (colon or (marked and len(heading.split()) <= 4)
+                                              or _OTHER_SECTION_RE.match(heading)):
+                mode = marked or "general"
+                in_list = False
+                if rest.strip():
+                    yield rest, mode
+                continue
+            if marked is None:
+                marked = "preferred" if _PREFERRED_RE.search(segment) else "required" if _REQUIRED_RE.search(segment) else mode
+            in_list = True
+            yield segment, marked
+        if in_list:
+            mode = "general"
+
+
+def _find_skills(tokens: List[str]) -> Iterable[Tuple[str, int, int]]:
+    """(skill, start, end) of every taxonomy phrase in the tokens"""
+    for i, token in enumerate(tokens):
+        for phrase, skill in _SKILLS_BY_FIRST_TOKEN.get(token, ()):
+            if tuple(tokens[i:i + len(phrase)]) == phrase:
+                yield skill, i, i + len(phrase)
+
+
+def _is_content(token: str) -> bool:
+    return token not in _STOPWORDS and (len(token) > 2 or not token.isalpha()) and any(c.isalpha() for c in token)
+
+
+def _more_important(a: str, b: str) -> str:
+    return a if IMPORTANCE_WEIGHTS[a] >= IMPORTANCE_WEIGHTS[b] else b
+
+
+@lru_cache(maxsize=64)
+def extract_keywords(job_description: str, max_phrases: int = DEFAULT_MAX_PHRASES) -> Tuple[Keyword, ...]:
+    """
+    Keywords a CV is checked for, most important first
+
+    Args:
+        job_description: Job description text
+        max_phrases: Non-taxonomy words and phrases kept in addition to the skills found
+    """
+    skills: Dict[str, str] = {}
+    candidates: Dict[Tuple[str, ...], List] = {}  # phrase -> [salience, importance, display form]
+    for segment, importance in _segments(job_description):
+        tokens = tokenize(segment)
+        in_skill = set()
+        for skill, start, end in _find_skills(tokens):
+            skills[skill] = _more_important(skills.get(skill, importance), importance)
+            in_skill.update(range(start, end))
+        display = _TOKEN_RE.findall(segment)
+        if len(display) != len(tokens):
+            display = tokens
+        for n in (1, 2):
+            for i in range(len(tokens) - n + 1):
+                gram = tuple(tokens[i:i + n])
+                if in_skill.intersection(range(i, i + n)) or not all(_is_content(token) for token in gram):
+                    continue
+                # Capitalised words inside a sentence are usually tools, products or certifications
+                salience = IMPORTANCE_WEIGHTS[importance] * (1.5 if n == 2 else 1.0)
+                if (i and display[i][:1].isupper()) or any(not token.isalpha() for token in gram):
+                    salience *= 1.5
+                entry = candidates.setdefault(gram, [0.0, importance, " ".join(display[i:i + n])])
+                entry[0] += salience
+                entry[1] = _more_important(entry[1], importance)
+
+    # A two-word phrase only counts when it recurs; it then replaces its words
+    bigrams = [(gram, entry) for gram, entry in candidates.items()
+               if len(gram) == 2 and entry[0] >= 2 * IMPORTANCE_WEIGHTS[entry[1]] * 1.5]
+    covered = {token for gram, _ in bigrams for token in gram}
+    unigrams = [(gram, entry) for gram, entry in candidates.items() if len(gram) == 1 and gram[0] not in covered]
+    ranked = sorted(bigrams + unigrams, key=lambda item: -item[1][0])[:max_phrases]
+    chosen = [Keyword(display, (gram,), importance, IMPORTANCE_WEIGHTS[importance], "phrase")
+              for gram, (_, importance, display) in ranked]
+
+    keywords = [Keyword(skill, _SKILL_PHRASES[skill], importance, IMPORTANCE_WEIGHTS[importance] * SKILL_WEIGHT, "skill")
+                for skill, importance in skills.items()]
+    keywords.sort(key=lambda keyword: -keyword.weight)
+    return tuple(keywords + chosen)
+
+
+class CVIndex:
+    """Inverted index of a CV's section texts: token -> positions, with section boundaries"""
+
+    __slots__ = ("positions", "section_names", "section_starts", "text")
+
+    def __init__(self, sections: List[List[str]], text: str = ""):
+        self.positions: Dict[str, List[int]] = {}
+        self.section_names: List[str] = []
+        self.section_starts: List[int] = []
+        self.text = text
+        position = 0
+        for name, section_text in sections:
+            self.section_names.append(name)
+            self.section_starts.append(position)
+            for token in tokenize(section_text):
+                self.positions.setdefault(token, []).append(position)
+                position += 1
+            position += 1  # phrases never span two sections
+
+    def find(self, phrase: Tuple[str, ...]) -> List[int]:
+        """Start positions of every occurrence of the token sequence"""
+        starts = self.positions.get(phrase[0])
+        if not starts or len(phrase) == 1:
+            return starts or []
+        found = set(starts)
+        for offset, token in enumerate(phrase[1:], 1):
+            found &= {p - offset for p in self.positions.get(token, ())}
+            if not found:
+                return []
+        return sorted(found)
+
+    def section_of(self, position: int) -> str:
+        return self.section_names[bisect_right(self.section_starts, position) - 1]
+
+
+class ATSScorer:
+    def __init__(self, max_phrases: int = DEFAULT_MAX_PHRASES, index_cache_size: int = 1024):
+        """
+        Keyword-based ATS scorer; needs no model and gives the same result for the same inputs
+
+        Args:
+            max_phrases: Non-taxonomy words and phrases taken from each job description
+            index_cache_size: CV indexes kept, keyed by CV text, so re-scoring against another JD is lookups only
+        """
+        self.max_phrases = max_phrases
+        self.index_cache_size = index_cache_size
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index(self, parsed: Dict) -> CVIndex:
+        """Inverted index of a parse_cv()/extract() result, built once per CV text"""
+        sections = parsed.get("sections") or [["text", parsed["text"]]]
+        key = (parsed["text"], tuple(name for name, _ in sections))
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+        with metrics.timed("ats_index"):
+            index = CVIndex(sections, parsed["text"])
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.index_cache_size:
+                self._indexes.popitem(last=False)
+        return index
+
+    @staticmethod
+    def section_checks(index: CVIndex, structured_info: Dict) -> Dict[str, bool]:
+        """Standard headings (and contact details) an ATS parser expects to find"""
+        checks = {"contact": bool(structured_info.get("email") or structured_info.get("phone"))}
+        for section, pattern in _SECTION_HEADINGS.items():
+            checks[section] = section in index.section_names or bool(pattern.search(index.text))
+        return checks
+
+    def score(self, parsed: Dict, job_description: str) -> Dict:
+        """
+        Score a parsed CV against a job description
+
+        Returns:
+            Dictionary with score (0-100), match_rate (share of keywords found), weighted_match_rate,
+            matched_keywords (keyword, importance, sections, count), missing_keywords (keyword, importance),
+            missing_required and section_checks
+        """
+        index = self.index(parsed)
+        keywords = extract_keywords(job_description, self.max_phrases)
+        matched, missing = [], []
+        matched_weight = total_weight = 0.0
+        for keyword in keywords:
+            total_weight += keyword.weight
+            positions = sorted({p for phrase in keyword.phrases for p in index.find(phrase)})
+            if positions:
+                matched_weight += keyword.weight
+                sections = list(dict.fromkeys(index.section_of(p) for p in positions))
+                matched.append({"keyword": keyword.term, "importance": keyword.importance,
+                                "sections": sections, "count": len(positions)})
+            else:
+                missing.append({"keyword": keyword.term, "importance": keyword.importance})
+
+        checks = self.section_checks(index, parsed.get("structured_info", {}))
+        section_rate = sum(checks.values()) / len(checks)
+        weighted_rate = matched_weight / total_weight if total_weight else 0.0
+        keyword_share = KEYWORD_SHARE if keywords else 0.0
+        metrics.incr("ats_scored")
+        return {
+            "score": round(100 * (keyword_share * weighted_rate + (1 - keyword_share) * section_rate)),
+            "match_rate": len(matched) / len(keywords) if keywords else 0.0,
+            "weighted_match_rate": weighted_rate,
+            "matched_keywords": matched,
+            "missing_keywords": missing,
+            "missing_required": [item["keyword"] for item in missing if item["importance"] == "required"],
+            "section_checks": checks,
+        }
+
+    def score_many(self, parsed_cvs: Iterable[Dict], job_description: str) -> List[Dict]:
+        """Score several CVs against one job description (its keywords are extracted once)"""
+        return [self.score(parsed, job_description) for parsed in parsed_cvs]
+
+
+def format_report(result: Dict) -> str:
+    """Plain-text summary of a score() result, e.g. to hand to the LLM for a narrative"""
+    found = ", ".join(item["keyword"] for item in result["matched_keywords"]) or "none"
+    missing = ", ".join(f"{item['keyword']} ({item['importance']})" for item in result["missing_keywords"]) or "none"
+    headings = ", ".join(f"{name}: {'yes' if ok else 'no'}" for name, ok in result["section_checks"].items())
+    return (f"Keyword ATS score: {result['score']}/100\n"
+            f"Keyword match rate: {result['match_rate']:.0%} ({result['weighted_match_rate']:.0%} weighted)\n"
+            f"Keywords found: {found}\n"
+            f"Keywords missing: {missing}\n"
+            f"Section checks: {headings}")
@@ -0,0 +1,74 @@
+"""Okapi BM25 over the chunks of one CV.
+
+Dense embeddings miss exact-term requirements (certifications, tool names,
+version numbers) that a lexical score catches, and a lexical score needs no
+model call at all. The parser stores each chunk's term counts at parse time
+(chunk_terms, JSON-serialisable so they travel with cached and queued parse
+results); scoring a job description against them is then a handful of dict
+lookups per chunk.
+
+Scores are normalised so that a chunk of average length containing every
+query term once scores 1 (higher term frequencies are capped there). That is
+not the cosine scale: one chunk rarely holds more than a few of a long job
+description's terms, so typical scores sit far below typical cosine
+similarities and a weighted sum with them drags every score down. IDF is computed over the CV's own chunks; a query term the CV lacks
+entirely is weighted like one found in a single chunk, so missing requirements
+lower the score without swamping it.
+"""
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+from .ats_scorer import content_terms
+
+K1 = 1.2
+B = 0.75
+
+
+def chunk_terms(chunks: List[str]) -> List[Dict[str, int]]:
+    """Term counts of each chunk, as stored in parse results under "chunk_terms\""""
+    return [dict(Counter(content_terms(chunk))) for chunk in chunks]
+
+
+def bm25_scores(query: str, terms: List[Dict[str, int]], k1: float = K1, b: float = B) -> List[float]:
+    """
+    Normalised BM25 score (0-1) of query against each chunk
+
+    Args:
+        query: Job description text; each distinct content term counts once
+        terms: chunk_terms() of the CV chunks
+        k1: Term frequency saturation
+        b: Chunk length normalisation
+    """
+    if not terms:
+        return []
+    query_terms = set(content_terms(query))
+    lengths = [sum(counts.values()) for counts in terms]
+    avg_length = sum(lengths) / len(lengths) or 1.0
+    num_chunks = len(terms)
+    weights = {}
+    for term in query_terms:
+        df = max(1, sum(1 for counts in terms if term in counts))
+        weights[term] = math.log(1 + (num_chunks - df + 0.5) / (df + 0.5))
+    # One occurrence in an average-length chunk contributes exactly the term's weight
+    best = sum(weights.values())
+    if not best:
+        return [0.0] * num_chunks
+
+    scores = []
+    for counts, length in zip(terms, lengths):
+        norm = k1 * (1 - b + b * length / avg_length)
+        score = 0.0
+        for term, weight in weights.items():
+            tf = counts.get(term)
+            if tf:
+                score += weight * tf * (k1 + 1) / (tf + norm)
+        scores.append(min(1.0, score / best))
+    return scores
+
+
+def lexical_scores(query: str, chunks: List[str], terms: Optional[List[Dict[str, int]]] = None) -> List[float]:
+    """bm25_scores() using the stored chunk_terms when available, else indexing the chunks now"""
+    if terms is None or len(terms) != len(chunks):
+        terms = chunk_terms(chunks)
+    return bm25_scores(query, terms)
@@ -1,36 +1,140 @@
-from pypdf import PdfReader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import io
+import os
 import re
-from typing import Dict, List, Optional
+import unicodedata
+from typing import BinaryIO, Dict, List, Optional, Union
+
+from . import metrics, pdf_layout
+
+PDFSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+# "chars" sizes chunks in characters; "tokens" packs whole sections into chunks of up to a token
+# budget (counted with a local tokenizer, see tokenizer.py) that fits the embedding model's context
+CHUNK_UNITS = ("chars", "tokens")
+DEFAULT_CHUNK_UNIT = os.environ.get("CV_CHUNK_UNIT", "chars")
+DEFAULT_CHUNK_TOKENS = int(os.environ.get("CV_CHUNK_TOKENS", "512"))
+
+
+def _char_class(codes) -> str:
+    """Regex character class body for the code points, written as ranges (compiles much faster)"""
+    ranges = []
+    for code in sorted(codes):
+        if ranges and code == ranges[-1][1] + 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return "".join(re.escape(chr(first)) if first == last else f"{re.escape(chr(first))}-{re.escape(chr(last))}"
+                   for first, last in ranges)
+
+
+# Applied after NFKC (which already folds ligatures, full-width forms and
+# non-breaking spaces): map typographic punctuation to ASCII, drop invisible
+# and icon-font (private use) characters, turn control characters into spaces
+_NORMALIZE_TABLE = {
+    **dict.fromkeys(map(ord, "•‣◦⁃∙●○■□▪▫►▶▸➢➤✓✔❖◆◇★☆"), "- "),
+    **dict.fromkeys(map(ord, "‐‑‒–—―−"), "-"),
+    **dict.fromkeys(map(ord, "‘’‚‛′"), "'"),
+    **dict.fromkeys(map(ord, "“”„‟″"), '"'),
+    ord("♯"): "#",
+    **dict.fromkeys([0x00AD, 0x180E, 0xFEFF, 0xFFFD, *range(0x200B, 0x2010), *range(0x2060, 0x2065)]),
+    **dict.fromkeys(range(0xE000, 0xF900)),
+    **dict.fromkeys((c for c in [*range(0x20), *range(0x7F, 0xA0)] if not chr(c).isspace()), " "),
+}
+_NORMALIZE_CHARS_PATTERN = f"[{_char_class(_NORMALIZE_TABLE)}]"
+
+# Latin, Greek and Cyrillic letters, for name patterns that work beyond ASCII.
+# Patterns are compiled (and cached by re) on first use to keep the import cheap.
+_UPPER = _char_class(c for c in range(0x530) if chr(c).isupper())
+_LOWER = _char_class(c for c in range(0x530) if chr(c).islower())
+# Name words are separated by spaces, never by a line break
+_NAME_PATTERN = rf"\b([{_UPPER}][{_LOWER}]+(?:[^\S\n]+[{_UPPER}][{_LOWER}]+){{1,3}})\b"
+_CAPS_NAME_PATTERN = rf"^[{_UPPER}\s]{{4,40}}(?=\s|$)"
+
+
+def normalize_chars(text: str) -> str:
+    """NFKC-normalise text and apply the character table; whitespace is left as is"""
+    if text.isascii():
+        # str.translate only has a fast path for ASCII strings
+        return text.translate(_NORMALIZE_TABLE)
+    text = unicodedata.normalize("NFKC", text)
+    # A CV uses a handful of distinct special characters; replacing each one
+    # is several times faster than translating a non-ASCII string char by char
+    for char in set(re.findall(_NORMALIZE_CHARS_PATTERN, text)):
+        text = text.replace(char, _NORMALIZE_TABLE[ord(char)] or "")
+    return text
+
+
+def normalize_text(text: str) -> str:
+    """normalize_chars, then collapse all (Unicode) whitespace runs to single spaces"""
+    return " ".join(normalize_chars(text).split())
+
+
+def _pdf_stream(source: PDFSource):
+    """Return something PdfReader can read without touching the disk for in-memory sources"""
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # BytesIO over a bytes object shares its buffer instead of copying it
+        return io.BytesIO(source)
+    if hasattr(source, "read") and hasattr(source, "seek"):
+        return source
+    raise TypeError(f"Unsupported PDF source: {type(source).__name__}")
+
 
 class CVParserAgent:
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50, chunk_unit: str = DEFAULT_CHUNK_UNIT,
+                 chunk_tokens: int = DEFAULT_CHUNK_TOKENS, embed_model: str = "nomic-embed-text"):
         """
         Initialize CV Parser with configurable chunk settings
         
         Args:
             chunk_size: Size of text chunks for processing
             chunk_overlap: Overlap between consecutive chunks
+            chunk_unit: Default chunking unit, one of CHUNK_UNITS
+            chunk_tokens: Default token budget per chunk in "tokens" mode
+            embed_model: Embedding model the chunks are for; token budgets are capped at its context window
         """
+        if chunk_unit not in CHUNK_UNITS:
+            raise ValueError(f"chunk_unit must be one of {', '.join(CHUNK_UNITS)}")
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size, 
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""],
-            length_function=len,
-        )
+        self.chunk_unit = chunk_unit
+        self.chunk_tokens = chunk_tokens
+        self.embed_model = embed_model
+        self._splitters = {}
+
+    def get_splitter(self, chunk_size: int, chunk_overlap: int, chunk_unit: str = "chars"):
+        """Text splitter for the given settings, built on first use so langchain is only imported when chunking"""
+        key = (chunk_size, chunk_overlap, chunk_unit)
+        splitter = self._splitters.get(key)
+        if splitter is None:
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+            if chunk_unit == "tokens":
+                from .tokenizer import get_tokenizer
+
+                length_function = get_tokenizer().count
+            else:
+                length_function = len
+            splitter = self._splitters[key] = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                # Oversized sections are split to what is left of the budget after their header, which
+                # can be less than the overlap; the splitter rejects an overlap larger than the chunk
+                chunk_overlap=min(chunk_overlap, chunk_size // 2) if chunk_unit == "tokens" else chunk_overlap,
+                separators=["\n\n", "\n", ". ", " ", ""],
+                length_function=length_function,
+            )
+        return splitter
+
+    @property
+    def splitter(self):
+        """Text splitter for the agent's current chunk settings"""
+        return self.get_splitter(self.chunk_size, self.chunk_overlap)
 
     def update_chunk_settings(self, chunk_size: int, chunk_overlap: int):
         """Update chunking parameters dynamically"""
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""],
-            length_function=len,
-        )
 
     def extract_name_from_text(self, text: str, email: str = None) -> Optional[str]:
         """Extract candidate name using multiple strategies"""
@@ -56,8 +160,7 @@ class CVParserAgent:
 
         # Strategy 3: Look for capitalized name pattern (2-4 words, each starting with capital)
         # Pattern: First Last or First Middle Last
-        name_pattern = r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})\b'
-        name_matches = re.findall(name_pattern, first_part)
+        name_matches = re.findall(_NAME_PATTERN, first_part)
 
         if name_matches:
             # Filter out common non-name matches
@@ -78,8 +181,7 @@ class CVParserAgent:
                         return match
 
         # Strategy 4: Look for ALL CAPS name at the beginning
-        caps_pattern = r'^[A-Z\s]{4,40}(?=\s|$)'
-        caps_match = re.search(caps_pattern, first_part.strip())
+        caps_match = re.search(_CAPS_NAME_PATTERN, first_part.strip())
         if caps_match:
             potential_name = caps_match.group().strip()
             # Check if it's not a header
@@ -154,8 +256,8 @@ class CVParserAgent:
         
         return info
 
-    def create_semantic_chunks(self, text: str) -> List[str]:
-        """Create semantic chunks based on CV sections"""
+    def split_sections(self, text: str) -> List[List[str]]:
+        """Group the lines of text under the CV section they belong to, as [section_name, section_text] pairs"""
         sections = {
             'summary': [],
             'experience': [],
@@ -201,58 +303,195 @@ class CVParserAgent:
         if current_content:
             sections[current_section].append('\n'.join(current_content))
         
+        return [
+            [section_name, '\n'.join(content_list)]
+            for section_name, content_list in sections.items() if content_list
+        ]
+
+    def chunk_sections(self, sections: List[List[str]], text: str, chunk_size: int = None,
+                       chunk_overlap: int = None) -> List[str]:
+        """Turn split_sections output into chunks; only this step depends on the chunk settings"""
+        chunk_size = chunk_size or self.chunk_size
+        splitter = self.get_splitter(chunk_size, self.chunk_overlap if chunk_overlap is None else chunk_overlap)
+
         # Combine all sections into semantic chunks
         semantic_chunks = []
-        for section_name, content_list in sections.items():
-            if content_list:
-                section_text = '\n'.join(content_list)
-                if len(section_text) > self.chunk_size:
-                    # Further split large sections
-                    sub_chunks = self.splitter.split_text(section_text)
-                    for chunk in sub_chunks:
-                        semantic_chunks.append(f"[{section_name.upper()}]\n{chunk}")
+        for section_name, section_text in sections:
+            if len(section_text) > chunk_size:
+                # Further split large sections
+                sub_chunks = splitter.split_text(section_text)
+                for chunk in sub_chunks:
+                    semantic_chunks.append(f"[{section_name.upper()}]\n{chunk}")
+            else:
+                semantic_chunks.append(f"[{section_name.upper()}]\n{section_text}")
+
+        return semantic_chunks if semantic_chunks else splitter.split_text(text)
+
+    def pack_sections(self, sections: List[List[str]], text: str, token_budget: int,
+                      chunk_overlap: int = 0) -> List[str]:
+        """
+        Turn split_sections output into chunks of up to token_budget tokens
+
+        Consecutive sections are packed into one chunk, each keeping its [SECTION] header, while they
+        fit; a section larger than the budget is split on its own, with chunk_overlap tokens of overlap.
+        """
+        from .tokenizer import get_tokenizer
+
+        count = get_tokenizer().count
+        chunks, packed, used = [], [], 0
+        for section_name, section_text in sections:
+            header = f"[{section_name.upper()}]\n"
+            piece = header + section_text
+            cost = count(piece)
+            # The blank line between packed sections costs no token in most vocabularies; count one anyway
+            if packed and used + 1 + cost > token_budget:
+                chunks.append("\n\n".join(packed))
+                packed, used = [], 0
+            if cost > token_budget:
+                splitter = self.get_splitter(max(1, token_budget - count(header)), chunk_overlap, "tokens")
+                chunks.extend(header + chunk for chunk in splitter.split_text(section_text))
+                continue
+            used += cost + (1 if packed else 0)
+            packed.append(piece)
+        if packed:
+            chunks.append("\n\n".join(packed))
+        return chunks if chunks else self.get_splitter(token_budget, chunk_overlap, "tokens").split_text(text)
+
+    def token_budget(self, chunk_tokens: int = None) -> int:
+        """Token budget per chunk: chunk_tokens (default: the agent's) capped at the embedding model's context"""
+        from .tokenizer import usable_context
+
+        return max(1, min(chunk_tokens or self.chunk_tokens, usable_context(self.embed_model)))
+
+    def create_semantic_chunks(self, text: str) -> List[str]:
+        """Create semantic chunks based on CV sections"""
+        return self.chunk_sections(self.split_sections(text), text)
+
+    def extract(self, pdf_path: PDFSource, layout_aware: bool = False) -> Dict:
+        """
+        Run the part of parsing that does not depend on chunk settings
+
+        PDF decode, text cleanup, structured extraction and the section split
+        happen once; cache the result and pass it to rechunk() when the chunk
+        settings change.
+
+        Args:
+            pdf_path: Path to the PDF file, its bytes (bytes/bytearray/memoryview)
+                or a seekable binary file object such as a Streamlit upload
+            layout_aware: Rebuild reading order on multi-column pages (see pdf_layout)
+
+        Returns:
+            Dictionary with cleaned text, sections, structured info and page count
+        """
+        from pypdf import PdfReader
+
+        with metrics.timed("pdf_read"):
+            reader = PdfReader(_pdf_stream(pdf_path))
+            if layout_aware:
+                raw_text = "\n".join([pdf_layout.page_text(page) for page in reader.pages])
+            else:
+                raw_text = " ".join([page.extract_text() for page in reader.pages])
+
+        # Clean up text; the raw text keeps its line breaks for name extraction
+        with metrics.timed("text_cleanup"):
+            raw_text_for_name = normalize_chars(raw_text)
+            text = " ".join(raw_text_for_name.split())
+
+        # Extract structured information (pass raw text for better name extraction)
+        with metrics.timed("structured_extraction"):
+            structured_info = self.extract_structured_info(text, raw_text_for_name)
+
+        with metrics.timed("section_split"):
+            if layout_aware:
+                # Reading-order text keeps one line per text row, so section headings can be found
+                lines = (" ".join(line.split()) for line in raw_text_for_name.splitlines())
+                sections = self.split_sections("\n".join(line for line in lines if line))
+            else:
+                sections = self.split_sections(text)
+        metrics.incr("pages_parsed", len(reader.pages))
+
+        return {
+            "text": text,
+            "sections": sections,
+            "structured_info": structured_info,
+            "num_pages": len(reader.pages)
+        }
+
+    def rechunk(self, parsed: Dict, chunk_size: int = None, chunk_overlap: int = None,
+                use_semantic_chunking: bool = True, chunk_unit: str = None) -> Dict:
+        """
+        Chunk an extract() or parse_cv() result with the given settings
+
+        Args:
+            parsed: Output of extract() or parse_cv(); it is not modified, so cached results can be shared
+            chunk_size: Defaults to the agent's chunk size; in "tokens" mode, the token budget per chunk
+                (defaults to the agent's chunk_tokens, capped at the embedding model's context)
+            chunk_overlap: Defaults to the agent's chunk overlap (in tokens in "tokens" mode)
+            use_semantic_chunking: Whether to use semantic chunking based on CV sections
+            chunk_unit: "chars" or "tokens"; defaults to the agent's chunk unit
+
+        Returns:
+            parsed with chunks, their BM25 term counts (chunk_terms) and chunk_stats for these settings
+            (parsed itself if it already has them). chunk_stats holds the chunk count, plus the token
+            statistics of tokenizer.token_stats() in "tokens" mode; call that for character chunks if needed
+        """
+        chunk_unit = chunk_unit or self.chunk_unit
+        if chunk_unit not in CHUNK_UNITS:
+            raise ValueError(f"chunk_unit must be one of {', '.join(CHUNK_UNITS)}")
+        chunk_size = self.token_budget(chunk_size) if chunk_unit == "tokens" else chunk_size or self.chunk_size
+        chunk_overlap = self.chunk_overlap if chunk_overlap is None else chunk_overlap
+        chunk_method = "semantic" if use_semantic_chunking else "standard"
+        chunk_settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "chunk_unit": chunk_unit}
+        if parsed.get("chunk_settings") == chunk_settings and parsed.get("chunk_method") == chunk_method:
+            return parsed
+
+        from . import bm25
+        from .tokenizer import token_stats
+
+        text = parsed["text"]
+        with metrics.timed("chunking"):
+            if use_semantic_chunking:
+                sections = parsed["sections"] if "sections" in parsed else self.split_sections(text)
+                if chunk_unit == "tokens":
+                    chunks = self.pack_sections(sections, text, chunk_size, chunk_overlap)
                 else:
-                    semantic_chunks.append(f"[{section_name.upper()}]\n{section_text}")
-        
-        return semantic_chunks if semantic_chunks else self.splitter.split_text(text)
+                    chunks = self.chunk_sections(sections, text, chunk_size, chunk_overlap)
+            else:
+                chunks = self.get_splitter(chunk_size, chunk_overlap, chunk_unit).split_text(text)
+            # A tokenizer pass over every chunk is only worth it when chunks are sized in tokens
+            chunk_stats = token_stats(chunks, self.embed_model) if chunk_unit == "tokens" else {"count": len(chunks)}
+        # BM25 term counts for lexical / hybrid matching, built once per chunking
+        with metrics.timed("lexical_index"):
+            chunk_terms = bm25.chunk_terms(chunks)
 
-    def parse_cv(self, pdf_path: str, use_semantic_chunking: bool = True) -> Dict:
+        return {
+            **parsed,
+            "chunks": chunks,
+            "chunk_terms": chunk_terms,
+            "chunk_stats": chunk_stats,
+            "chunk_method": chunk_method,
+            "chunk_settings": chunk_settings
+        }
+
+    def parse_cv(self, pdf_path: PDFSource, use_semantic_chunking: bool = True, chunk_size: int = None,
+                 chunk_overlap: int = None, layout_aware: bool = False, chunk_unit: str = None) -> Dict:
         """
         Parse CV from PDF file
         
         Args:
-            pdf_path: Path to the PDF file
+            pdf_path: Path to the PDF file, its bytes (bytes/bytearray/memoryview)
+                or a seekable binary file object such as a Streamlit upload
             use_semantic_chunking: Whether to use semantic chunking based on CV sections
+            chunk_size: Defaults to the agent's chunk size
+            chunk_overlap: Defaults to the agent's chunk overlap
+            layout_aware: Rebuild reading order on multi-column pages (slower on those pages only)
+            chunk_unit: "chars" or "tokens" (see rechunk); defaults to the agent's chunk unit
         
         Returns:
             Dictionary containing parsed text, chunks, and structured info
         """
         try:
-            reader = PdfReader(pdf_path)
-            raw_text = " ".join([page.extract_text() for page in reader.pages])
-
-            # Keep raw text for name extraction (preserves some formatting)
-            raw_text_for_name = raw_text
-
-            # Clean up text
-            text = re.sub(r'\s+', ' ', raw_text)  # Normalize whitespace
-            text = re.sub(r'[^\x00-\x7F]+', '', text)  # Remove non-ASCII characters
-
-            # Extract structured information (pass raw text for better name extraction)
-            structured_info = self.extract_structured_info(text, raw_text_for_name)
-            
-            # Create chunks
-            if use_semantic_chunking:
-                chunks = self.create_semantic_chunks(text)
-            else:
-                chunks = self.splitter.split_text(text)
-            
-            return {
-                "text": text,
-                "chunks": chunks,
-                "structured_info": structured_info,
-                "num_pages": len(reader.pages),
-                "chunk_method": "semantic" if use_semantic_chunking else "standard"
-            }
+            return self.rechunk(self.extract(pdf_path, layout_aware), chunk_size, chunk_overlap, use_semantic_chunking,
+                                chunk_unit)
         except Exception as e:
             raise Exception(f"Failed to parse PDF: {str(e)}")
@@ -0,0 +1,208 @@
+"""Process-wide micro-batching of embedding requests.
+
+Every Streamlit session (and every API request) embeds its CV chunks on its
+own. The batcher sits in front of the embeddings client: it collects requests
+from all callers for a few milliseconds, or until enough texts are pending,
+sends them to Ollama as one batched request, and hands each caller back its
+own vectors. Identical texts in a batch (e.g. the same job description from
+several recruiters) are embedded once.
+
+Vectors are also kept in an LRU cache keyed by text, so re-chunking a CV with
+new settings, or matching it against another job description, only embeds the
+chunks whose text actually changed.
+
+Batches are sent through the "embed" scheduler (scheduler.py): requests are
+grouped by their priority class, and each batch waits for a slot under the
+priority and user of its first request, so interactive embeddings overtake
+queued batch work.
+"""
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from . import metrics
+from ._ollama import make_embeddings
+from .scheduler import PRIORITIES, current, get_scheduler
+
+DEFAULT_MAX_BATCH = int(os.environ.get("CV_EMBED_BATCH_SIZE", "64"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("CV_EMBED_BATCH_WAIT_MS", "5"))
+DEFAULT_CONCURRENT_BATCHES = int(os.environ.get("CV_EMBED_CONCURRENT_BATCHES", "2"))
+# Formed batches waiting for a scheduler slot each hold a thread; beyond this they queue in order
+_WAITING_BATCHES = 32
+# A 768-d float32 vector is 3 KB, so the default cache holds about 25 MB
+DEFAULT_CACHE_SIZE = int(os.environ.get("CV_EMBED_CACHE_SIZE", "8192"))
+
+
+class EmbeddingCache:
+    """Thread-safe LRU of float32 vectors keyed by the embedded text"""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            found = []
+            for text in texts:
+                vector = self._vectors.get(text)
+                if vector is not None:
+                    self._vectors.move_to_end(text)
+                found.append(vector)
+            return found
+
+    def put_many(self, texts: List[str], vectors: List[np.ndarray]) -> None:
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                self._vectors[text] = vector
+                self._vectors.move_to_end(text)
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors.clear()
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+
+class EmbeddingBatcher:
+    def __init__(self, embedder, max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 concurrent_batches: int = DEFAULT_CONCURRENT_BATCHES, cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Wrap an embeddings client with request coalescing
+
+        Args:
+            embedder: Object with embed_documents(texts) (e.g. OllamaEmbeddings)
+            max_batch: Send a batch as soon as this many texts are pending
+            max_wait_ms: Longest time the first request of a batch waits for company
+            concurrent_batches: Batches that may be in flight at once (also bounded by the "embed"
+                scheduler's slots)
+            cache_size: Vectors kept in the text-keyed LRU cache (0 disables it)
+        """
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache = EmbeddingCache(cache_size) if cache_size else None
+        self._requests = queue.Queue()
+        self._in_flight = threading.Semaphore(concurrent_batches)
+        self._executor = ThreadPoolExecutor(concurrent_batches + _WAITING_BATCHES, thread_name_prefix="embed-batch")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="embed-batcher", daemon=True)
+        self._dispatcher.start()
+
+    def configure(self, max_batch: int = None, max_wait_ms: float = None, concurrent_batches: int = None) -> None:
+        """
+        Change the batching settings of a running (e.g. shared) batcher; None keeps a setting
+
+        Batches already in flight finish under the previous concurrency limit.
+        """
+        if max_batch is not None:
+            self.max_batch = max_batch
+        if max_wait_ms is not None:
+            self.max_wait = max_wait_ms / 1000
+        if concurrent_batches is not None:
+            # _run_batch releases the semaphore it acquired, so swapping it is safe; the old
+            # executor still runs the batches it was given
+            self._in_flight = threading.Semaphore(concurrent_batches)
+            executor, self._executor = self._executor, ThreadPoolExecutor(
+                concurrent_batches + _WAITING_BATCHES, thread_name_prefix="embed-batch")
+            executor.shutdown(wait=False)
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for embedding; the future resolves to one read-only float32 vector per text"""
+        future = Future()
+        texts = list(texts)
+        cached = self.cache.get_many(texts) if self.cache is not None else [None] * len(texts)
+        missing = [text for text, vector in zip(texts, cached) if vector is None]
+        if self.cache is not None:
+            metrics.incr("embedding_cache_hits", len(texts) - len(missing))
+            metrics.incr("embedding_cache_misses", len(missing))
+        if not missing:
+            future.set_result(cached)
+            return future
+
+        pending = Future()
+        self._requests.put((missing, pending, current()))
+
+        def _merge(done: Future):
+            if future.done():
+                return
+            if done.exception() is not None:
+                future.set_exception(done.exception())
+                return
+            fresh = iter(done.result())
+            future.set_result([vector if vector is not None else next(fresh) for vector in cached])
+
+        pending.add_done_callback(_merge)
+        return future
+
+    def embed_documents(self, texts: List[str]) -> List[np.ndarray]:
+        return self.submit(texts).result()
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.submit([text]).result()[0]
+
+    def _dispatch_loop(self):
+        while True:
+            batch = [self._requests.get()]
+            pending = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while pending < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                pending += len(item[0])
+            for priority in PRIORITIES:
+                group = [item for item in batch if item[2][0] == priority]
+                if group:
+                    self._executor.submit(self._run_batch, group)
+
+    def _run_batch(self, batch):
+        unique = list(dict.fromkeys(text for texts, _, _ in batch for text in texts))
+        priority, user = batch[0][2]
+        try:
+            with get_scheduler("embed").slot(priority, user), self._in_flight:
+                with metrics.timed("embedding_batch", kind="batched"):
+                    vectors = self.embedder.embed_documents(unique)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        metrics.incr("embedding_batches")
+        metrics.incr("embedding_batch_callers", len(batch))
+        metrics.incr("embedded_texts", len(unique))
+        vectors = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+        for vector in vectors:
+            vector.flags.writeable = False  # shared by every caller and the cache
+        if self.cache is not None:
+            self.cache.put_many(unique, vectors)
+        by_text = dict(zip(unique, vectors))
+        for texts, future, _ in batch:
+            if not future.done():
+                future.set_result([by_text[text] for text in texts])
+
+
+_batchers: Dict[str, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model_name: str) -> EmbeddingBatcher:
+    """Return the shared batcher for model_name, creating it on first use"""
+    with _batchers_lock:
+        batcher = _batchers.get(model_name)
+        if batcher is None:
+            batcher = _batchers[model_name] = EmbeddingBatcher(make_embeddings(model_name))
+        return batcher
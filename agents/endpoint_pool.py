@@ -0,0 +1,314 @@
+"""Load-balanced pool of Ollama endpoints.
+
+By default every client talks to the one server in OLLAMA_HOST. With
+CV_OLLAMA_ENDPOINTS set, generation and embedding clients are spread over
+several inference boxes instead:
+
+    CV_OLLAMA_ENDPOINTS='[
+        {"url": "http://gpu-1:11434", "role": "generate"},
+        {"url": "http://gpu-2:11434", "role": "generate", "models": ["llama3.2", "llama3.2:1b"]},
+        {"url": "http://cpu-1:11434", "role": "embed"}
+    ]'
+
+role is "generate", "embed" or "both" (the default), so embedding traffic can
+be kept off the generation boxes. models restricts an endpoint to the listed
+models; without it the models are discovered from the endpoint's /api/tags.
+
+Each request goes to the healthy endpoint with the fewest requests in flight
+that serves the model. A request that fails because of the endpoint (refused
+connection, timeout, 5xx, model not pulled there) marks it and is retried on
+the next candidate; a background thread re-checks every endpoint every
+health_interval seconds, so failed ones rejoin once they answer again.
+"""
+import itertools
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from . import metrics
+
+ROLES = ("generate", "embed")
+DEFAULT_HEALTH_INTERVAL = float(os.environ.get("CV_OLLAMA_HEALTH_INTERVAL", "15"))
+DEFAULT_HEALTH_TIMEOUT = float(os.environ.get("CV_OLLAMA_HEALTH_TIMEOUT", "2"))
+
+
+def _model_names(name: str):
+    # Ollama lists "llama3.2:latest" for a model requested as "llama3.2"
+    return {name, name[:-len(":latest")] if name.endswith(":latest") else f"{name}:latest"}
+
+
+class Endpoint:
+    def __init__(self, url: str, role: str = "both", models: Optional[Iterable[str]] = None):
+        """
+        One Ollama server
+
+        Args:
+            url: Base URL, e.g. http://gpu-1:11434
+            role: "generate", "embed" or "both"
+            models: Models this endpoint may serve; None discovers them from /api/tags
+        """
+        if role not in ROLES + ("both",):
+            raise ValueError(f"role must be one of {', '.join(ROLES + ('both',))}")
+        self.url = url.rstrip("/")
+        self.roles = ROLES if role == "both" else (role,)
+        self.configured_models = set().union(*map(_model_names, models)) if models else None
+        # None until the first health check: every model is assumed to be there
+        self.discovered_models: Optional[set] = None
+        self.missing_models = set()
+        self.healthy = True
+        self.in_flight = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def serves(self, model: str, role: str) -> bool:
+        if role not in self.roles or model in self.missing_models:
+            return False
+        for models in (self.configured_models, self.discovered_models):
+            if models is not None and model not in models:
+                return False
+        return True
+
+    def status(self) -> Dict:
+        return {
+            "url": self.url,
+            "roles": list(self.roles),
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "failures": self.failures,
+            "models": sorted(self.configured_models or self.discovered_models or []),
+            "last_error": self.last_error,
+        }
+
+
+class ModelUnavailable(RuntimeError):
+    """No endpoint of the pool serves the requested model"""
+
+
+def is_endpoint_error(error: Exception) -> bool:
+    """Whether a failed call should be retried on another endpoint"""
+    if isinstance(error, (ConnectionError, OSError, TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status >= 500 or status == 404
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(error, httpx.TransportError)
+
+
+class EndpointPool:
+    def __init__(self, endpoints: List[Endpoint], health_interval: float = DEFAULT_HEALTH_INTERVAL,
+                 health_timeout: float = DEFAULT_HEALTH_TIMEOUT):
+        """
+        Args:
+            endpoints: Servers in the pool
+            health_interval: Seconds between health checks of every endpoint; 0 disables the checker thread
+            health_timeout: Seconds a health check waits for /api/tags
+        """
+        if not endpoints:
+            raise ValueError("An endpoint pool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.health_timeout = health_timeout
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+        self._stop = threading.Event()
+        if health_interval:
+            threading.Thread(target=self._health_loop, args=(health_interval,), name="ollama-health",
+                             daemon=True).start()
+
+    def role_size(self, role: str) -> int:
+        """Endpoints that take requests of role"""
+        return sum(role in endpoint.roles for endpoint in self.endpoints)
+
+    def candidates(self, model: str, role: str) -> List[Endpoint]:
+        """Endpoints for a request, best first: healthy before unhealthy, then fewest in flight"""
+        turn = next(self._turn)
+        with self._lock:
+            eligible = [endpoint for endpoint in self.endpoints if endpoint.serves(model, role)]
+            count = len(eligible)
+            # Rotating the start breaks ties between equally loaded endpoints
+            eligible = eligible[turn % count:] + eligible[:turn % count] if count else eligible
+            return sorted(eligible, key=lambda endpoint: (not endpoint.healthy, endpoint.in_flight))
+
+    @contextmanager
+    def lease(self, endpoint: Endpoint, role: str):
+        """Count a request as in flight on endpoint"""
+        with self._lock:
+            endpoint.in_flight += 1
+        metrics.incr("endpoint_requests", endpoint=endpoint.url, role=role)
+        try:
+            yield endpoint
+        finally:
+            with self._lock:
+                endpoint.in_flight -= 1
+
+    def mark_failed(self, endpoint: Endpoint, model: str, error: Exception) -> None:
+        """Take endpoint out of rotation (or just the model, when it is not pulled there) until it checks healthy"""
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.last_error = str(error) or type(error).__name__
+            if getattr(error, "status_code", None) == 404:
+                endpoint.missing_models.add(model)
+            else:
+                endpoint.healthy = False
+        metrics.incr("endpoint_failures", endpoint=endpoint.url)
+        metrics.set_gauge("endpoint_healthy", float(endpoint.healthy), endpoint=endpoint.url)
+
+    def call(self, model: str, role: str, fn):
+        """
+        Run fn(endpoint) on the best endpoint for model, failing over to the next on endpoint errors
+
+        Raises the last error when every endpoint failed, or ModelUnavailable when none serves the model
+        """
+        error = None
+        for attempt, endpoint in enumerate(self.candidates(model, role)):
+            if attempt:
+                metrics.incr("endpoint_failovers", role=role)
+            try:
+                with self.lease(endpoint, role):
+                    return fn(endpoint)
+            except Exception as e:
+                if not is_endpoint_error(e):
+                    raise
+                self.mark_failed(endpoint, model, e)
+                error = e
+        if error is not None:
+            raise error
+        raise ModelUnavailable(f"No {role} endpoint serves model {model!r}")
+
+    def check(self, endpoint: Endpoint) -> bool:
+        """Refresh an endpoint's health and model list from /api/tags"""
+        import httpx
+
+        try:
+            response = httpx.get(f"{endpoint.url}/api/tags", timeout=self.health_timeout)
+            response.raise_for_status()
+            models = set()
+            for entry in response.json().get("models", []):
+                models |= _model_names(entry.get("name") or entry.get("model", ""))
+        except Exception as e:
+            with self._lock:
+                endpoint.healthy = False
+                endpoint.last_error = str(e) or type(e).__name__
+        else:
+            with self._lock:
+                endpoint.healthy = True
+                endpoint.discovered_models = models
+                endpoint.missing_models.clear()
+        metrics.set_gauge("endpoint_healthy", float(endpoint.healthy), endpoint=endpoint.url)
+        return endpoint.healthy
+
+    def check_all(self) -> None:
+        for endpoint in self.endpoints:
+            self.check(endpoint)
+
+    def _health_loop(self, interval: float):
+        while True:
+            self.check_all()
+            if self._stop.wait(interval):
+                return
+
+    def close(self) -> None:
+        """Stop the health checker"""
+        self._stop.set()
+
+    def status(self) -> List[Dict]:
+        with self._lock:
+            return [endpoint.status() for endpoint in self.endpoints]
+
+
+class PooledLLM:
+    """Text-generation client spread over the pool's generate endpoints (generate() and stream() only)"""
+
+    def __init__(self, pool: EndpointPool, model: str, **options):
+        self.pool = pool
+        self.model = model
+        self.options = options
+        self._clients = {}
+
+    def client(self, endpoint: Endpoint):
+        client = self._clients.get(endpoint.url)
+        if client is None:
+            from langchain_ollama import OllamaLLM
+
+            client = self._clients[endpoint.url] = OllamaLLM(model=self.model, base_url=endpoint.url, **self.options)
+        return client
+
+    def generate(self, prompts, **kwargs):
+        return self.pool.call(self.model, "generate", lambda endpoint: self.client(endpoint).generate(prompts, **kwargs))
+
+    def stream(self, prompt, **kwargs):
+        # Fails over only until the first chunk; after that the error reaches the caller
+        error = None
+        for attempt, endpoint in enumerate(self.pool.candidates(self.model, "generate")):
+            if attempt:
+                metrics.incr("endpoint_failovers", role="generate")
+            started = False
+            try:
+                with self.pool.lease(endpoint, "generate"):
+                    for chunk in self.client(endpoint).stream(prompt, **kwargs):
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                if started or not is_endpoint_error(e):
+                    raise
+                self.pool.mark_failed(endpoint, self.model, e)
+                error = e
+        if error is not None:
+            raise error
+        raise ModelUnavailable(f"No generate endpoint serves model {self.model!r}")
+
+
+class PooledEmbeddings:
+    """Embeddings client spread over the pool's embed endpoints"""
+
+    def __init__(self, pool: EndpointPool, model: str, **options):
+        self.pool = pool
+        self.model = model
+        self.options = options
+        self._clients = {}
+
+    def client(self, endpoint: Endpoint):
+        client = self._clients.get(endpoint.url)
+        if client is None:
+            from langchain_ollama import OllamaEmbeddings
+
+            client = self._clients[endpoint.url] = OllamaEmbeddings(model=self.model, base_url=endpoint.url,
+                                                                      **self.options)
+        return client
+
+    def embed_documents(self, texts):
+        return self.pool.call(self.model, "embed", lambda endpoint: self.client(endpoint).embed_documents(texts))
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def load_endpoints(config: Optional[str] = None) -> List[Endpoint]:
+    """Endpoints from a JSON list (CV_OLLAMA_ENDPOINTS by default); entries are URLs or {url, role, models}"""
+    config = os.environ.get("CV_OLLAMA_ENDPOINTS") if config is None else config
+    endpoints = []
+    for entry in json.loads(config) if config else []:
+        endpoints.append(Endpoint(entry) if isinstance(entry, str) else Endpoint(**entry))
+    return endpoints
+
+
+_pool: Optional[EndpointPool] = None
+_pool_loaded = False
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[EndpointPool]:
+    """The process-wide pool configured by CV_OLLAMA_ENDPOINTS, or None to use OLLAMA_HOST"""
+    global _pool, _pool_loaded
+    with _pool_lock:
+        if not _pool_loaded:
+            endpoints = load_endpoints()
+            _pool = EndpointPool(endpoints) if endpoints else None
+            _pool_loaded = True
+        return _pool
@@ -1,18 +1,96 @@
-from langchain_ollama import OllamaLLM
+from . import metrics
+from ._ollama import generate_text, is_model_missing, make_llm, stream_text
+from .model_routing import DEFAULT_DEPTH, load_routes, relevant_context
 
 class FeedbackAgent:
-    def __init__(self, model_name: str = "llama3.2"):
+    def __init__(self, model_name: str = "llama3.2", routes=None):
+        """
+        Args:
+            model_name: Ollama model for detailed analyses (and for routes without a model of their own)
+            routes: Review depth -> model_routing.Route; defaults to load_routes()
+        """
         self.model_name = model_name
-        self.llm = OllamaLLM(model=model_name)
+        self.llm = make_llm(model_name)
+        self.routes = load_routes() if routes is None else routes
+        self._routed_llms = {}
 
     def update_model(self, model_name: str):
         """Update the LLM model being used"""
         self.model_name = model_name
-        self.llm = OllamaLLM(model=model_name)
+        self.llm = make_llm(model_name)
+        self._routed_llms = {}
+
+    def route(self, depth=DEFAULT_DEPTH):
+        if depth not in self.routes:
+            raise ValueError(f"Unknown review depth {depth!r}; choose one of {', '.join(self.routes)}")
+        return self.routes[depth]
+
+    def _client(self, model_name, num_predict):
+        if model_name == self.model_name and num_predict is None:
+            return self.llm
+        key = (model_name, num_predict)
+        if key not in self._routed_llms:
+            self._routed_llms[key] = make_llm(model_name, num_predict)
+        return self._routed_llms[key]
+
+    def llm_for(self, depth=DEFAULT_DEPTH):
+        """Client of the route for a review depth"""
+        route = self.route(depth)
+        return self._client(route.model or self.model_name, route.num_predict)
+
+    def _fallback_client(self, depth, error):
+        """Client of the configured model when a routed model is not pulled on this server; re-raises other errors"""
+        route = self.route(depth)
+        if route.model in (None, self.model_name) or not is_model_missing(error):
+            raise error
+        metrics.incr("llm_route_fallbacks", depth=depth)
+        return self._client(self.model_name, route.num_predict)
+
+    def stream_for(self, prompt, depth=DEFAULT_DEPTH, operation="suggest_improvements"):
+        """stream_text() through the route of a review depth, with the same missing-model fallback as
+        suggest_improvements as long as nothing has been generated yet"""
+        started = False
+        try:
+            for chunk in stream_text(self.llm_for(depth), prompt, operation=operation):
+                started = True
+                yield chunk
+        except Exception as e:
+            if started:
+                raise
+            yield from stream_text(self._fallback_client(depth, e), prompt, operation=operation)
+
+    def suggest_improvements(self, raw_cv_text, target_role=None, depth=DEFAULT_DEPTH, chunks=None, chunk_terms=None):
+        """Provide general CV improvement suggestions (excludes ATS and Skills analysis)
+
+        depth "quick" routes to a smaller model with a short prompt, capped output and only the
+        chunks most relevant to the target role; "detailed" is the full analysis
+        """
+        prompt = self.improvements_prompt(raw_cv_text, target_role, depth, chunks, chunk_terms)
+        operation = "suggest_improvements" if depth == DEFAULT_DEPTH else f"suggest_improvements_{depth}"
+        try:
+            return generate_text(self.llm_for(depth), prompt, operation=operation)
+        except Exception as e:
+            # The routed model may not be pulled on this server; answer with the configured one instead
+            return generate_text(self._fallback_client(depth, e), prompt, operation=operation)
+
+    def check_ats_score(self, raw_cv_text, target_role=None, job_description=None, keyword_report=None):
+        """Analyze CV for ATS (Applicant Tracking System) optimization; a keyword_report
+        (ats_scorer.format_report output) makes the LLM explain that score instead of guessing one"""
+        prompt = self.ats_prompt(raw_cv_text, target_role, job_description, keyword_report)
+        return generate_text(self.llm, prompt, operation="check_ats_score")
 
-    def suggest_improvements(self, raw_cv_text, target_role=None):
-        """Provide general CV improvement suggestions (excludes ATS and Skills analysis)"""
+    def analyze_skills(self, raw_cv_text, target_role=None, job_description=None):
+        """Analyze and provide detailed feedback on the skills section of the CV"""
+        prompt = self.skills_prompt(raw_cv_text, target_role, job_description)
+        return generate_text(self.llm, prompt, operation="analyze_skills")
+
+    def improvements_prompt(self, raw_cv_text, target_role=None, depth=DEFAULT_DEPTH, chunks=None, chunk_terms=None):
+        """Build the prompt for suggest_improvements"""
+        route = self.route(depth)
+        if route.prompt == "short":
+            return self.quick_review_prompt(raw_cv_text, target_role, route.context_chars, chunks, chunk_terms)
         role_context = f"for a {target_role} position" if target_role else "for general job applications"
+        max_chars = route.context_chars
 
         prompt = f"""You are an expert CV/Resume coach with 15+ years of experience helping candidates optimize their resumes for human recruiters.
 
@@ -51,14 +129,28 @@ ANALYSIS STRUCTURE:
 ================================================================================
 
 CV CONTENT TO ANALYZE:
-{raw_cv_text[:3000]}{'...[truncated]' if len(raw_cv_text) > 3000 else ''}
+{raw_cv_text[:max_chars]}{'...[truncated]' if len(raw_cv_text) > max_chars else ''}
 
 Please provide specific, actionable feedback following the structure above. Use clear formatting with bullet points and sections."""
 
-        return self.llm.invoke(prompt)
+        return prompt
+
+    def quick_review_prompt(self, raw_cv_text, target_role=None, max_chars=1500, chunks=None, chunk_terms=None):
+        """Build the short prompt of a quick review; the CV is trimmed to the parts most relevant to the role"""
+        role_context = f"for a {target_role} position" if target_role else "for general job applications"
+        context = relevant_context(raw_cv_text, max_chars, target_role, chunks, chunk_terms)
+
+        return f"""You are an expert CV coach. Give a quick review of this CV {role_context} in under 200 words:
+
+1. Overall impression (one sentence, Score: X/10)
+2. Top 3 strengths
+3. Top 3 improvements, each a concrete action
 
-    def check_ats_score(self, raw_cv_text, target_role=None, job_description=None):
-        """Analyze CV for ATS (Applicant Tracking System) optimization"""
+CV (most relevant parts):
+{context}"""
+
+    def ats_prompt(self, raw_cv_text, target_role=None, job_description=None, keyword_report=None):
+        """Build the prompt for check_ats_score"""
         role_context = f"for a {target_role} position" if target_role else "for general job applications"
 
         jd_section = ""
@@ -67,12 +159,20 @@ Please provide specific, actionable feedback following the structure above. Use
 JOB DESCRIPTION TO MATCH AGAINST:
 {job_description[:2000]}{'...[truncated]' if len(job_description) > 2000 else ''}
 
+"""
+
+        report_section = ""
+        if keyword_report:
+            report_section = f"""
+KEYWORD SCAN RESULTS (computed deterministically; use this score and these keyword lists as given, and explain them):
+{keyword_report}
+
 """
 
         prompt = f"""You are an expert ATS (Applicant Tracking System) specialist with 15+ years of experience helping candidates optimize their resumes to pass automated screening systems.
 
 Analyze the following CV {role_context} and provide a comprehensive ATS analysis.
-{jd_section}
+{jd_section}{report_section}
 ATS ANALYSIS STRUCTURE:
 ================================================================================
 
@@ -127,10 +227,10 @@ CV CONTENT TO ANALYZE:
 
 Please provide specific, actionable ATS optimization feedback. Be precise about what changes will improve ATS compatibility{"and alignment with the job description" if job_description else ""}."""
 
-        return self.llm.invoke(prompt)
+        return prompt
 
-    def analyze_skills(self, raw_cv_text, target_role=None, job_description=None):
-        """Analyze and provide detailed feedback on the skills section of the CV"""
+    def skills_prompt(self, raw_cv_text, target_role=None, job_description=None):
+        """Build the prompt for analyze_skills"""
         role_context = f"for a {target_role} position" if target_role else "for the modern job market"
 
         jd_section = ""
@@ -200,4 +300,4 @@ CV CONTENT TO ANALYZE:
 
 Please provide specific, actionable skills-related feedback. Focus on making the skills section compelling and {"aligned with the job description" if job_description else "relevant"}."""
 
-        return self.llm.invoke(prompt)
+        return prompt
@@ -1,21 +1,172 @@
-from sklearn.metrics.pairwise import cosine_similarity
-from langchain_ollama import OllamaEmbeddings
+import hashlib
+import os
+
 import numpy as np
 
+from . import metrics
+from ._ollama import make_embeddings
+from .bm25 import lexical_scores
+from .scheduler import get_scheduler
+
+# "hybrid" fuses BM25 with embeddings, "dense" is embeddings only, "lexical" is BM25 only (no model call).
+# Hybrid and lexical scores run lower than cosine ones (see bm25.py), so the rating thresholds
+# (0.8 excellent, 0.6 good) only hold for dense, which stays the default.
+MATCH_MODES = ("hybrid", "dense", "lexical")
+DEFAULT_MODE = os.environ.get("CV_MATCH_MODE", "dense")
+DEFAULT_LEXICAL_WEIGHT = float(os.environ.get("CV_LEXICAL_WEIGHT", "0.3"))
+
+
+def cosine_scores(query_vec, doc_vecs):
+    """Cosine similarity of one query vector against each row of doc_vecs"""
+    query = np.asarray(query_vec, dtype=np.float32)
+    docs = np.asarray(doc_vecs, dtype=np.float32)
+    if docs.ndim == 1:
+        docs = docs.reshape(1, -1)
+    denom = np.linalg.norm(docs, axis=1) * np.linalg.norm(query)
+    denom[denom == 0] = 1.0
+    return (docs @ query) / denom
+
+
+def fuse_scores(dense, lexical, lexical_weight: float = DEFAULT_LEXICAL_WEIGHT) -> np.ndarray:
+    """Weighted sum of per-chunk cosine and normalised BM25 scores"""
+    return (1 - lexical_weight) * np.asarray(dense, dtype=np.float32) + lexical_weight * np.asarray(lexical, dtype=np.float32)
+
+
+def match_result(mode: str, dense=None, lexical=None, lexical_weight: float = DEFAULT_LEXICAL_WEIGHT, **extra):
+    """Match result dict from the per-chunk component scores computed for mode"""
+    if mode == "hybrid":
+        similarities = [float(s) for s in fuse_scores(dense, lexical, lexical_weight)]
+    else:
+        similarities = [float(s) for s in (dense if mode == "dense" else lexical)]
+    result = {
+        "similarity_scores": similarities,
+        "max_score": max(similarities),
+        "avg_score": float(np.mean(similarities)),
+        "mode": mode,
+    }
+    if dense is not None:
+        result["dense_scores"] = [float(s) for s in dense]
+    if lexical is not None:
+        result["lexical_scores"] = list(lexical)
+    result.update(extra)
+    metrics.incr("matches", mode=mode)
+    return result
+
+
 class JDMatcherAgent:
-    def __init__(self):
-        self.embedder = OllamaEmbeddings(model="nomic-embed-text")
-
-    def match(self, cv_chunks, job_description):
-        cv_embeddings = self.embedder.embed_documents(cv_chunks)
-        jd_embedding = self.embedder.embed_query(job_description)
-
-        similarities = [cosine_similarity([jd_embedding], [vec])[0][0] for vec in cv_embeddings]
-        max_score = max(similarities)
-        avg_score = float(np.mean(similarities))
-
-        return {
-            "similarity_scores": similarities,
-            "max_score": max_score,
-            "avg_score": avg_score
-        }
\ No newline at end of file
+    def __init__(self, model_name: str = "nomic-embed-text", batched: bool = True, vector_store=None,
+                 mode: str = DEFAULT_MODE, lexical_weight: float = DEFAULT_LEXICAL_WEIGHT,
+                 embed_timeout: float = None):
+        """
+        Args:
+            model_name: Ollama embedding model
+            batched: Route embeddings through the process-wide batcher shared by all sessions
+            vector_store: Optional services.vector_store.VectorStore for this model; chunk vectors
+                are persisted there (quantized) and CVs already stored only need the JD embedded
+            mode: Default match mode, one of MATCH_MODES
+            lexical_weight: Share of the BM25 score in hybrid scores
+            embed_timeout: Seconds a hybrid match waits for embeddings (batched only) before
+                falling back to lexical scores; None waits indefinitely
+        """
+        if mode not in MATCH_MODES:
+            raise ValueError(f"mode must be one of {', '.join(MATCH_MODES)}")
+        self.model_name = model_name
+        self.vector_store = vector_store
+        self.mode = mode
+        self.lexical_weight = lexical_weight
+        self.embed_timeout = embed_timeout
+        if batched:
+            from .embedding_batcher import get_batcher
+
+            self.embedder = get_batcher(model_name)
+        else:
+            self.embedder = make_embeddings(model_name)
+
+    def store_key(self, cv_chunks) -> str:
+        """Vector store key of a chunk list: the same chunks embedded by the same model share it"""
+        digest = hashlib.blake2b(self.model_name.encode(), digest_size=16)
+        for chunk in cv_chunks:
+            digest.update(b"\0" + chunk.encode())
+        return digest.hexdigest()
+
+    def _embed(self, texts):
+        if hasattr(self.embedder, "submit"):
+            return self.embedder.submit(texts).result(timeout=self.embed_timeout)
+        # Unbatched calls take their own "embed" scheduler slot (the batcher schedules whole batches)
+        with get_scheduler("embed").slot():
+            return self.embedder.embed_documents(texts)
+
+    def index(self, cv_chunks) -> bool:
+        """
+        Embed a CV's chunks before any job description is known, so a later match only embeds the JD
+
+        Chunk vectors go into the vector store, or only into the batcher's embedding cache without one.
+        Returns False when the chunks were already stored.
+        """
+        cv_chunks = list(cv_chunks)
+        store_key = self.store_key(cv_chunks) if self.vector_store is not None else None
+        if store_key is not None and store_key in self.vector_store:
+            return False
+        with metrics.timed("embedding"):
+            vectors = self._embed(cv_chunks)
+        if store_key is not None:
+            self.vector_store.add(store_key, vectors)
+        return True
+
+    def dense_scores(self, cv_chunks, job_description):
+        """Cosine similarity of the JD embedding against each chunk embedding"""
+        cv_chunks = list(cv_chunks)
+        store_key = self.store_key(cv_chunks) if self.vector_store is not None else None
+        if store_key is not None and store_key in self.vector_store:
+            metrics.incr("vector_store_hits")
+            with metrics.timed("embedding"):
+                jd_embedding = self._embed([job_description])[0]
+        else:
+            # The JD goes in the same request as the chunks (for Ollama, embed_query
+            # is embed_documents([text])[0]), so a match is a single embedding call
+            with metrics.timed("embedding"):
+                vectors = self._embed(cv_chunks + [job_description])
+            cv_embeddings, jd_embedding = vectors[:-1], vectors[-1]
+            if store_key is not None:
+                self.vector_store.add(store_key, cv_embeddings)
+
+        with metrics.timed("similarity"):
+            if store_key is not None:
+                # Score on the stored (quantized) form, so a CV scores the same whether or not it was stored before
+                return self.vector_store.scores(store_key, jd_embedding)
+            return cosine_scores(jd_embedding, cv_embeddings)
+
+    def match(self, cv_chunks, job_description, chunk_terms=None, mode: str = None):
+        """
+        Score the CV chunks against a job description
+
+        Args:
+            cv_chunks: Chunk texts
+            job_description: Job description text
+            chunk_terms: The parse result's "chunk_terms" (BM25 term counts); computed from the chunks if omitted
+            mode: Overrides the agent's default mode; "hybrid" falls back to "lexical" when embedding fails
+
+        Returns:
+            Dictionary with similarity_scores (per chunk), max_score, avg_score, the mode actually used,
+            and dense_scores / lexical_scores for the components that were computed
+        """
+        cv_chunks = list(cv_chunks)
+        mode = mode or self.mode
+        if mode not in MATCH_MODES:
+            raise ValueError(f"mode must be one of {', '.join(MATCH_MODES)}")
+        dense = lexical = None
+        extra = {}
+        if mode != "lexical":
+            try:
+                dense = self.dense_scores(cv_chunks, job_description)
+            except Exception as e:
+                if mode == "dense":
+                    raise
+                # The embedding server is down or too busy; lexical scores need no model
+                metrics.incr("lexical_fallbacks")
+                extra["fallback_reason"] = str(e) or type(e).__name__
+                mode = "lexical"
+        if mode != "dense":
+            with metrics.timed("lexical"):
+                lexical = lexical_scores(job_description, cv_chunks, chunk_terms)
+        return match_result(mode, dense, lexical, self.lexical_weight, **extra)
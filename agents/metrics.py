@@ -0,0 +1,160 @@
+"""Process-wide latency and counter metrics for the agents and dashboard.
+
+Stages are timed with ``timed("stage")`` and events counted with
+``incr("name")``. Each histogram keeps a bounded window of recent samples, so
+p50/p95 follow current behaviour and memory stays constant. ``to_prometheus()``
+renders everything in the Prometheus text exposition format.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_WINDOW = 2048
+QUANTILES = (0.5, 0.95)
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(label_key: Tuple, extra: Optional[Dict] = None) -> str:
+    pairs = list(label_key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Histogram:
+    """Latency histogram over a sliding window of samples (seconds)"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[idx]
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "cv_analyzer", window: int = DEFAULT_WINDOW):
+        self.prefix = prefix
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple], float] = {}
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one duration sample for stage name"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(self.window)
+            hist.observe(seconds)
+
+    def incr(self, name: str, amount: float = 1, **labels):
+        """Increment counter name"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set gauge name to value"""
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    @contextmanager
+    def timed(self, name: str, **labels):
+        """Time the enclosed block; failures are counted as <name>_errors"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incr(f"{name}_errors", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """Return a point-in-time copy of all metrics for display"""
+        with self._lock:
+            stages = []
+            for (name, label_key), hist in sorted(self._histograms.items()):
+                stages.append({
+                    "stage": name,
+                    "labels": dict(label_key),
+                    "count": hist.count,
+                    "mean_ms": hist.total / hist.count * 1000 if hist.count else 0.0,
+                    "p50_ms": (hist.quantile(0.5) or 0.0) * 1000,
+                    "p95_ms": (hist.quantile(0.95) or 0.0) * 1000,
+                })
+            counters = [
+                {"counter": name, "labels": dict(label_key), "value": value}
+                for (name, label_key), value in sorted(self._counters.items())
+            ]
+            gauges = [
+                {"gauge": name, "labels": dict(label_key), "value": value}
+                for (name, label_key), value in sorted(self._gauges.items())
+            ]
+        return {"stages": stages, "counters": counters, "gauges": gauges}
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, label_key), hist in sorted(self._histograms.items()):
+                metric = f"{self.prefix}_{name}_seconds"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} summary")
+                    seen.add(metric)
+                for q in QUANTILES:
+                    value = hist.quantile(q)
+                    if value is not None:
+                        lines.append(f"{metric}{_format_labels(label_key, {'quantile': q})} {value:.6f}")
+                lines.append(f"{metric}_sum{_format_labels(label_key)} {hist.total:.6f}")
+                lines.append(f"{metric}_count{_format_labels(label_key)} {hist.count}")
+            for (name, label_key), value in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}_total"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} counter")
+                    seen.add(metric)
+                lines.append(f"{metric}{_format_labels(label_key)} {value:g}")
+            for (name, label_key), value in sorted(self._gauges.items()):
+                metric = f"{self.prefix}_{name}"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} gauge")
+                    seen.add(metric)
+                lines.append(f"{metric}{_format_labels(label_key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry used by all agents in this process
+REGISTRY = MetricsRegistry()
+
+observe = REGISTRY.observe
+incr = REGISTRY.incr
+set_gauge = REGISTRY.set_gauge
+timed = REGISTRY.timed
+snapshot = REGISTRY.snapshot
+to_prometheus = REGISTRY.to_prometheus
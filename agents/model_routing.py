@@ -0,0 +1,75 @@
+"""Model routing for LLM analyses by review depth.
+
+A quick review does not need the model, prompt or output length of a detailed
+analysis. Each depth maps to a route: the model to call (None keeps the
+agent's own model), a cap on generated tokens (Ollama's num_predict), how many
+characters of CV text go into the prompt, and whether the short or the full
+prompt is used. With a short prompt, the context is the CV chunks most
+relevant to the target role (BM25 over the parsed chunks) instead of the first
+characters of the text.
+
+The defaults can be overridden per depth with CV_MODEL_ROUTES, e.g.
+    CV_MODEL_ROUTES='{"quick": {"model": "qwen2.5:1.5b", "num_predict": 256}}'
+"""
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+DEPTHS = ("quick", "detailed")
+DEFAULT_DEPTH = "detailed"
+
+
+class Route(NamedTuple):
+    model: Optional[str]  # None: the agent's configured model
+    num_predict: Optional[int]  # None: no cap
+    context_chars: int
+    prompt: str  # "short" or "full"
+
+
+DEFAULT_ROUTES = {
+    "quick": Route(model="llama3.2:1b", num_predict=384, context_chars=1500, prompt="short"),
+    "detailed": Route(model=None, num_predict=None, context_chars=3000, prompt="full"),
+}
+
+
+def load_routes(overrides: Optional[str] = None) -> Dict[str, Route]:
+    """DEFAULT_ROUTES with the fields given in a JSON object (CV_MODEL_ROUTES by default) replaced"""
+    overrides = os.environ.get("CV_MODEL_ROUTES") if overrides is None else overrides
+    routes = dict(DEFAULT_ROUTES)
+    for depth, fields in (json.loads(overrides) if overrides else {}).items():
+        if depth not in routes:
+            raise ValueError(f"Unknown review depth {depth!r}; choose one of {', '.join(DEPTHS)}")
+        routes[depth] = routes[depth]._replace(**fields)
+    return routes
+
+
+def relevant_context(text: str, max_chars: int, query: Optional[str] = None,
+                     chunks: Optional[List[str]] = None, chunk_terms: Optional[List[Dict[str, int]]] = None) -> str:
+    """
+    Up to max_chars of CV text for a prompt
+
+    Args:
+        text: Full CV text
+        max_chars: Character budget
+        query: What the analysis is about (e.g. the target role); chunks are ranked against it with BM25
+        chunks: Parsed CV chunks; without them (or a query) the text is cut at max_chars
+        chunk_terms: Stored term counts of the chunks
+    """
+    if len(text) <= max_chars or not chunks or not query:
+        return text[:max_chars]
+    from .bm25 import lexical_scores
+
+    scores = lexical_scores(query, chunks, chunk_terms)
+    # The chunk holding the CV's first line (name, contact details) is always kept. Section chunking
+    # groups text by section and puts the unlabelled header lines last, so it is found by content
+    first_line = next((line.strip() for line in text.splitlines() if line.strip()), "")
+    opening = next((i for i, chunk in enumerate(chunks) if first_line and first_line in chunk), 0)
+    ranked = [opening] + sorted((i for i in range(len(chunks)) if i != opening), key=lambda i: -scores[i])
+    chosen, used = [], 0
+    for i in ranked:
+        if used + len(chunks[i]) > max_chars:
+            continue
+        chosen.append(i)
+        used += len(chunks[i])
+    # Chunks go back into the parser's order so sections read as they do in the parsed CV
+    return "\n...\n".join(chunks[i] for i in sorted(chosen)) or text[:max_chars]
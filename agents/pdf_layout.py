@@ -0,0 +1,150 @@
+"""Layout-aware text extraction for multi-column CVs.
+
+pypdf's default extraction emits text in content-stream order, so the lines of
+a two-column CV come out with the sidebar and the main column interleaved.
+page_text() rebuilds reading order per page:
+
+1. Fast path: the page is extracted normally while a visitor records where
+   every text-show operator starts and roughly ends. Unless several rows have
+   two runs separated by a wide horizontal gap, the page is single-column and
+   the plain text is returned as is.
+2. Otherwise the page is re-extracted with pypdf's layout mode (a fixed-width
+   rendering that keeps columns side by side), each line is split at the
+   gutter, and the page is emitted band by band: lines that span the gutter
+   (headers, full-width sections) separate bands, and within a band the left
+   column is emitted before the right one.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from . import metrics
+
+_SHOW_OPS = (b"Tj", b"TJ", b"'", b'"')
+# Average glyph width in ems, used to estimate where a text run ends
+_AVG_CHAR_WIDTH = 0.5
+# A horizontal gap wider than this many ems between two runs on a row looks like a gutter
+_MIN_GUTTER_EMS = 2.0
+# Rows with a gutter (or column lines) needed before a page is treated as multi-column
+_MIN_COLUMN_ROWS = 3
+# Right-hand parts shorter than this are aligned dates or page numbers, not a column of text
+_MIN_COLUMN_CHARS = 20
+_LAYOUT_GAP_RE = re.compile(r" {3,}")
+
+
+def _median(values: List[int]) -> int:
+    return sorted(values)[len(values) // 2]
+
+
+def _text_length(op: bytes, args) -> int:
+    if op == b"TJ":
+        return sum(len(item) for item in args[0] if isinstance(item, (str, bytes)))
+    text = args[-1] if args else ""
+    return len(text) if isinstance(text, (str, bytes)) else 0
+
+
+def _text_runs(page) -> Tuple[str, List[Tuple[float, float, float, float]]]:
+    """Plain page text plus (x, y, estimated end x, em size) of every text-show operation"""
+    runs = []
+    font_size = [1.0]
+
+    def visitor(op, args, cm, tm):
+        if op == b"Tf" and len(args) == 2:
+            font_size[0] = float(args[1])
+        elif op in _SHOW_OPS:
+            x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+            y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+            em = abs(font_size[0] * tm[0] * cm[0]) or font_size[0]
+            runs.append((x, y, x + _text_length(op, args) * em * _AVG_CHAR_WIDTH, em))
+
+    return page.extract_text(visitor_operand_before=visitor), runs
+
+
+def is_multi_column(runs, page_width: float) -> bool:
+    """True when enough rows hold two text runs separated by a gutter-wide gap"""
+    if not runs:
+        return False
+    left_margin = min(run[0] for run in runs)
+    rows = {}
+    for run in runs:
+        rows.setdefault(round(run[1]), []).append(run)
+    split_rows = 0
+    for row in rows.values():
+        row.sort()
+        for prev, nxt in zip(row, row[1:]):
+            if nxt[0] - prev[2] > _MIN_GUTTER_EMS * prev[3] and nxt[0] > left_margin + 0.2 * page_width:
+                split_rows += 1
+                break
+    return split_rows >= _MIN_COLUMN_ROWS
+
+
+def _split_line(line: str, boundary: int, tolerance: int):
+    """(left, right) parts of a layout line, or None when the line spans the gutter"""
+    stripped = line.strip()
+    if not stripped:
+        return "", ""
+    indent = len(line) - len(line.lstrip())
+    if indent >= boundary - tolerance:
+        return "", stripped
+    gaps = [m for m in _LAYOUT_GAP_RE.finditer(line, indent) if abs(m.end() - boundary) <= tolerance]
+    if gaps:
+        gap = min(gaps, key=lambda m: abs(m.end() - boundary))
+        return line[:gap.start()].strip(), line[gap.end():].strip()
+    if len(line.rstrip()) <= boundary + tolerance:
+        return stripped, ""
+    return None
+
+
+def reading_order(layout_text: str) -> Optional[str]:
+    """
+    Rebuild reading order from pypdf layout-mode text of a two-column page
+
+    Returns:
+        Text with each column band emitted left then right, or None when the
+        page does not actually have a text column on the right
+    """
+    lines = layout_text.splitlines()
+    width = max((len(line.rstrip()) for line in lines), default=0)
+    column_starts = []
+    for line in lines:
+        indent = len(line) - len(line.lstrip())
+        if not line.strip():
+            continue
+        if indent >= 0.2 * width:
+            column_starts.append(indent)
+            continue
+        gap = _LAYOUT_GAP_RE.search(line, indent)
+        if gap and gap.end() < len(line.rstrip()):
+            column_starts.append(gap.end())
+    if len(column_starts) < _MIN_COLUMN_ROWS:
+        return None
+    boundary = _median(column_starts)
+    # Fixed-width rendering drifts by a few characters from line to line
+    tolerance = max(4, width // 10)
+
+    parts = [_split_line(line, boundary, tolerance) for line in lines]
+    right_lengths = [len(part[1]) for part in parts if part and part[1]]
+    if len(right_lengths) < _MIN_COLUMN_ROWS or _median(right_lengths) < _MIN_COLUMN_CHARS:
+        return None
+
+    out, left, right = [], [], []
+    for line, part in zip(lines, parts):
+        if part is None:
+            out += left + right + [line.strip()]
+            left, right = [], []
+        else:
+            left.append(part[0])
+            right.append(part[1])
+    out += left + right
+    return "\n".join(line for line in out if line)
+
+
+def page_text(page) -> str:
+    """Page text in reading order; single-column pages skip the layout analysis"""
+    text, runs = _text_runs(page)
+    if not is_multi_column(runs, float(page.mediabox.width)):
+        metrics.incr("layout_pages", path="single_column")
+        return text
+    with metrics.timed("layout_analysis"):
+        ordered = reading_order(page.extract_text(extraction_mode="layout", layout_mode_space_vertically=False))
+    metrics.incr("layout_pages", path="multi_column" if ordered is not None else "rejected")
+    return text if ordered is None else ordered
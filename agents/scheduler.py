@@ -0,0 +1,185 @@
+"""Admission control for Ollama calls, shared by every session in a process.
+
+Ollama runs OLLAMA_NUM_PARALLEL requests per model at once and queues the
+rest first come, first served, so a 200-CV batch or a final verdict can put
+every interactive user behind it. All generation and embedding calls go
+through a scheduler instead, one per kind of work ("llm", "embed"):
+
+- at most `slots` calls of the kind are in flight (match it to the server's
+  parallel slots, so requests wait here, where they can be reordered, rather
+  than inside Ollama);
+- waiting interactive calls are always admitted before batch calls, and batch
+  work never holds more than `batch_slots` slots, so a slot stays free for
+  the next interactive call;
+- within a priority class, users (dashboard sessions, API clients, job
+  sessions) take turns, so one user's burst does not delay everyone else's.
+
+Callers tag their work with scheduling(priority, user); the tag follows the
+call through context variables (including asyncio.to_thread). Untagged work
+is interactive. Limits apply per process: worker processes only run batch
+work, so give them CV_LLM_BATCH_SLOTS / CV_EMBED_BATCH_SLOTS that leave the
+server room for the dashboard and API.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from . import metrics
+
+PRIORITIES = ("interactive", "batch")
+KINDS = ("llm", "embed")
+# Per endpoint: with an endpoint pool (endpoint_pool.py) the limit grows with the endpoints of the kind
+DEFAULT_SLOTS = {
+    "llm": int(os.environ.get("CV_LLM_SLOTS", os.environ.get("OLLAMA_NUM_PARALLEL", "2"))),
+    "embed": int(os.environ.get("CV_EMBED_SLOTS", os.environ.get("CV_EMBED_CONCURRENT_BATCHES", "2"))),
+}
+# Default (unset): all but one slot, so batch load always leaves room for an interactive call
+_BATCH_SLOTS = {
+    "llm": os.environ.get("CV_LLM_BATCH_SLOTS"),
+    "embed": os.environ.get("CV_EMBED_BATCH_SLOTS"),
+}
+
+_current = contextvars.ContextVar("cv_scheduling", default=("interactive", None))
+
+
+def current() -> Tuple[str, Optional[str]]:
+    """(priority, user) the calling context is tagged with"""
+    return _current.get()
+
+
+def bind(user: Optional[str] = None, priority: str = "interactive") -> None:
+    """Tag the rest of the current context (e.g. a dashboard rerun) with user and priority"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    _current.set((priority, user))
+
+
+@contextmanager
+def scheduling(priority: str = "interactive", user: Optional[str] = None):
+    """Tag the Ollama calls made inside the block; user defaults to the enclosing tag's user"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    token = _current.set((priority, user if user is not None else current()[1]))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class _Ticket:
+    __slots__ = ("priority", "user", "granted")
+
+    def __init__(self, priority: str, user: Optional[str]):
+        self.priority = priority
+        self.user = user
+        self.granted = False
+
+
+class Scheduler:
+    def __init__(self, kind: str, slots: int, batch_slots: Optional[int] = None):
+        """
+        Priority and per-user fair queue in front of one kind of Ollama call
+
+        Args:
+            kind: Label of the metrics ("llm" or "embed")
+            slots: Calls in flight at once
+            batch_slots: Most slots batch calls may hold; defaults to slots - 1 (at least 1)
+        """
+        self.kind = kind
+        self.slots = max(1, slots)
+        self.batch_slots = max(1, self.slots - 1 if batch_slots is None else min(batch_slots, self.slots))
+        self._cond = threading.Condition()
+        # priority -> user -> waiting tickets; the user order is the round-robin order
+        self._waiting: Dict[str, "OrderedDict[Optional[str], deque]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._active = {p: 0 for p in PRIORITIES}
+
+    def _next(self) -> Optional[_Ticket]:
+        for priority in PRIORITIES:
+            users = self._waiting[priority]
+            if not users or (priority == "batch" and self._active["batch"] >= self.batch_slots):
+                continue
+            user, tickets = next(iter(users.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                users.move_to_end(user)
+            else:
+                del users[user]
+            return ticket
+        return None
+
+    def _dispatch(self):
+        granted = False
+        while sum(self._active.values()) < self.slots:
+            ticket = self._next()
+            if ticket is None:
+                break
+            ticket.granted = granted = True
+            self._active[ticket.priority] += 1
+        if granted:
+            self._cond.notify_all()
+        self._publish()
+
+    def _publish(self):
+        for priority in PRIORITIES:
+            metrics.set_gauge("scheduler_waiting", sum(map(len, self._waiting[priority].values())),
+                              kind=self.kind, priority=priority)
+            metrics.set_gauge("scheduler_active", self._active[priority], kind=self.kind, priority=priority)
+
+    def acquire(self, priority: Optional[str] = None, user: Optional[str] = None) -> _Ticket:
+        """Block until a slot is free for this call; priority and user default to the context's tag"""
+        tag_priority, tag_user = current()
+        ticket = _Ticket(priority or tag_priority, user if user is not None else tag_user)
+        started = time.perf_counter()
+        with self._cond:
+            self._waiting[ticket.priority].setdefault(ticket.user, deque()).append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                self._cond.wait()
+        metrics.observe("scheduler_wait", time.perf_counter() - started, kind=self.kind, priority=ticket.priority)
+        return ticket
+
+    def release(self, ticket: _Ticket) -> None:
+        with self._cond:
+            self._active[ticket.priority] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, user: Optional[str] = None):
+        """Hold a slot for the duration of the block"""
+        ticket = self.acquire(priority, user)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def status(self) -> Dict:
+        with self._cond:
+            return {
+                "slots": self.slots,
+                "batch_slots": self.batch_slots,
+                "active": dict(self._active),
+                "waiting": {p: sum(map(len, users.values())) for p, users in self._waiting.items()},
+            }
+
+
+_schedulers: Dict[str, Scheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(kind: str) -> Scheduler:
+    """Return the process-wide scheduler for kind ("llm" or "embed"), creating it on first use"""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(kind)
+        if scheduler is None:
+            from .endpoint_pool import get_pool
+
+            pool = get_pool()
+            slots = DEFAULT_SLOTS[kind] * (max(1, pool.role_size("generate" if kind == "llm" else "embed"))
+                                           if pool is not None else 1)
+            batch_slots = _BATCH_SLOTS[kind]
+            scheduler = _schedulers[kind] = Scheduler(kind, slots, int(batch_slots) if batch_slots else None)
+        return scheduler
@@ -1,16 +1,20 @@
-from langchain_ollama import OllamaLLM
+from ._ollama import generate_text, make_llm
 
 class SummaryAgent:
     def __init__(self, model_name: str = "llama3.2"):
         self.model_name = model_name
-        self.llm = OllamaLLM(model=model_name)
+        self.llm = make_llm(model_name)
 
     def update_model(self, model_name: str):
         """Update the LLM model being used"""
         self.model_name = model_name
-        self.llm = OllamaLLM(model=model_name)
+        self.llm = make_llm(model_name)
 
     def generate_summary(self, cv_text):
+        return generate_text(self.llm, self.summary_prompt(cv_text), operation="generate_summary")
+
+    def summary_prompt(self, cv_text):
+        """Build the candidate evaluation prompt"""
         prompt = f"""You are an expert technical recruiter with 10+ years of experience evaluating candidates across various industries.
 
     Create a comprehensive candidate evaluation report based on the resume below. Be objective, thorough, and provide actionable insights.
@@ -112,4 +116,4 @@ class SummaryAgent:
 
     Generate a thorough evaluation following the structure above. Be specific and provide evidence from the resume for your assessments."""
         
-        return self.llm.invoke(prompt)
\ No newline at end of file
+        return prompt
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""Local token counting, for sizing chunks to the embedding model's context window.
+
+Ollama has no tokenize endpoint, and an embedding model silently truncates
+input beyond its context window, so chunks are measured locally:
+
+- with CV_TOKENIZER pointing at a Hugging Face tokenizer.json (e.g. the BERT
+  WordPiece vocabulary of nomic-embed-text) and the `tokenizers` package
+  installed, counts are exact;
+- otherwise tiktoken's cl100k_base is used when tiktoken is installed;
+- otherwise a built-in estimate splits text the way WordPiece pre-tokenizes it
+  (words, numbers, each punctuation mark) and charges long words one extra
+  token per four characters.
+
+Only exact counts may fill the whole context window: usable_context() keeps a
+margin below it for the approximate ones.
+"""
+import math
+import os
+import re
+import threading
+from typing import Dict, Optional
+
+# Context window (tokens) Ollama runs each embedding model with; the name is matched without its tag
+EMBED_CONTEXT = {
+    "nomic-embed-text": 2048,
+    "mxbai-embed-large": 512,
+    "snowflake-arctic-embed": 512,
+    "bge-large": 512,
+    "bge-m3": 8192,
+    "all-minilm": 256,
+}
+DEFAULT_CONTEXT = 512
+# Share of the context window chunks may fill when counts are approximate
+APPROXIMATE_MARGIN = 0.8
+
+_PRETOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+
+
+class Tokenizer:
+    def __init__(self, name: str, exact: bool, encode=None):
+        """
+        Args:
+            name: Reported in chunk stats
+            exact: Whether counts match the embedding model's tokenizer
+            encode: text -> token list; None uses the built-in estimate
+        """
+        self.name = name
+        self.exact = exact
+        self._encode = encode
+
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        if self._encode is not None:
+            return len(self._encode(text))
+        tokens = 0
+        for piece in _PRETOKEN_PATTERN.findall(text):
+            # Common words are one vocabulary entry; rarer long ones split into several word pieces
+            tokens += 1 if len(piece) <= 6 else 1 + math.ceil((len(piece) - 6) / 4)
+        return tokens
+
+
+def _load_tokenizer() -> Tokenizer:
+    path = os.environ.get("CV_TOKENIZER")
+    if path:
+        try:
+            from tokenizers import Tokenizer as HFTokenizer
+
+            hf = HFTokenizer.from_file(path)
+            return Tokenizer(os.path.basename(path), True,
+                             lambda text: hf.encode(text, add_special_tokens=False).ids)
+        except Exception:
+            # A missing package or unreadable file falls through to the next option
+            pass
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return Tokenizer("cl100k_base", False, lambda text: encoding.encode(text, disallowed_special=()))
+    except Exception:
+        return Tokenizer("estimate", False)
+
+
+_tokenizer: Optional[Tokenizer] = None
+_tokenizer_lock = threading.Lock()
+
+
+def get_tokenizer() -> Tokenizer:
+    """The process-wide tokenizer, loaded on first use"""
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            _tokenizer = _load_tokenizer()
+        return _tokenizer
+
+
+def context_window(model: str) -> int:
+    """Context window of an embedding model: CV_EMBED_CONTEXT, the EMBED_CONTEXT table or DEFAULT_CONTEXT"""
+    override = os.environ.get("CV_EMBED_CONTEXT")
+    if override:
+        return int(override)
+    return EMBED_CONTEXT.get(model.split(":")[0], DEFAULT_CONTEXT)
+
+
+def usable_context(model: str, tokenizer: Optional[Tokenizer] = None) -> int:
+    """Most tokens a chunk may have for model, keeping a margin when counts are approximate"""
+    tokenizer = tokenizer or get_tokenizer()
+    window = context_window(model)
+    return window if tokenizer.exact else int(window * APPROXIMATE_MARGIN)
+
+
+def token_stats(chunks, model: str, tokenizer: Optional[Tokenizer] = None) -> Dict:
+    """Chunk count and token statistics of a chunking, as stored in parse results under "chunk_stats\""""
+    tokenizer = tokenizer or get_tokenizer()
+    counts = [tokenizer.count(chunk) for chunk in chunks]
+    window = context_window(model)
+    return {
+        "count": len(counts),
+        "tokens_total": sum(counts),
+        "tokens_min": min(counts, default=0),
+        "tokens_mean": round(sum(counts) / len(counts), 1) if counts else 0.0,
+        "tokens_max": max(counts, default=0),
+        "context_window": window,
+        # Chunks the embedding model would truncate
+        "over_context": sum(count > window for count in counts),
+        "tokenizer": tokenizer.name,
+    }
@@ -0,0 +1,217 @@
+"""Model warm-up and keep-alive.
+
+Ollama loads a model on its first request and unloads it after the request's
+keep_alive (5 minutes unless set), so the first analysis after a deploy or an
+idle spell pays several seconds of load time. The warmer loads every
+configured generation and embedding model in the background when the agents
+are created, with CV_OLLAMA_KEEP_ALIVE (also sent with every regular request,
+see _ollama.py), and repeats that every CV_WARMUP_INTERVAL seconds, which
+keeps the models resident and reloads them after a server restart.
+
+Warm-ups go to OLLAMA_HOST, or to every endpoint of the pool that serves the
+model (endpoint_pool.py). They bypass the scheduler: a load request generates
+nothing. status() reports per model and endpoint whether it is ready and how
+long loading took. The built-in model of a routed review depth (model_routing.py)
+may not be pulled on every server, so it is warmed but does not count towards
+ready() unless CV_MODEL_ROUTES names it explicitly.
+"""
+import ipaddress
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import metrics
+from ._ollama import KEEP_ALIVE
+from .model_routing import DEFAULT_ROUTES
+
+DEFAULT_INTERVAL = float(os.environ.get("CV_WARMUP_INTERVAL", "600"))
+# A cold load of a large model on a busy box can take a while
+DEFAULT_TIMEOUT = float(os.environ.get("CV_WARMUP_TIMEOUT", "120"))
+
+
+def default_host(host: Optional[str] = None) -> str:
+    """
+    Base URL of OLLAMA_HOST, resolved the way the ollama client does
+
+    Args:
+        host: e.g. "gpu-1", "0.0.0.0:11434", "https://ollama.example.com" or "[::1]:11434";
+            defaults to OLLAMA_HOST. The scheme defaults to http and the port to 11434,
+            or to 80/443 when only an http/https scheme is given
+    """
+    host = os.environ.get("OLLAMA_HOST", "") if host is None else host
+    scheme, _, hostport = host.partition("://")
+    port = 11434
+    if not hostport:
+        scheme, hostport = "http", host
+    elif scheme in ("http", "https"):
+        port = 80 if scheme == "http" else 443
+    split = urlsplit(f"{scheme}://{hostport}")
+    name = split.hostname or "127.0.0.1"
+    try:
+        if isinstance(ipaddress.ip_address(name), ipaddress.IPv6Address):
+            name = f"[{name}]"
+    except ValueError:
+        pass
+    url = f"{scheme}://{name}:{split.port or port}"
+    path = split.path.strip("/")
+    return f"{url}/{path}" if path else url
+
+
+class ModelWarmer:
+    def __init__(self, generate_models: Iterable[str], embed_models: Iterable[str] = (),
+                 optional_models: Iterable[str] = (), keep_alive=KEEP_ALIVE,
+                 interval: float = DEFAULT_INTERVAL, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Args:
+            generate_models: Text-generation models to keep loaded
+            embed_models: Embedding models to keep loaded
+            optional_models: Text-generation models that are warmed when available but do not count towards ready()
+            keep_alive: How long Ollama keeps a model after a request (duration string or seconds, -1 = forever)
+            interval: Seconds between warm-up rounds; keep it below keep_alive
+            timeout: Seconds one load request may take
+        """
+        # Embedding models are small and needed for every match, so they load first
+        self.models = [(model, "embed") for model in dict.fromkeys(embed_models)]
+        self.models += [(model, "generate") for model in dict.fromkeys(generate_models)]
+        required = {model for model, _ in self.models}
+        self.optional = [model for model in dict.fromkeys(optional_models) if model not in required]
+        self.models += [(model, "generate") for model in self.optional]
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.timeout = timeout
+        self._status: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._first_round = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def for_agents(cls, agents: Iterable, **kwargs) -> "ModelWarmer":
+        """
+        Warmer for the models of the given agents: embedders, LLMs and the LLMs of routed review depths
+
+        A route still on its built-in model is optional: the agent falls back to its own model when
+        that one is not pulled, so a missing default route model should not keep ready() False.
+        """
+        generate, embed, optional = [], [], []
+        for agent in agents:
+            if hasattr(agent, "embedder"):
+                embed.append(agent.model_name)
+            elif hasattr(agent, "llm"):
+                generate.append(agent.model_name)
+                for depth, route in getattr(agent, "routes", {}).items():
+                    if not route.model:
+                        continue
+                    built_in = depth in DEFAULT_ROUTES and route.model == DEFAULT_ROUTES[depth].model
+                    (optional if built_in else generate).append(route.model)
+        return cls(generate, embed, optional, **kwargs)
+
+    def targets(self) -> List[Tuple[str, str, str]]:
+        """(model, role, base URL) of every load request in a round"""
+        from .endpoint_pool import get_pool
+
+        pool = get_pool()
+        if pool is None:
+            return [(model, role, default_host()) for model, role in self.models]
+        return [(model, role, endpoint.url) for model, role in self.models
+                for endpoint in pool.endpoints if endpoint.serves(model, role)]
+
+    def warm(self, model: str, role: str, url: str) -> bool:
+        """Load model on url with the keep-alive; returns whether it is ready"""
+        import httpx
+
+        if role == "embed":
+            path, body = "/api/embed", {"model": model, "input": "warm-up", "keep_alive": self.keep_alive}
+        else:
+            # An empty prompt loads the model without generating
+            path, body = "/api/generate", {"model": model, "prompt": "", "keep_alive": self.keep_alive, "stream": False}
+        started = time.perf_counter()
+        error = load_seconds = None
+        try:
+            response = httpx.post(url + path, json=body, timeout=self.timeout)
+            response.raise_for_status()
+            load_seconds = response.json().get("load_duration", 0) / 1e9
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            metrics.incr("model_warmup_errors", model=model)
+        elapsed = time.perf_counter() - started
+        if error is None:
+            metrics.observe("model_warmup", elapsed, model=model, role=role)
+        metrics.set_gauge("model_ready", float(error is None), model=model, endpoint=url)
+        with self._lock:
+            previous = self._status.get((model, url), {})
+            self._status[(model, url)] = {
+                "model": model,
+                "role": role,
+                "endpoint": url,
+                "ready": error is None,
+                "optional": model in self.optional,
+                # A model that was already resident loads in ~0 s; keep the last real load time
+                "load_ms": round(load_seconds * 1000, 1) if load_seconds else previous.get("load_ms"),
+                "warmup_ms": round(elapsed * 1000, 1),
+                "warmed_at": time.time(),
+                "error": error,
+            }
+        return error is None
+
+    def warm_all(self) -> bool:
+        """One warm-up round over every model and endpoint; returns whether all are ready"""
+        results = [self.warm(*target) for target in self.targets()]
+        self._first_round.set()
+        return all(results)
+
+    def start(self) -> "ModelWarmer":
+        """Warm up in a background thread now and every interval seconds"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="model-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            self.warm_all()
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the first round to finish; returns whether every model is ready"""
+        self._first_round.wait(timeout)
+        return self.ready()
+
+    def ready(self) -> bool:
+        """Whether every required model is loaded on every endpoint that serves it"""
+        with self._lock:
+            required = [entry for entry in self._status.values() if not entry["optional"]]
+        return bool(required) and all(entry["ready"] for entry in required)
+
+    def status(self) -> List[Dict]:
+        """Per model and endpoint: ready, last load time, last warm-up time and error; models not tried yet are pending"""
+        with self._lock:
+            done = dict(self._status)
+        return [done.get((model, url)) or {"model": model, "role": role, "endpoint": url, "ready": False,
+                                           "optional": model in self.optional, "load_ms": None, "warmup_ms": None,
+                                           "warmed_at": None, "error": None}
+                for model, role, url in self.targets()]
+
+
+_warmer: Optional[ModelWarmer] = None
+_warmer_lock = threading.Lock()
+
+
+def start_warmup(agents: Iterable) -> Optional[ModelWarmer]:
+    """Start the process-wide warmer for the agents' models once; None when CV_WARMUP=0"""
+    global _warmer
+    with _warmer_lock:
+        if _warmer is None and os.environ.get("CV_WARMUP", "1") != "0":
+            _warmer = ModelWarmer.for_agents(agents).start()
+        return _warmer
+
+
+def get_warmer() -> Optional[ModelWarmer]:
+    """The warmer started by start_warmup, if any"""
+    return _warmer
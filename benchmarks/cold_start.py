@@ -0,0 +1,95 @@
+"""Measure cold-start import time and memory of the agents and dashboard modules.
+
+Each target is imported in a fresh interpreter so nothing is shared between
+measurements. The script exits non-zero when a target exceeds its budget, so it
+can be run before a release to catch a heavy import sneaking back in.
+
+Usage:
+    python -m benchmarks.cold_start [--repeat 5] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, statement, time budget in ms, peak RSS budget in MB)
+TARGETS = [
+    ("agents", "import agents", 50, 40),
+    ("cv_parser_module", "import agents.cv_parser_agent", 50, 40),
+    ("cv_parser_instance", "from agents import CVParserAgent; CVParserAgent()", 50, 40),
+    ("jd_matcher_module", "import agents.jd_matcher_agent", 250, 60),
+    ("feedback_module", "import agents.feedback_agent", 50, 40),
+    ("summary_module", "import agents.summary_agent", 50, 40),
+]
+
+_PROBE = """
+import resource, sys, time
+t0 = time.perf_counter()
+exec(sys.argv[1])
+elapsed = (time.perf_counter() - t0) * 1000
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss /= 1024
+print(elapsed, rss / 1024)
+"""
+
+
+def measure(statement: str, repeat: int = 5):
+    """Run statement in fresh interpreters and return (median ms, max peak RSS MB)"""
+    times, peaks = [], []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE, statement],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        elapsed_ms, rss_mb = (float(x) for x in out.stdout.split())
+        times.append(elapsed_ms)
+        peaks.append(rss_mb)
+    return statistics.median(times), max(peaks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, statement, time_budget, rss_budget in TARGETS:
+        try:
+            elapsed_ms, rss_mb = measure(statement, args.repeat)
+        except subprocess.CalledProcessError as e:
+            results.append({"target": name, "error": e.stderr.strip().splitlines()[-1]})
+            continue
+        results.append({
+            "target": name,
+            "import_ms": round(elapsed_ms, 2),
+            "peak_rss_mb": round(rss_mb, 1),
+            "time_budget_ms": time_budget,
+            "rss_budget_mb": rss_budget,
+            "ok": elapsed_ms <= time_budget and rss_mb <= rss_budget,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            if "error" in r:
+                print(f"{r['target']:<20} ERROR {r['error']}")
+                continue
+            status = "ok" if r["ok"] else "OVER BUDGET"
+            print(f"{r['target']:<20} {r['import_ms']:>8.1f} ms (budget {r['time_budget_ms']})"
+                  f"  {r['peak_rss_mb']:>6.1f} MB (budget {r['rss_budget_mb']})  {status}")
+
+    return 0 if all(r.get("ok") for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
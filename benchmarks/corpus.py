@@ -0,0 +1,204 @@
+"""Synthetic CV corpus for benchmarks.
+
+CVs are generated from a seeded RNG so every run sees byte-identical PDFs.
+The PDF writer is deliberately minimal (one Helvetica font, one text block per
+page) and has no dependencies, so the corpus can be built on any machine.
+"""
+import os
+import random
+import textwrap
+from itertools import zip_longest
+from typing import Dict, List
+
+FIRST_NAMES = ["Alice", "Bruno", "Chen", "Dana", "Emeka", "Farah", "Gustav", "Hana",
+               "Ivan", "Julia", "Kofi", "Lena", "Mateo", "Nadia", "Omar", "Priya"]
+LAST_NAMES = ["Anderson", "Becker", "Costa", "Dubois", "Evans", "Fischer", "Garcia",
+              "Hughes", "Ito", "Jensen", "Kowalski", "Lopez", "Moreau", "Novak"]
+TITLES = ["Software Engineer", "Data Scientist", "DevOps Engineer", "Product Manager",
+          "Machine Learning Engineer", "Backend Developer", "Frontend Developer"]
+SKILLS = ["Python", "Java", "JavaScript", "TypeScript", "SQL", "React", "Django", "Flask",
+          "AWS", "Azure", "GCP", "Docker", "Kubernetes", "Git", "Jenkins", "TensorFlow",
+          "PyTorch", "Pandas", "NumPy", "Agile", "Scrum", "CI/CD", "REST", "GraphQL", "MongoDB"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries",
+             "Wayne Enterprises", "Hooli", "Vandelay Imports"]
+VERBS = ["Designed", "Built", "Led", "Migrated", "Optimised", "Automated", "Delivered",
+         "Scaled", "Refactored", "Launched"]
+OBJECTS = ["a data pipeline", "the billing service", "an internal API", "the CI/CD platform",
+           "a recommendation model", "the customer dashboard", "a search index",
+           "the event streaming layer", "a feature store", "the mobile backend"]
+OUTCOMES = ["reducing latency by {n}%", "cutting costs by {n}%", "serving {n}k daily users",
+            "improving conversion by {n}%", "saving {n} engineer hours per month"]
+
+JOB_DESCRIPTION = """Senior Software Engineer
+We are looking for an engineer with 5+ years of experience building backend services
+in Python. Required: Python, SQL, Docker, Kubernetes, AWS, REST APIs, CI/CD.
+Preferred: experience with machine learning pipelines, PyTorch or TensorFlow,
+and leading small teams in an Agile environment."""
+
+LINES_PER_PAGE = 48
+
+
+def generate_cv_text(seed: int, pages: int) -> str:
+    """Return a deterministic CV body long enough to fill roughly `pages` pages"""
+    rng = random.Random(seed)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    years = rng.randint(1, 20)
+    skills = rng.sample(SKILLS, rng.randint(5, 12))
+
+    lines = [
+        f"{first} {last}",
+        f"{rng.choice(TITLES)}",
+        f"{first.lower()}.{last.lower()}@example.com | +1-555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+        f"linkedin.com/in/{first.lower()}{last.lower()} | github.com/{first.lower()}{rng.randint(1, 99)}",
+        "",
+        "Professional Summary",
+        f"{rng.choice(TITLES)} with {years} years of experience across {', '.join(skills[:3])}.",
+        "",
+        "Technical Skills",
+        ", ".join(skills),
+        "",
+        "Work Experience",
+    ]
+
+    target_lines = pages * LINES_PER_PAGE
+    while len(lines) < target_lines - 8:
+        lines.append(f"{rng.choice(TITLES)} - {rng.choice(COMPANIES)} ({rng.randint(2005, 2024)})")
+        for _ in range(rng.randint(3, 6)):
+            outcome = rng.choice(OUTCOMES).format(n=rng.randint(5, 90))
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using "
+                         f"{rng.choice(skills)}, {outcome}.")
+        lines.append("")
+
+    lines += [
+        "Education",
+        f"BSc Computer Science, University of {rng.choice(LAST_NAMES)} ({rng.randint(1995, 2020)})",
+        "",
+        "Projects",
+        f"- Open-source contributor to a {rng.choice(skills)} library.",
+    ]
+    return "\n".join(lines[:max(target_lines, len(lines))])
+
+
+def _escape(text: str) -> str:
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def text_to_pdf(text: str, lines_per_page: int = LINES_PER_PAGE) -> bytes:
+    """Render plain text into a minimal multi-page PDF"""
+    lines = text.split("\n")
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    streams = []
+    for page_lines in pages:
+        ops = ["BT", "/F1 10 Tf", "14 TL", "50 760 Td"]
+        for line in page_lines:
+            ops.append(f"({_escape(line)}) Tj T*")
+        ops.append("ET")
+        streams.append("\n".join(ops).encode("latin-1"))
+    return _pdf_from_streams(streams)
+
+
+def _pdf_from_streams(streams: List[bytes]) -> bytes:
+    """Minimal PDF with one Letter page per content stream, using a single Helvetica font"""
+    objects: List[bytes] = []
+    # 1: catalog, 2: pages tree, 3: font; page/content objects follow
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(b"")  # placeholder for pages tree
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for stream in streams:
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def text_to_two_column_pdf(text: str, lines_per_page: int = LINES_PER_PAGE) -> bytes:
+    """Render a generate_cv_text() CV as a sidebar + main column layout
+
+    The header spans the page; summary, skills, education and projects go in
+    a narrow left column and work experience in the right one. Rows are
+    written left then right, as most CV templates do, so content-stream order
+    interleaves the columns.
+    """
+    lines = text.split("\n")
+    header = lines[:4]
+    experience_start = lines.index("Work Experience")
+    education_start = lines.index("Education")
+    sidebar = [wrapped for line in lines[5:experience_start] + [""] + lines[education_start:]
+               for wrapped in (textwrap.wrap(line, 30) or [""])]
+    main = [wrapped for line in lines[experience_start:education_start]
+            for wrapped in (textwrap.wrap(line, 62) or [""])]
+
+    rows_per_page = lines_per_page - len(header) - 2  # every page, so the first one has room for the header
+    pages = []
+    for start in range(0, max(len(sidebar), len(main)), rows_per_page):
+        ops = ["BT", "/F1 10 Tf"]
+        y = 760
+        if not pages:
+            for line in header:
+                ops.append(f"1 0 0 1 50 {y} Tm ({_escape(line)}) Tj")
+                y -= 14
+            y -= 28
+        for left, right in zip_longest(sidebar[start:start + rows_per_page], main[start:start + rows_per_page],
+                                       fillvalue=""):
+            if left:
+                ops.append(f"1 0 0 1 50 {y} Tm ({_escape(left)}) Tj")
+            if right:
+                ops.append(f"1 0 0 1 230 {y} Tm ({_escape(right)}) Tj")
+            y -= 14
+        ops.append("ET")
+        pages.append("\n".join(ops).encode("latin-1"))
+    return _pdf_from_streams(pages)
+
+
+def build_corpus(out_dir: str, page_counts=(1, 2, 5, 10, 30), per_size: int = 3,
+                 seed: int = 1234) -> List[Dict]:
+    """Write the synthetic corpus to out_dir and return its manifest"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    for pages in page_counts:
+        for i in range(per_size):
+            cv_seed = seed + pages * 1000 + i
+            path = os.path.join(out_dir, f"cv_{pages:02d}p_{i}.pdf")
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(text_to_pdf(generate_cv_text(cv_seed, pages)))
+            manifest.append({"path": path, "pages": pages, "seed": cv_seed})
+    return manifest
+
+
+def build_two_column_corpus(out_dir: str, page_counts=(1, 2, 5), per_size: int = 3,
+                            seed: int = 1234) -> List[Dict]:
+    """Write two-column versions of the corpus CVs to out_dir and return their manifest"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    for pages in page_counts:
+        for i in range(per_size):
+            cv_seed = seed + pages * 1000 + i
+            path = os.path.join(out_dir, f"cv_{pages:02d}p_{i}_2col.pdf")
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(text_to_two_column_pdf(generate_cv_text(cv_seed, pages)))
+            manifest.append({"path": path, "pages": pages, "seed": cv_seed, "columns": 2})
+    return manifest
@@ -0,0 +1,608 @@
+"""Offline benchmark suite for the parser, matcher, multi-CV loop and LLM agents.
+
+All model traffic goes to a local stub Ollama server (benchmarks/stub_ollama.py),
+so results are reproducible and do not depend on GPU load. Results are written
+as JSON tagged with the git commit; two result files can be compared with
+``--compare``.
+
+Usage:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --compare base.json head.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from .corpus import JOB_DESCRIPTION, build_corpus, build_two_column_corpus
+from .stub_ollama import StubConfig, StubOllamaServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(samples, units=1):
+    """Latency stats in ms for a list of durations (seconds); units = work items per sample"""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    p95_idx = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "n": len(ordered),
+        "mean_ms": round(total / len(ordered) * 1000, 3),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[p95_idx] * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "throughput_per_s": round(units * len(ordered) / total, 3) if total else None,
+    }
+
+
+def _time(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _cold(matcher):
+    """Drop cached embeddings so a timed match pays for embedding again"""
+    cache = getattr(matcher.embedder, "cache", None)
+    if cache is not None:
+        cache.clear()
+
+
+def bench_parse(manifest, repeat):
+    from agents import CVParserAgent
+
+    parser = CVParserAgent()
+    parser.parse_cv(manifest[0]["path"])  # warm-up: first call pays for lazy imports
+    results = {}
+    for pages in sorted({m["pages"] for m in manifest}):
+        samples = []
+        for item in (m for m in manifest if m["pages"] == pages):
+            for _ in range(repeat):
+                elapsed, _ = _time(parser.parse_cv, item["path"])
+                samples.append(elapsed)
+        stats = summarize(samples)
+        stats["pages_per_s"] = round(stats["throughput_per_s"] * pages, 3)
+        results[f"parse_cv/{pages}p"] = stats
+    return results
+
+
+def bench_match(manifest, repeat):
+    """JDMatcherAgent.match per mode; match/{pages}p stays dense-only so it compares with older runs"""
+    from agents import CVParserAgent, JDMatcherAgent
+
+    parser, matcher = CVParserAgent(), JDMatcherAgent()
+    matcher.match(parser.parse_cv(manifest[0]["path"])["chunks"], JOB_DESCRIPTION)  # warm-up
+    results = {}
+    for mode, prefix in (("dense", "match"), ("hybrid", "match/hybrid"), ("lexical", "match/lexical")):
+        for pages in sorted({m["pages"] for m in manifest}):
+            samples, chunk_counts = [], []
+            for item in (m for m in manifest if m["pages"] == pages):
+                parsed = parser.parse_cv(item["path"])
+                chunk_counts.append(len(parsed["chunks"]))
+                for _ in range(repeat):
+                    _cold(matcher)
+                    elapsed, _ = _time(matcher.match, parsed["chunks"], JOB_DESCRIPTION, parsed["chunk_terms"], mode)
+                    samples.append(elapsed)
+            stats = summarize(samples)
+            stats["avg_chunks"] = round(sum(chunk_counts) / len(chunk_counts), 1)
+            results[f"{prefix}/{pages}p"] = stats
+    return results
+
+
+def bench_multi_cv(manifest, repeat):
+    """Parse + match every CV in the corpus, as the dashboard's multi-CV loop does, with and without the cascade"""
+    from agents import ATSScorer, CVParserAgent, JDMatcherAgent
+    from services.cascade import CascadeConfig, prefilter_score, select_for_matching
+
+    parser, matcher, scorer = CVParserAgent(), JDMatcherAgent(), ATSScorer()
+    matcher.match(parser.parse_cv(manifest[0]["path"])["chunks"], JOB_DESCRIPTION)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        _cold(matcher)
+        start = time.perf_counter()
+        ratings = []
+        for item in manifest:
+            parsed = parser.parse_cv(item["path"])
+            result = matcher.match(parsed["chunks"], JOB_DESCRIPTION)
+            ratings.append(result["max_score"] * 0.6 + result["avg_score"] * 0.4)
+        sorted(ratings, reverse=True)
+        samples.append(time.perf_counter() - start)
+    stats = summarize(samples, units=len(manifest))
+    stats["cvs_per_batch"] = len(manifest)
+
+    # Keyword prefilter first; only the default top fraction is embedded
+    config = CascadeConfig(min_keep=1)
+    cascade_samples = []
+    for _ in range(repeat):
+        _cold(matcher)
+        start = time.perf_counter()
+        parsed_cvs = [parser.parse_cv(item["path"]) for item in manifest]
+        scores = [prefilter_score(scorer.score(parsed, JOB_DESCRIPTION), JOB_DESCRIPTION) for parsed in parsed_cvs]
+        selected = select_for_matching(scores, config)
+        ratings = []
+        for i in selected:
+            result = matcher.match(parsed_cvs[i]["chunks"], JOB_DESCRIPTION, parsed_cvs[i]["chunk_terms"])
+            ratings.append(result["max_score"] * 0.6 + result["avg_score"] * 0.4)
+        sorted(ratings, reverse=True)
+        cascade_samples.append(time.perf_counter() - start)
+    cascade_stats = summarize(cascade_samples, units=len(manifest))
+    cascade_stats["cvs_per_batch"] = len(manifest)
+    cascade_stats["cvs_matched"] = len(selected)
+    return {"multi_cv_batch": stats, "multi_cv_batch/cascade": cascade_stats}
+
+
+def bench_concurrent_match(manifest, repeat, sessions=8):
+    """Several sessions matching at once, with and without the shared embedding batcher"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from agents import CVParserAgent, JDMatcherAgent
+
+    parser = CVParserAgent()
+    chunk_sets = [parser.parse_cv(item["path"])["chunks"] for item in manifest[:sessions]]
+    results = {}
+    for mode, batched in (("batched", True), ("unbatched", False)):
+        matcher = JDMatcherAgent(batched=batched)
+        matcher.match(chunk_sets[0], JOB_DESCRIPTION)  # warm-up
+        samples = []
+        with ThreadPoolExecutor(len(chunk_sets)) as pool:
+            for _ in range(repeat):
+                _cold(matcher)
+                start = time.perf_counter()
+                list(pool.map(lambda chunks: matcher.match(chunks, JOB_DESCRIPTION), chunk_sets))
+                samples.append(time.perf_counter() - start)
+        stats = summarize(samples, units=len(chunk_sets))
+        stats["sessions"] = len(chunk_sets)
+        results[f"concurrent_match/{mode}"] = stats
+    return results
+
+
+def bench_rechunk(manifest, repeat, settings=((300, 30), (800, 100), (500, 0))):
+    """Changing chunk settings: full re-parse vs re-chunking a cached extract, and the embeddings it costs"""
+    from agents import CVParserAgent, JDMatcherAgent, metrics
+
+    parser, matcher = CVParserAgent(), JDMatcherAgent()
+    extracted = [parser.extract(item["path"]) for item in manifest]
+    _cold(matcher)
+    for item in extracted:
+        matcher.match(parser.rechunk(item)["chunks"], JOB_DESCRIPTION)  # default settings are cached
+    results = {}
+    for mode, step in (("full_parse", lambda i, size, overlap: parser.parse_cv(manifest[i]["path"], chunk_size=size,
+                                                                               chunk_overlap=overlap)),
+                       ("rechunk", lambda i, size, overlap: parser.rechunk(extracted[i], size, overlap))):
+        samples = []
+        for _ in range(repeat):
+            for size, overlap in settings:
+                for i in range(len(manifest)):
+                    samples.append(_time(step, i, size, overlap)[0])
+        results[f"rechunk/{mode}"] = summarize(samples)
+
+    def counter(name):
+        return sum(c["value"] for c in metrics.snapshot()["counters"] if c["counter"] == name)
+
+    hits, misses = counter("embedding_cache_hits"), counter("embedding_cache_misses")
+    samples = []
+    for size, overlap in settings:
+        for item in extracted:
+            samples.append(_time(matcher.match, parser.rechunk(item, size, overlap)["chunks"], JOB_DESCRIPTION)[0])
+    hits, misses = counter("embedding_cache_hits") - hits, counter("embedding_cache_misses") - misses
+    stats = summarize(samples)
+    stats["embedding_cache_hit_rate"] = round(hits / (hits + misses), 3) if hits + misses else None
+    results["rechunk/match_after_rechunk"] = stats
+    return results
+
+
+def bench_chunking(manifest, repeat):
+    """Character vs token-budget chunking: chunks per CV, their token sizes and the cost of embedding them"""
+    from agents import CVParserAgent, JDMatcherAgent
+    from agents.tokenizer import token_stats
+
+    parser, matcher = CVParserAgent(), JDMatcherAgent(batched=False)
+    extracted = [parser.extract(item["path"]) for item in manifest]
+    results = {}
+    for unit in ("chars", "tokens"):
+        chunkings = [parser.rechunk(item, chunk_unit=unit) for item in extracted]
+        samples = []
+        for _ in range(repeat):
+            for parsed in chunkings:
+                samples.append(_time(matcher.match, parsed["chunks"], JOB_DESCRIPTION, parsed["chunk_terms"])[0])
+        stats = summarize(samples)
+        # Character chunkings only carry their count; measure their tokens the same way
+        chunk_stats = [token_stats(parsed["chunks"], matcher.model_name) for parsed in chunkings]
+        stats["chunks_per_cv"] = round(statistics.mean(s["count"] for s in chunk_stats), 2)
+        stats["tokens_per_chunk"] = round(sum(s["tokens_total"] for s in chunk_stats)
+                                          / sum(s["count"] for s in chunk_stats), 1)
+        stats["tokens_max"] = max(s["tokens_max"] for s in chunk_stats)
+        stats["over_context"] = sum(s["over_context"] for s in chunk_stats)
+        results[f"chunking/{unit}"] = stats
+    return results
+
+
+def bench_layout(manifest, repeat):
+    """Plain vs layout-aware extraction on the single-column corpus (fast path) and a two-column corpus"""
+    from agents import CVParserAgent
+
+    parser = CVParserAgent()
+    page_counts = sorted({m["pages"] for m in manifest})[:3]
+    two_column = build_two_column_corpus(os.path.dirname(manifest[0]["path"]), page_counts,
+                                         per_size=sum(1 for m in manifest if m["pages"] == page_counts[0]))
+    parser.parse_cv(two_column[0]["path"], layout_aware=True)  # warm-up
+    results = {}
+    for corpus_name, items in (("single_column", [m for m in manifest if m["pages"] in page_counts]),
+                               ("two_column", two_column)):
+        for mode, layout_aware in (("plain", False), ("layout", True)):
+            samples, pages = [], 0
+            for item in items:
+                for _ in range(repeat):
+                    samples.append(_time(parser.parse_cv, item["path"], layout_aware=layout_aware)[0])
+                    pages += item["pages"]
+            stats = summarize(samples)
+            stats["pages_per_s"] = round(pages / sum(samples), 3)
+            results[f"layout/{corpus_name}/{mode}"] = stats
+    return results
+
+
+def bench_vector_store(manifest, repeat, documents=10000, chunks_per_doc=10, dim=768):
+    """Rank a synthetic talent pool: float32 in memory vs the quantized, memory-mapped store"""
+    import shutil
+
+    import numpy as np
+
+    from services.candidate_store import overall_rating
+    from services.vector_store import VectorStore
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((documents * chunks_per_doc, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query = rng.standard_normal(dim, dtype=np.float32)
+    starts = np.arange(0, len(vectors), chunks_per_doc)
+
+    def rank_float32():
+        scores = vectors @ (query / np.linalg.norm(query))
+        ratings = overall_rating(np.maximum.reduceat(scores, starts), np.add.reduceat(scores, starts) / chunks_per_doc)
+        return np.argsort(-ratings)[:10]
+
+    results = {"vector_store/float32_in_memory": summarize([_time(rank_float32)[0] for _ in range(repeat)])}
+    results["vector_store/float32_in_memory"]["mb"] = round(vectors.nbytes / 2**20, 1)
+    exact_top = set(rank_float32().tolist())
+    for dtype in ("float16", "int8"):
+        path = tempfile.mkdtemp(prefix=f"bench_vectors_{dtype}_")
+        try:
+            store = VectorStore(path, dtype, initial_capacity=len(vectors))
+            add_time = sum(_time(store.add, f"cv{i}", vectors[start:start + chunks_per_doc])[0]
+                           for i, start in enumerate(starts))
+            store.top_documents(query)  # warm-up: maps the files and loads the document index
+            samples = [_time(store.top_documents, query, 10)[0] for _ in range(repeat)]
+            stats = summarize(samples)
+            stats["mb"] = round(store.nbytes / 2**20, 1)
+            stats["add_per_doc_ms"] = round(add_time / documents * 1000, 3)
+            top = {int(item["key"][2:]) for item in store.top_documents(query, 10)}
+            stats["top10_overlap_with_float32"] = len(top & exact_top) / 10
+            results[f"vector_store/{dtype}"] = stats
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    return results
+
+
+def bench_ats(manifest, repeat):
+    """Keyword ATS scoring (compare with feedback/check_ats_score in the llm benchmark)"""
+    from agents import ATSScorer, CVParserAgent
+    from agents.ats_scorer import extract_keywords
+
+    parser = CVParserAgent()
+    parsed = [parser.parse_cv(item["path"]) for item in manifest]
+    samples = []
+    for _ in range(repeat):
+        # Fresh scorer and keyword cache: every score also tokenizes the JD and indexes the CV
+        scorer = ATSScorer()
+        extract_keywords.cache_clear()
+        samples += [_time(scorer.score, item, JOB_DESCRIPTION)[0] for item in parsed]
+    results = {"ats/keyword_score_cold": summarize(samples)}
+    samples = [_time(scorer.score, item, JOB_DESCRIPTION)[0] for _ in range(repeat) for item in parsed]
+    results["ats/keyword_score_indexed"] = summarize(samples)
+    return results
+
+
+def bench_ingest(manifest, repeat, size=500):
+    """A job-board ZIP export of size CVs: time to the first PDF handed on and to the last, vs unpacking to disk first"""
+    import io
+    import shutil
+    import zipfile
+
+    from services.ingest import Ingestor
+
+    blobs = []
+    for item in manifest:
+        with open(item["path"], "rb") as f:
+            blobs.append(f.read())
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as z:
+        for i in range(size):
+            # A trailing comment makes every CV a distinct file
+            z.writestr(f"applications/{i:05d}/cv.pdf", blobs[i % len(blobs)] + f"\n% {i}\n".encode())
+            if i % 10 == 0:
+                z.writestr(f"applications/{i:05d}/cover_letter.txt", "Dear hiring manager")
+    data = archive.getvalue()
+
+    def streamed():
+        first = None
+        for _ in Ingestor().iter_pdfs(data, "export.zip"):
+            first = first or time.perf_counter()
+        return first
+
+    def unpacked():
+        # The manual route: extract everything, then pick the PDFs by name
+        target = tempfile.mkdtemp()
+        try:
+            zipfile.ZipFile(io.BytesIO(data)).extractall(target)
+            first = None
+            for root, _, files in os.walk(target):
+                for name in (n for n in files if n.endswith(".pdf")):
+                    with open(os.path.join(root, name), "rb") as f:
+                        f.read()
+                    first = first or time.perf_counter()
+            return first
+        finally:
+            shutil.rmtree(target)
+
+    results = {}
+    for mode, fn in (("unpack_to_disk", unpacked), ("streamed", streamed)):
+        samples, firsts = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            first = fn()
+            samples.append(time.perf_counter() - start)
+            firsts.append(first - start)
+        stats = summarize(samples, units=size)
+        stats["first_pdf_p50_ms"] = round(statistics.median(firsts) * 1000, 3)
+        results[f"ingest/zip_{size}/{mode}"] = stats
+    return results
+
+
+def bench_llm(manifest, repeat):
+    from agents import CVParserAgent, FeedbackAgent, SummaryAgent
+
+    parsed = CVParserAgent().parse_cv(manifest[0]["path"])
+    cv_text = parsed["text"]
+    feedback, summary = FeedbackAgent(), SummaryAgent()
+    summary.generate_summary(cv_text)  # warm-up
+    calls = {
+        "feedback/suggest_improvements": lambda: feedback.suggest_improvements(cv_text, "Software Engineer"),
+        "feedback/suggest_improvements_quick": lambda: feedback.suggest_improvements(
+            parsed["text"], "Software Engineer", "quick", parsed["chunks"], parsed["chunk_terms"]),
+        "feedback/check_ats_score": lambda: feedback.check_ats_score(cv_text, "Software Engineer", JOB_DESCRIPTION),
+        "feedback/analyze_skills": lambda: feedback.analyze_skills(cv_text, "Software Engineer", JOB_DESCRIPTION),
+        "summary/generate_summary": lambda: summary.generate_summary(cv_text),
+    }
+    results = {}
+    for name, call in calls.items():
+        results[name] = summarize([_time(call)[0] for _ in range(repeat)])
+    return results
+
+
+def bench_scheduler(manifest, repeat, batch_threads=6, slots=2):
+    """Interactive LLM latency while batch work saturates the slots: FIFO vs the priority/fair scheduler"""
+    import threading
+
+    from agents import SummaryAgent, scheduler
+
+    cv_text = " ".join(["Experienced engineer with Python and SQL."] * 20)
+    agent = SummaryAgent()
+    agent.generate_summary(cv_text)  # warm-up
+    results = {}
+    previous = scheduler._schedulers.get("llm")
+    try:
+        for mode, batch_priority in (("fifo", "interactive"), ("fair", "batch")):
+            # "fifo": batch calls are untagged and share one queue with the interactive ones
+            scheduler._schedulers["llm"] = scheduler.Scheduler("llm", slots)
+            stop = threading.Event()
+
+            def batch_load():
+                with scheduler.scheduling(batch_priority, "batch-recruiter"):
+                    while not stop.is_set():
+                        agent.generate_summary(cv_text)
+
+            threads = [threading.Thread(target=batch_load, daemon=True) for _ in range(batch_threads)]
+            for thread in threads:
+                thread.start()
+            time.sleep(0.2)
+            samples = []
+            for i in range(max(5, repeat * 3)):
+                with scheduler.scheduling("interactive", f"user-{i}"):
+                    samples.append(_time(agent.generate_summary, cv_text)[0])
+            stop.set()
+            for thread in threads:
+                thread.join()
+            stats = summarize(samples)
+            stats.update(slots=slots, batch_threads=batch_threads)
+            results[f"scheduler/interactive_under_batch/{mode}"] = stats
+    finally:
+        if previous is None:
+            scheduler._schedulers.pop("llm", None)
+        else:
+            scheduler._schedulers["llm"] = previous
+    return results
+
+
+def bench_endpoint_pool(manifest, repeat, endpoints=(1, 2, 3), parallel=2, calls=12):
+    """Concurrent generation through the endpoint pool as stub inference boxes (each serving `parallel` at once) are added"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from agents import scheduler
+    from agents._ollama import generate_text
+    from agents.endpoint_pool import Endpoint, EndpointPool, PooledLLM
+
+    config = StubConfig(prefill_ms=20.0, token_ms=1.0, num_tokens=32, generate_parallel=parallel)
+    results = {}
+    previous = scheduler._schedulers.get("llm")
+    servers = [StubOllamaServer(config=config).__enter__() for _ in range(max(endpoints))]
+    try:
+        for count in endpoints:
+            pool = EndpointPool([Endpoint(server.base_url, "generate") for server in servers[:count]], health_interval=0)
+            llm = PooledLLM(pool, "llama3.2")
+            scheduler._schedulers["llm"] = scheduler.Scheduler("llm", parallel * count)
+            generate_text(llm, "warm-up")
+            samples = []
+            with ThreadPoolExecutor(calls) as executor:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    list(executor.map(lambda _: generate_text(llm, "Summarise this CV."), range(calls)))
+                    samples.append(time.perf_counter() - start)
+            stats = summarize(samples, units=calls)
+            stats.update(endpoints=count, parallel_per_endpoint=parallel, calls=calls)
+            results[f"endpoint_pool/{count}_endpoints"] = stats
+    finally:
+        for server in servers:
+            server.__exit__(None, None, None)
+        if previous is None:
+            scheduler._schedulers.pop("llm", None)
+        else:
+            scheduler._schedulers["llm"] = previous
+    return results
+
+
+def bench_warmup(manifest, repeat, load_ms=500.0):
+    """First analysis after a deploy: model load paid by the user vs by the background warm-up"""
+    from agents import SummaryAgent
+    from agents.warmup import ModelWarmer
+
+    config = StubConfig(prefill_ms=20.0, token_ms=1.0, num_tokens=32, load_ms=load_ms)
+    results = {}
+    for mode in ("cold", "warmed"):
+        samples, warmups = [], []
+        for _ in range(repeat):
+            with StubOllamaServer(config=config) as server:
+                previous_host, os.environ["OLLAMA_HOST"] = os.environ.get("OLLAMA_HOST"), server.base_url
+                try:
+                    agent = SummaryAgent()
+                    if mode == "warmed":
+                        warmups.append(_time(ModelWarmer([agent.model_name]).warm_all)[0])
+                    samples.append(_time(agent.generate_summary, "Experienced Python engineer.")[0])
+                finally:
+                    os.environ["OLLAMA_HOST"] = previous_host
+        stats = summarize(samples)
+        stats["load_ms"] = load_ms
+        if warmups:
+            stats["warmup_p50_ms"] = round(statistics.median(warmups) * 1000, 3)
+        results[f"warmup/first_request/{mode}"] = stats
+    return results
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "match": bench_match,
+    "multi_cv": bench_multi_cv,
+    "concurrent_match": bench_concurrent_match,
+    "rechunk": bench_rechunk,
+    "chunking": bench_chunking,
+    "layout": bench_layout,
+    "vector_store": bench_vector_store,
+    "ats": bench_ats,
+    "ingest": bench_ingest,
+    "llm": bench_llm,
+    "scheduler": bench_scheduler,
+    "endpoint_pool": bench_endpoint_pool,
+    "warmup": bench_warmup,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    from agents import metrics
+
+    config = StubConfig(embed_latency_ms=args.embed_latency_ms, embed_per_text_ms=args.embed_per_text_ms,
+                        embed_parallel=args.embed_parallel,
+                        prefill_ms=args.prefill_ms, token_ms=args.token_ms, num_tokens=args.num_tokens)
+    page_counts = (1, 5) if args.quick else tuple(args.pages)
+    per_size = 1 if args.quick else args.per_size
+    corpus_dir = args.corpus_dir or os.path.join(tempfile.gettempdir(), "cv_analyzer_bench_corpus")
+    manifest = build_corpus(corpus_dir, page_counts, per_size, seed=args.seed)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": {"pages": list(page_counts), "per_size": per_size, "seed": args.seed},
+            "stub": vars(config),
+        },
+        "results": {},
+        "stages": {},
+    }
+
+    with StubOllamaServer(config=config) as server:
+        os.environ["OLLAMA_HOST"] = server.base_url
+        for name in args.only or BENCHMARKS:
+            metrics.REGISTRY.reset()
+            report["results"].update(BENCHMARKS[name](manifest, args.repeat))
+            report["stages"][name] = metrics.snapshot()["stages"]
+        report["meta"]["stub_requests"] = dict(server.requests)
+    return report
+
+
+def compare(base_path, head_path):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+    print(f"{'benchmark':<34} {'base p50':>10} {'head p50':>10} {'change':>8}")
+    for name, head_stats in head["results"].items():
+        base_stats = base["results"].get(name)
+        if not base_stats:
+            print(f"{name:<34} {'-':>10} {head_stats['p50_ms']:>10.2f} {'new':>8}")
+            continue
+        change = (head_stats["p50_ms"] - base_stats["p50_ms"]) / base_stats["p50_ms"] if base_stats["p50_ms"] else 0
+        print(f"{name:<34} {base_stats['p50_ms']:>10.2f} {head_stats['p50_ms']:>10.2f} {change:>+8.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="Compare two JSON reports")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--quick", action="store_true", help="Small corpus for a smoke run")
+    parser.add_argument("--pages", nargs="+", type=int, default=[1, 2, 5, 10, 30])
+    parser.add_argument("--per-size", type=int, default=3, help="CVs generated per page count")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--corpus-dir")
+    parser.add_argument("--embed-latency-ms", type=float, default=2.0)
+    parser.add_argument("--embed-per-text-ms", type=float, default=0.5)
+    parser.add_argument("--embed-parallel", type=int, default=1, help="Concurrent embed requests the stub serves")
+    parser.add_argument("--prefill-ms", type=float, default=20.0)
+    parser.add_argument("--token-ms", type=float, default=1.0)
+    parser.add_argument("--num-tokens", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    sys.path.insert(0, REPO_ROOT)
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
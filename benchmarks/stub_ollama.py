@@ -0,0 +1,271 @@
+"""Stand-in HTTP server that mimics the parts of the Ollama API the agents use.
+
+Embeddings are deterministic: each text is hashed into a bag-of-words vector,
+so identical texts get identical vectors and overlapping texts score higher
+than unrelated ones. Generation streams a fixed number of tokens. Latency is
+configurable so benchmarks can model a real inference server without one.
+
+Usage:
+    python -m benchmarks.stub_ollama --port 11435 --embed-latency-ms 5
+    OLLAMA_HOST=http://127.0.0.1:11435 streamlit run dashboard.py
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+
+def deterministic_embedding(text: str, dim: int = 768):
+    """Hash the words of text into a unit-length vector of size dim"""
+    vec = [0.0] * dim
+    for token in _TOKEN_RE.findall(text.lower()):
+        digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+        idx = int.from_bytes(digest[:4], "little") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vec[idx] += sign
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+class StubConfig:
+    def __init__(self, dim=768, embed_latency_ms=0.0, embed_per_text_ms=0.0, embed_parallel=0,
+                 prefill_ms=0.0, token_ms=0.0, num_tokens=64, models=("llama3.2", "nomic-embed-text"),
+                 generate_parallel=0, load_ms=0.0):
+        self.dim = dim
+        self.embed_latency_ms = embed_latency_ms
+        self.embed_per_text_ms = embed_per_text_ms
+        # Embed requests served at once, like OLLAMA_NUM_PARALLEL; 0 = unlimited
+        self.embed_parallel = embed_parallel
+        self.prefill_ms = prefill_ms
+        self.token_ms = token_ms
+        self.num_tokens = num_tokens
+        self.models = list(models)
+        # Generate requests served at once; 0 = unlimited
+        self.generate_parallel = generate_parallel
+        # Paid by the first request for each model, like Ollama loading it into memory
+        self.load_ms = load_ms
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without this, delayed ACKs add ~40 ms per request
+    disable_nagle_algorithm = True
+    server_version = "StubOllama/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body or b"{}")
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.count(self.path)
+        if self.path in ("/", "/api/version"):
+            self._send_json({"version": "0.0.0-stub"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": m, "model": m} for m in self.config.models]})
+        elif self.path == "/api/ps":
+            self._send_json({"models": [{"name": m, "model": m} for m in self.config.models]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        self.server.count(self.path)
+        try:
+            req = self._read_json()
+        except ValueError:
+            self._send_json({"error": "invalid json"}, 400)
+            return
+        if self.path == "/api/embed":
+            self._embed(req)
+        elif self.path == "/api/embeddings":
+            vec = deterministic_embedding(req.get("prompt", ""), self.config.dim)
+            self._send_json({"embedding": vec})
+        elif self.path == "/api/generate":
+            if self.server.generate_slots is not None:
+                with self.server.generate_slots:
+                    self._generate(req)
+            else:
+                self._generate(req)
+        elif self.path == "/api/show":
+            self._send_json({"modelfile": "", "details": {}, "model_info": {}})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def _embed(self, req):
+        inputs = req.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        cfg = self.config
+        load = self.server.load(req.get("model"))
+        delay = (cfg.embed_latency_ms + cfg.embed_per_text_ms * len(inputs)) / 1000
+        if delay:
+            if self.server.embed_slots is not None:
+                with self.server.embed_slots:
+                    time.sleep(delay)
+            else:
+                time.sleep(delay)
+        self.server.count("embedded_texts", len(inputs))
+        self._send_json({
+            "model": req.get("model"),
+            "embeddings": [deterministic_embedding(t, cfg.dim) for t in inputs],
+            "total_duration": int((load + delay) * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": sum(len(t.split()) for t in inputs),
+        })
+
+    def _generate(self, req):
+        cfg = self.config
+        prompt = req.get("prompt", "")
+        load = self.server.load(req.get("model"))
+        if not prompt:
+            # An empty prompt only loads the model (what a warm-up sends)
+            self._send_json({"model": req.get("model"), "created_at": datetime.now(timezone.utc).isoformat(),
+                             "response": "", "done": True, "done_reason": "load",
+                             "total_duration": int(load * 1e9), "load_duration": int(load * 1e9)})
+            return
+        options = req.get("options") or {}
+        num_tokens = cfg.num_tokens
+        if options.get("num_predict"):
+            num_tokens = min(num_tokens, int(options["num_predict"]))
+        prompt_tokens = len(prompt.split())
+        words = ["Score: 72/100.", "Strengths:", "clear", "structure,", "relevant", "skills."]
+        tokens = [words[i % len(words)] + " " for i in range(num_tokens)]
+
+        prefill = cfg.prefill_ms / 1000
+        if prefill:
+            time.sleep(prefill)
+        final = {
+            "model": req.get("model"),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": "",
+            "done": True,
+            "done_reason": "stop",
+            "context": [],
+            "total_duration": int((load + prefill + cfg.token_ms * num_tokens / 1000) * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill * 1e9),
+            "eval_count": num_tokens,
+            "eval_duration": int(cfg.token_ms * num_tokens / 1000 * 1e9),
+        }
+
+        if req.get("stream", True) is False:
+            if cfg.token_ms:
+                time.sleep(cfg.token_ms * num_tokens / 1000)
+            final["response"] = "".join(tokens)
+            self._send_json(final)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for tok in tokens:
+            if cfg.token_ms:
+                time.sleep(cfg.token_ms / 1000)
+            self._write_chunk({"model": req.get("model"), "response": tok, "done": False})
+        self._write_chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, payload):
+        line = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(b"%x\r\n" % len(line) + line + b"\r\n")
+
+
+class StubOllamaServer(ThreadingHTTPServer):
+    """Threaded stub server; use as a context manager to run it in the background"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, config: StubConfig = None):
+        super().__init__((host, port), _Handler)
+        self.config = config or StubConfig()
+        self.embed_slots = threading.Semaphore(self.config.embed_parallel) if self.config.embed_parallel else None
+        self.generate_slots = (threading.Semaphore(self.config.generate_parallel)
+                               if self.config.generate_parallel else None)
+        self.requests = {}
+        self.loaded_models = set()
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key, amount=1):
+        with self._count_lock:
+            self.requests[key] = self.requests.get(key, 0) + amount
+
+    def load(self, model) -> float:
+        """Seconds spent loading model for this request (only the first request for a model pays)"""
+        with self._count_lock:
+            if model in self.loaded_models or not self.config.load_ms:
+                return 0.0
+            self.loaded_models.add(model)
+        time.sleep(self.config.load_ms / 1000)
+        return self.config.load_ms / 1000
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a stub Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--embed-per-text-ms", type=float, default=0.0)
+    parser.add_argument("--embed-parallel", type=int, default=0, help="Concurrent embed requests (0 = unlimited)")
+    parser.add_argument("--prefill-ms", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=0.0)
+    parser.add_argument("--num-tokens", type=int, default=64)
+    parser.add_argument("--generate-parallel", type=int, default=0, help="Concurrent generate requests (0 = unlimited)")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Model load time paid by the first request per model")
+    args = parser.parse_args(argv)
+
+    config = StubConfig(dim=args.dim, embed_latency_ms=args.embed_latency_ms,
+                        embed_per_text_ms=args.embed_per_text_ms, embed_parallel=args.embed_parallel, prefill_ms=args.prefill_ms,
+                        token_ms=args.token_ms, num_tokens=args.num_tokens, generate_parallel=args.generate_parallel,
+                        load_ms=args.load_ms)
+    server = StubOllamaServer(args.host, args.port, config)
+    print(f"Stub Ollama listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
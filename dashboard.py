@@ -1,26 +1,91 @@
 import streamlit as st
-from agents.cv_parser_agent import CVParserAgent
+from agents.cv_parser_agent import DEFAULT_CHUNK_TOKENS, CVParserAgent
 from agents.jd_matcher_agent import JDMatcherAgent
 from agents.feedback_agent import FeedbackAgent
 from agents.summary_agent import SummaryAgent
-import tempfile
-import plotly.graph_objects as go
-import plotly.express as px
+from agents.ats_scorer import ATSScorer, format_report
+from agents.tokenizer import token_stats
+from agents import metrics
+from agents.endpoint_pool import get_pool
+from agents.scheduler import KINDS, bind as bind_scheduling, get_scheduler, scheduling
+from agents.warmup import get_warmer, start_warmup
+from services.candidate_store import CandidateStore, ParseCache, content_hash
+from services import cascade
+from services.cascade import CascadeConfig, prefilter_score, select_for_matching
+from services.dedup import text_signature
+from services.history_store import HistoryStore
+from services.ingest import UPLOAD_TYPES, Ingestor, enqueue_parse_jobs
+from services.job_queue import JobQueue, DONE, FAILED, QUEUED, FINISHED_STATES
+from services.speculative import Speculator
+from services.vector_store import open_model_store
+import os
+import subprocess
+import sys
 import time
 import json
-import pandas as pd
+import uuid
 from datetime import datetime
 
+# plotly and pandas are imported where they are used so that a cold start
+# (and any rerun that does not render a chart or table) does not pay for them.
+
 # Initialize agents
 @st.cache_resource
 def init_agents():
     """Initialize agents once and cache them"""
-    return {
-        'cv_parser': CVParserAgent(),
-        'jd_matcher': JDMatcherAgent(),
+    jd_matcher = JDMatcherAgent()
+    # Chunk vectors persist across restarts, so re-matching a known CV only embeds the JD
+    jd_matcher.vector_store = open_model_store(jd_matcher.model_name)
+    agents = {
+        # Token budgets are capped at the context window of the model the chunks are embedded with
+        'cv_parser': CVParserAgent(embed_model=jd_matcher.model_name),
+        'jd_matcher': jd_matcher,
         'feedback_agent': FeedbackAgent(),
-        'summary_agent': SummaryAgent()
+        'summary_agent': SummaryAgent(),
+        'ats_scorer': ATSScorer()
     }
+    # Load the models in the background and keep them resident, so no user pays the load time
+    start_warmup(agents.values())
+    return agents
+
+@st.cache_resource
+def init_history_store():
+    """Open the persistent analysis history shared by all sessions"""
+    return HistoryStore()
+
+@st.cache_resource
+def init_job_queue():
+    """Open the durable job queue shared with the worker processes"""
+    queue = JobQueue()
+    queue.purge()
+    return queue
+
+@st.cache_resource
+def init_parse_cache():
+    """Parsed CVs keyed by PDF content hash, shared by all sessions"""
+    return ParseCache(int(os.environ.get("CV_PARSE_CACHE_SIZE", "256")))
+
+@st.cache_resource
+def init_rechunk_cache():
+    """Cached parses re-chunked with other settings, keyed by parse cache key and chunk settings"""
+    return ParseCache(int(os.environ.get("CV_PARSE_CACHE_SIZE", "256")))
+
+@st.cache_resource
+def init_speculator():
+    """Runner for work started speculatively on upload, shared by all sessions"""
+    return Speculator()
+
+@st.cache_resource
+def start_local_workers(processes: int):
+    """Start a local worker pool once per server process, unless workers are already running"""
+    queue = init_job_queue()
+    if queue.live_workers() > 0:
+        return None
+    return subprocess.Popen(
+        [sys.executable, "-m", "services.worker", "--processes", str(processes), "--queue", queue.db_path],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        start_new_session=True
+    )
 
 # Page configuration
 st.set_page_config(
@@ -82,10 +147,8 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Initialize session state
-if 'analysis_history' not in st.session_state:
-    st.session_state.analysis_history = []
-if 'parsed_cv_cache' not in st.session_state:
-    st.session_state.parsed_cv_cache = {}
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if 'feedback_cache' not in st.session_state:
     st.session_state.feedback_cache = {}
 if 'summary_cache' not in st.session_state:
@@ -106,14 +169,41 @@ if 'recruiter_cv_name' not in st.session_state:
 if 'multi_cv_mode' not in st.session_state:
     st.session_state.multi_cv_mode = False
 if 'multi_cv_candidates' not in st.session_state:
-    st.session_state.multi_cv_candidates = []  # List of candidate data dicts
+    st.session_state.multi_cv_candidates = CandidateStore()
 if 'multi_cv_jd' not in st.session_state:
     st.session_state.multi_cv_jd = None
 if 'multi_cv_final_verdict' not in st.session_state:
     st.session_state.multi_cv_final_verdict = None
+# Background jobs are tracked in the URL so a page refresh picks them up again
+if 'multi_cv_batch' not in st.session_state:
+    st.session_state.multi_cv_batch = st.query_params.get('batch')
+    st.session_state.multi_cv_batch_collected = False
+    # A batch restored from the URL was already recorded in the history by the session that started it
+    st.session_state.multi_cv_batch_restored = bool(st.session_state.multi_cv_batch)
+    # Second (matching) phase of a cascade batch, and the batch whose prefiltered ranking is loaded
+    st.session_state.multi_cv_match_batch = st.query_params.get('match_batch')
+    st.session_state.multi_cv_batch_prefiltered = None
+    if st.session_state.multi_cv_batch:
+        st.session_state.multi_cv_mode = True
+if 'multi_cv_batch_errors' not in st.session_state:
+    st.session_state.multi_cv_batch_errors = []
+if 'multi_cv_verdict_job' not in st.session_state:
+    st.session_state.multi_cv_verdict_job = st.query_params.get('verdict_job')
+# Speculative stage keys started per upload area, so a replaced upload cancels what it started
+if 'speculative_keys' not in st.session_state:
+    st.session_state.speculative_keys = {}
 
 # Load agents
 agents = init_agents()
+history = init_history_store()
+job_queue = init_job_queue()
+parse_cache = init_parse_cache()
+rechunk_cache = init_rechunk_cache()
+speculator = init_speculator()
+# Ollama calls of this rerun queue fairly against other sessions (agents/scheduler.py)
+bind_scheduling(st.session_state.session_id)
+speculator.touch(st.session_state.session_id)
+speculator.sweep()
 
 # Header with better styling
 st.markdown("""
@@ -126,25 +216,76 @@ st.markdown("""
 <hr style='margin: 20px 0; border: 1px solid #e0e0e0;'>
 """, unsafe_allow_html=True)
 
+REVIEW_DEPTH_OPTIONS = {
+    "Quick Review": "quick",
+    "Detailed Analysis": "detailed",
+}
+
+CHUNK_UNIT_OPTIONS = {
+    "Characters": "chars",
+    "Tokens (fit embedding model)": "tokens",
+}
+
+MATCH_MODE_OPTIONS = {
+    "Semantic only": "dense",
+    "Hybrid (keywords + semantic)": "hybrid",
+    "Keyword only (BM25)": "lexical",
+}
+
 # Sidebar for configuration
 with st.sidebar:
     st.markdown("### ⚙️ Configuration")
     
     st.markdown("#### Model Settings")
+    warmer = get_warmer()
+    if warmer is not None:
+        # Readiness of the background warm-up started with the agents
+        model_states = []
+        for entry in warmer.status():
+            if entry['ready']:
+                load = f" ({entry['load_ms'] / 1000:.1f}s load)" if entry['load_ms'] else ""
+                model_states.append(f"🟢 {entry['model']}{load}")
+            elif entry['error'] and entry['optional']:
+                model_states.append(f"⚪ {entry['model']} (optional, unavailable)")
+            elif entry['error']:
+                model_states.append(f"🔴 {entry['model']}")
+            else:
+                model_states.append(f"⏳ {entry['model']}")
+        st.caption("Models: " + ", ".join(model_states),
+                   help="Models are loaded when the app starts and kept in memory "
+                        f"(keep-alive {warmer.keep_alive}, refreshed every {warmer.interval:.0f}s)")
     model_choice = st.selectbox(
         "LLM Model",
         ["llama3.2", "llama2", "mistral", "codellama"],
         help="Select the Ollama model to use for analysis"
     )
     
-    chunk_size = st.slider(
-        "Text Chunk Size",
-        min_value=200,
-        max_value=1000,
-        value=500,
-        step=50,
-        help="Size of text chunks for processing"
-    )
+    chunk_unit = CHUNK_UNIT_OPTIONS[st.selectbox(
+        "Chunking",
+        list(CHUNK_UNIT_OPTIONS),
+        help="Tokens packs whole CV sections into chunks up to a token budget, counted with a local "
+             "tokenizer and capped at the embedding model's context window: fewer, denser chunks to "
+             "embed and none truncated"
+    )]
+    
+    if chunk_unit == "tokens":
+        chunk_size = st.slider(
+            "Chunk Token Budget",
+            min_value=128,
+            max_value=2048,
+            value=DEFAULT_CHUNK_TOKENS,
+            step=64,
+            help="Most tokens per chunk; capped at what the embedding model's context window holds"
+        )
+    else:
+        chunk_size = st.slider(
+            "Text Chunk Size",
+            min_value=200,
+            max_value=1000,
+            value=500,
+            step=50,
+            help="Size of text chunks for processing"
+        )
     
     chunk_overlap = st.slider(
         "Chunk Overlap",
@@ -152,26 +293,120 @@ with st.sidebar:
         max_value=200,
         value=50,
         step=10,
-        help="Overlap between text chunks"
+        help="Overlap between text chunks (in tokens when chunking by tokens); in token mode it only "
+             "applies to sections split because they exceed the budget"
+    )
+    
+    layout_aware = st.checkbox(
+        "Layout-Aware PDF Extraction",
+        value=False,
+        help="Rebuild reading order for two-column CVs; single-column pages are unaffected"
+    )
+    
+    match_mode_label = st.selectbox(
+        "Matching Mode",
+        list(MATCH_MODE_OPTIONS),
+        help="Hybrid adds BM25 keyword scores to embedding similarity; its scores run lower than semantic "
+             "ones, so the Excellent/Good thresholds apply to Semantic only. Keyword only needs no embedding "
+             "server and is much faster. Hybrid falls back to keyword scores if embedding fails"
+    )
+    match_mode = MATCH_MODE_OPTIONS[match_mode_label]
+    
+    st.markdown("#### Ranking Cascade")
+    cascade_enabled = st.checkbox(
+        "Keyword prefilter before embedding",
+        value=True,
+        help="In multi-CV mode, score every CV on keywords and extracted skills first and only embed "
+             "and match the best ones. Always off in keyword-only matching mode"
+    )
+    cascade_keep_percent = st.slider(
+        "Embed Top (%)",
+        min_value=5,
+        max_value=100,
+        value=round(cascade.DEFAULT_KEEP_FRACTION * 100),
+        step=5,
+        disabled=not cascade_enabled,
+        help="Share of the prefiltered CVs that go on to embedding and semantic matching"
+    )
+    cascade_min_keep = st.number_input(
+        "Always Embed At Least",
+        min_value=1,
+        max_value=500,
+        value=cascade.DEFAULT_MIN_KEEP,
+        disabled=not cascade_enabled,
+        help="Batches up to this size are matched in full"
+    )
+    cascade_min_score = st.slider(
+        "Min Prefilter Score (%)",
+        min_value=0,
+        max_value=100,
+        value=round(cascade.DEFAULT_MIN_SCORE * 100),
+        disabled=not cascade_enabled,
+        help="CVs scoring lower on keywords and skills are never embedded"
+    )
+    verdict_shortlist = st.number_input(
+        "Final Verdict Shortlist",
+        min_value=1,
+        max_value=50,
+        value=cascade.DEFAULT_SHORTLIST_SIZE,
+        help="Top matched candidates included in the final verdict prompt"
+    )
+    cascade_config = CascadeConfig(
+        enabled=cascade_enabled and match_mode != "lexical",
+        keep_fraction=cascade_keep_percent / 100,
+        min_keep=int(cascade_min_keep),
+        min_score=cascade_min_score / 100,
+        shortlist_size=int(verdict_shortlist),
     )
     
     st.markdown("#### Display Settings")
     show_raw_scores = st.checkbox("Show Raw Similarity Scores", value=False)
     enable_caching = st.checkbox("Enable Result Caching", value=True)
+
+    st.markdown("#### Speculative Precompute")
+    speculative = st.checkbox(
+        "Start work on upload",
+        value=os.environ.get("CV_SPECULATIVE", "1") != "0",
+        disabled=not enable_caching,
+        help="Parse and embed CVs in the background as soon as they are uploaded, so results are ready "
+             "when you click. Needs result caching; work you do not use is cancelled"
+    ) and enable_caching
+    speculative_llm = st.checkbox(
+        "Also prepare the likely AI analysis",
+        value=os.environ.get("CV_SPECULATIVE_LLM", "0") == "1",
+        disabled=not speculative,
+        help="Generate the AI feedback (Candidate Portal) or the full report (Recruiter Dashboard) right "
+             "after upload. Uses LLM time even if you never open it"
+    ) and speculative
+
+    st.markdown("#### Background Processing")
+    use_background_jobs = st.checkbox(
+        "Run batches in background workers",
+        value=False,
+        help="Queue multi-CV analyses and final verdicts for worker processes so they survive reruns and page refreshes"
+    )
+    if use_background_jobs:
+        start_local_workers(int(os.environ.get("CV_ANALYZER_WORKERS", "2")))
+        queue_depth = job_queue.depth()
+        st.caption(f"Workers: {job_queue.live_workers()} | Queued: {queue_depth.get(QUEUED, 0)} | "
+                   f"Running: {queue_depth.get('running', 0)}")
     
     st.markdown("---")
     
     # Analysis history
-    if st.session_state.analysis_history:
+    recent_analyses = history.recent(5, session_id=st.session_state.session_id)
+    if recent_analyses:
         st.markdown("### 📊 Recent Analyses")
-        for idx, item in enumerate(st.session_state.analysis_history[-5:][::-1]):
-            with st.expander(f"{item['type']} - {item['timestamp'][:19]}"):
+        for idx, item in enumerate(recent_analyses):
+            with st.expander(f"{item['type']} - {datetime.fromtimestamp(item['ts']).isoformat()[:19]}"):
                 st.write(f"**File:** {item['filename']}")
-                if item['type'] == 'Match Score':
+                if item['type'] == 'Match Score' and item['score'] is not None:
                     st.write(f"**Score:** {item['score']:.2%}")
 
 def create_score_gauge(score, title="Match Score"):
     """Create a gauge chart for match scores"""
+    import plotly.graph_objects as go
+
     fig = go.Figure(go.Indicator(
         mode = "gauge+number+delta",
         value = score * 100,
@@ -197,6 +432,8 @@ def create_score_gauge(score, title="Match Score"):
 
 def create_similarity_chart(scores, labels):
     """Create a bar chart for similarity scores"""
+    import plotly.express as px
+
     colors = ['#ff4444' if s < 0.4 else '#ffaa00' if s < 0.7 else '#00ff88' for s in scores]
     
     fig = px.bar(
@@ -217,60 +454,106 @@ def create_similarity_chart(scores, labels):
     )
     return fig
 
-def safe_parse_cv(pdf_path, cache_key=None):
+def record_analysis(event_type, filename, role=None, score=None, started=None):
+    """Append an analysis event for this session to the persistent history"""
+    history.record(
+        event_type,
+        filename=filename,
+        role=role,
+        score=score,
+        duration_ms=(time.perf_counter() - started) * 1000 if started else None,
+        session_id=st.session_state.session_id
+    )
+
+def parse_cache_key(pdf_hash, layout=False):
+    """Parse cache key; layout-aware and plain extraction of the same PDF are cached separately"""
+    return f"{pdf_hash}:layout" if layout and pdf_hash else pdf_hash
+
+def safe_parse_cv(pdf_source, cache_key=None):
     """Safely parse CV with error handling"""
     try:
         # Check cache first
-        if cache_key and cache_key in st.session_state.parsed_cv_cache:
-            return st.session_state.parsed_cv_cache[cache_key]
+        cache_key = parse_cache_key(cache_key, layout_aware)
+        # A parse started on upload is waited for if it is still running
+        cached = speculator.claim(f"parse:{cache_key}") if cache_key else None
+        if cached is None and cache_key:
+            cached = parse_cache.get(cache_key)
+        if cached is not None:
+            metrics.incr("cache_hits", cache="parsed_cv")
+            # Only the chunking step depends on the sidebar settings; redo just that, once per setting
+            # rather than on every rerun
+            rechunk_key = f"{cache_key}:{chunk_size}:{chunk_overlap}:{chunk_unit}"
+            rechunked = rechunk_cache.get(rechunk_key)
+            if rechunked is None:
+                rechunked = agents['cv_parser'].rechunk(cached, chunk_size, chunk_overlap, chunk_unit=chunk_unit)
+                if rechunked is not cached:
+                    rechunk_cache.put(rechunk_key, rechunked)
+            return rechunked
+        metrics.incr("cache_misses", cache="parsed_cv")
         
         with st.spinner("📄 Parsing CV..."):
-            parsed = agents['cv_parser'].parse_cv(pdf_path)
+            parsed = agents['cv_parser'].parse_cv(pdf_source, chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                                  layout_aware=layout_aware, chunk_unit=chunk_unit)
             
             # Cache the result
             if cache_key and enable_caching:
-                st.session_state.parsed_cv_cache[cache_key] = parsed
+                parse_cache.put(cache_key, parsed)
             
             return parsed
     except Exception as e:
+        metrics.incr("ui_errors", operation="parse_cv")
         st.error(f"❌ Error parsing CV: {str(e)}")
         return None
 
-def safe_get_feedback(cv_text, target_role, cache_key=None):
-    """Safely get feedback with error handling"""
+def safe_get_feedback(cv_text, target_role, cache_key=None, depth="detailed", parsed=None):
+    """Safely get feedback with error handling; depth "quick" takes the fast model route"""
     try:
         # Check cache first
         if cache_key and cache_key in st.session_state.feedback_cache:
+            metrics.incr("cache_hits", cache="feedback")
             return st.session_state.feedback_cache[cache_key]
+        metrics.incr("cache_misses", cache="feedback")
         
-        with st.spinner("🤔 Analyzing CV and generating suggestions..."):
-            feedback = agents['feedback_agent'].suggest_improvements(cv_text, target_role)
+        spinner_text = "⚡ Running quick review..." if depth == "quick" else "🤔 Analyzing CV and generating suggestions..."
+        with st.spinner(spinner_text):
+            started = time.perf_counter()
+            feedback = speculator.claim(f"feedback:{cache_key}") if cache_key else None
+            if feedback is None:
+                feedback = agents['feedback_agent'].suggest_improvements(
+                    cv_text, target_role, depth,
+                    parsed.get("chunks") if parsed else None,
+                    parsed.get("chunk_terms") if parsed else None
+                )
             
             # Cache the result
             if cache_key and enable_caching:
                 st.session_state.feedback_cache[cache_key] = feedback
             
             # Add to history
-            st.session_state.analysis_history.append({
-                'type': 'Feedback',
-                'filename': 'CV Analysis',
-                'timestamp': datetime.now().isoformat(),
-                'role': target_role or 'General'
-            })
+            record_analysis('Feedback', 'CV Analysis', target_role or 'General', started=started)
             
             return feedback
     except Exception as e:
+        metrics.incr("ui_errors", operation="feedback")
         st.error(f"❌ Error generating feedback: {str(e)}")
         st.info("💡 Make sure Ollama is running with the required model (llama3.2)")
         return None
 
-def safe_match_jd(cv_chunks, job_description):
+def safe_match_jd(cv_chunks, job_description, filename=None, chunk_terms=None):
     """Safely match JD with error handling"""
     try:
         with st.spinner("🔍 Calculating match scores..."):
-            result = agents['jd_matcher'].match(cv_chunks, job_description)
+            started = time.perf_counter()
+            result = agents['jd_matcher'].match(cv_chunks, job_description, chunk_terms, mode=match_mode)
+            if result.get('fallback_reason'):
+                st.warning(f"⚠️ Embedding unavailable ({result['fallback_reason']}); showing keyword (BM25) scores only")
+
+            # Add to history
+            record_analysis('Match Score', filename or 'CV Match', score=result['max_score'], started=started)
+
             return result
     except Exception as e:
+        metrics.incr("ui_errors", operation="match_jd")
         st.error(f"❌ Error matching CV with JD: {str(e)}")
         st.info("💡 Make sure Ollama is running with the embedding model (nomic-embed-text)")
         return None
@@ -280,56 +563,184 @@ def safe_generate_summary(cv_text, cache_key=None):
     try:
         # Check cache first
         if cache_key and cache_key in st.session_state.summary_cache:
+            metrics.incr("cache_hits", cache="summary")
             return st.session_state.summary_cache[cache_key]
+        metrics.incr("cache_misses", cache="summary")
 
         with st.spinner("📊 Generating comprehensive candidate summary..."):
-            summary = agents['summary_agent'].generate_summary(cv_text)
+            started = time.perf_counter()
+            summary = speculator.claim(f"summary:{cache_key}") if cache_key else None
+            if summary is None:
+                summary = agents['summary_agent'].generate_summary(cv_text)
 
             # Cache the result
             if cache_key and enable_caching:
                 st.session_state.summary_cache[cache_key] = summary
 
+            # Add to history
+            record_analysis('Summary', 'Candidate Report', started=started)
+
             return summary
     except Exception as e:
+        metrics.incr("ui_errors", operation="summary")
         st.error(f"❌ Error generating summary: {str(e)}")
         return None
 
-def safe_check_ats_score(cv_text, target_role, job_description, cache_key=None):
+def parse_stage(blob, parse_key):
+    """Speculative stage that parses an upload into the shared parse cache"""
+    # Sidebar settings are bound now: the stage runs on the speculator's thread, outside this rerun
+    settings = dict(chunk_size=chunk_size, chunk_overlap=chunk_overlap, layout_aware=layout_aware,
+                    chunk_unit=chunk_unit)
+
+    def run(_):
+        parsed = parse_cache.get(parse_key)
+        if parsed is None:
+            parsed = agents['cv_parser'].parse_cv(blob, **settings)
+            parse_cache.put(parse_key, parsed)
+        return parsed
+    return (f"parse:{parse_key}", "parse", run)
+
+def embed_stage(parse_key):
+    """Speculative stage that embeds the parsed chunks into the vector store, passing the parse through"""
+    size, overlap, unit = chunk_size, chunk_overlap, chunk_unit
+
+    def run(parsed):
+        # A cached parse may have been chunked with other settings
+        parsed = agents['cv_parser'].rechunk(parsed, size, overlap, chunk_unit=unit)
+        agents['jd_matcher'].index(parsed["chunks"])
+        return parsed
+    return (f"embed:{parse_key}:{size}:{overlap}:{unit}", "embed", run)
+
+def feedback_stage(feedback_key, target_role, depth):
+    """Speculative stage that runs the AI feedback on the parsed CV"""
+    def run(parsed):
+        return agents['feedback_agent'].suggest_improvements(
+            parsed["text"], target_role, depth, parsed.get("chunks"), parsed.get("chunk_terms"))
+    return (f"feedback:{feedback_key}", "feedback", run)
+
+def summary_stage(summary_key):
+    """Speculative stage that writes the candidate report of the parsed CV"""
+    return (f"summary:{summary_key}", "summary", lambda parsed: agents['summary_agent'].generate_summary(parsed["text"]))
+
+def iter_uploads(uploads, ingestor):
+    """PDFs of the given uploads as they are read: archives are unpacked in memory, non-PDFs and copies dropped"""
+    for upload in uploads:
+        yield from ingestor.iter_pdfs(upload, upload.name)
+
+def upload_manifest(uploads):
+    """
+    (name, content hash) of each PDF of the multi-CV uploads, kept until the uploads change
+
+    Only names and hashes are kept in the session; PDF bytes are read from the uploads again when needed
+    """
+    upload_ids = tuple(upload.file_id for upload in uploads)
+    cached = st.session_state.get('multi_cv_ingested')
+    if cached is None or cached[0] != upload_ids:
+        manifest = [(pdf.name, pdf.content_hash) for pdf in iter_uploads(uploads, Ingestor())]
+        cached = st.session_state.multi_cv_ingested = (upload_ids, manifest)
+    return cached[1]
+
+def speculate(area, pipelines=(), keys=None):
+    """
+    Start this session's speculative work for an upload area
+
+    Args:
+        area: Upload area name; its earlier stages that are no longer wanted are cancelled
+        pipelines: (stages, initial) pairs for Speculator.start; empty when the upload was removed
+            or speculation is off. May be a function returning them, called only when keys changed
+        keys: Keys of the stages pipelines returns; required when pipelines is a function
+    """
+    wanted = set(keys) if keys is not None else {key for stages, _ in pipelines for key, _, _ in stages}
+    previous = st.session_state.speculative_keys.get(area, set())
+    # Unchanged uploads and settings start nothing: a claimed or expired stage is not redone
+    if wanted == previous:
+        return
+    owner = st.session_state.session_id
+    if previous - wanted:
+        speculator.cancel(owner, previous - wanted)
+    for stages, initial in (pipelines() if callable(pipelines) else pipelines):
+        speculator.start(owner, stages, initial)
+    st.session_state.speculative_keys[area] = wanted
+
+def safe_check_ats_score(cv_text, target_role, job_description, cache_key=None, keyword_report=None):
     """Safely check ATS score with error handling"""
     try:
         # Check cache first
         if cache_key and cache_key in st.session_state.ats_cache:
+            metrics.incr("cache_hits", cache="ats")
             return st.session_state.ats_cache[cache_key]
+        metrics.incr("cache_misses", cache="ats")
 
         with st.spinner("🔍 Analyzing ATS compatibility..."):
-            ats_analysis = agents['feedback_agent'].check_ats_score(cv_text, target_role, job_description)
+            started = time.perf_counter()
+            ats_analysis = agents['feedback_agent'].check_ats_score(cv_text, target_role, job_description,
+                                                                    keyword_report)
 
             # Cache the result
             if cache_key and enable_caching:
                 st.session_state.ats_cache[cache_key] = ats_analysis
 
             # Add to history
-            st.session_state.analysis_history.append({
-                'type': 'ATS Score',
-                'filename': 'CV Analysis',
-                'timestamp': datetime.now().isoformat(),
-                'role': target_role or 'General'
-            })
+            record_analysis('ATS Score', 'CV Analysis', target_role or 'General', started=started)
 
             return ats_analysis
     except Exception as e:
+        metrics.incr("ui_errors", operation="ats")
         st.error(f"❌ Error checking ATS score: {str(e)}")
         st.info("💡 Make sure Ollama is running with the required model (llama3.2)")
         return None
 
+def keyword_ats_score(parsed, job_description):
+    """Deterministic keyword ATS score; None when there is no job description to score against"""
+    if not job_description or not job_description.strip():
+        return None
+    with metrics.timed("ats_keyword_score"):
+        return agents['ats_scorer'].score(parsed, job_description)
+
+def prefilter_candidate(candidates, file_name, parsed, pdf_hash, signature, job_description):
+    """Cascade stage 1: add a CV with its keyword ATS and prefilter scores but no match scores yet"""
+    ats = keyword_ats_score(parsed, job_description)
+    prefilter = prefilter_score(ats, job_description) if ats else None
+    return candidates.add(file_name, parsed, None, pdf_hash, signature, ats['score'] if ats else None, prefilter)
+
+def cascade_selection(candidates, rows, config):
+    """Cascade stage 2: the prefiltered rows worth embedding and matching, best prefilter score first"""
+    scores = candidates.column('prefilter_score')[list(rows)] if rows else []
+    selected = [rows[i] for i in select_for_matching(scores, config)]
+    metrics.incr("cascade_prefiltered", len(rows))
+    metrics.incr("cascade_screened_out", len(rows) - len(selected))
+    return selected
+
+def render_keyword_ats(result):
+    """Show the keyword ATS score, keyword coverage and section checks"""
+    score_col, rate_col, required_col = st.columns(3)
+    with score_col:
+        st.metric("Keyword ATS Score", f"{result['score']}/100")
+    with rate_col:
+        st.metric("Keyword Match Rate", f"{result['match_rate']:.0%}",
+                  help=f"{result['weighted_match_rate']:.0%} weighted by required / preferred keywords")
+    with required_col:
+        st.metric("Missing Required Keywords", len(result['missing_required']))
+    if result['missing_keywords']:
+        st.markdown("**❌ Missing keywords:** " + ", ".join(
+            f"{item['keyword']} ({item['importance']})" for item in result['missing_keywords']))
+    if result['matched_keywords']:
+        st.markdown("**✅ Found keywords:** " + ", ".join(
+            f"{item['keyword']} ({', '.join(item['sections'])})" for item in result['matched_keywords']))
+    st.markdown("**📑 Sections:** " + " · ".join(
+        f"{'✅' if found else '❌'} {name.title()}" for name, found in result['section_checks'].items()))
+
 def safe_analyze_skills(cv_text, target_role, job_description, cache_key=None):
     """Safely analyze skills with error handling"""
     try:
         # Check cache first
         if cache_key and cache_key in st.session_state.skills_cache:
+            metrics.incr("cache_hits", cache="skills")
             return st.session_state.skills_cache[cache_key]
+        metrics.incr("cache_misses", cache="skills")
 
         with st.spinner("📊 Analyzing skills..."):
+            started = time.perf_counter()
             skills_analysis = agents['feedback_agent'].analyze_skills(cv_text, target_role, job_description)
 
             # Cache the result
@@ -337,19 +748,334 @@ def safe_analyze_skills(cv_text, target_role, job_description, cache_key=None):
                 st.session_state.skills_cache[cache_key] = skills_analysis
 
             # Add to history
-            st.session_state.analysis_history.append({
-                'type': 'Skills Analysis',
-                'filename': 'CV Analysis',
-                'timestamp': datetime.now().isoformat(),
-                'role': target_role or 'General'
-            })
+            record_analysis('Skills Analysis', 'CV Analysis', target_role or 'General', started=started)
 
             return skills_analysis
     except Exception as e:
+        metrics.incr("ui_errors", operation="skills")
         st.error(f"❌ Error analyzing skills: {str(e)}")
         st.info("💡 Make sure Ollama is running with the required model (llama3.2)")
         return None
 
+def render_metrics_panel():
+    """Show per-stage latency percentiles and counters from the metrics registry"""
+    snap = metrics.snapshot()
+
+    if not snap['stages'] and not snap['counters']:
+        st.info("⏱️ No timing data recorded yet. Metrics appear once a CV has been parsed or analyzed.")
+        return
+
+    counters = {}
+    for c in snap['counters']:
+        counters.setdefault(c['counter'], 0)
+        counters[c['counter']] += c['value']
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        hits, misses = counters.get('cache_hits', 0), counters.get('cache_misses', 0)
+        speculative_hits = counters.get('speculative_hits', 0)
+        st.metric("Cache Hit Rate", f"{hits / (hits + misses):.1%}" if hits + misses else "-",
+                  help=f"Speculative results used: {int(speculative_hits)} "
+                       f"({int(counters.get('speculative_unclaimed', 0))} expired unused, "
+                       f"{int(counters.get('speculative_cancelled', 0))} cancelled)"
+                  if counters.get('speculative_started') else None)
+    with col2:
+        st.metric("Pages Parsed", int(counters.get('pages_parsed', 0)))
+    with col3:
+        embed_hits = counters.get('embedding_cache_hits', 0)
+        embed_lookups = embed_hits + counters.get('embedding_cache_misses', 0)
+        st.metric("Texts Embedded", int(counters.get('embedded_texts', 0)),
+                  help=f"Embedding cache hit rate: {embed_hits / embed_lookups:.1%}" if embed_lookups else None)
+    with col4:
+        # ui_errors counts each failed user action once; the stage counters below it would count it again
+        backend_errors = {k: int(v) for k, v in counters.items() if k.endswith('errors') and k != 'ui_errors' and v}
+        st.metric("Errors", int(counters.get('ui_errors', 0)),
+                  help="Failed actions. Underlying errors: "
+                       + ", ".join(f"{k} {v}" for k, v in sorted(backend_errors.items()))
+                  if backend_errors else None)
+
+    # Model calls in flight and waiting per scheduler, by priority class
+    queue_parts = []
+    for kind in KINDS:
+        status = get_scheduler(kind).status()
+        queue_parts.append(f"{kind}: {sum(status['active'].values())}/{status['slots']} slots busy, waiting "
+                           + ", ".join(f"{n} {priority}" for priority, n in status['waiting'].items()))
+    st.caption("Model call queue: " + " | ".join(queue_parts))
+    pool = get_pool()
+    if pool is not None:
+        st.caption("Ollama endpoints: " + " | ".join(
+            f"{'🟢' if endpoint['healthy'] else '🔴'} {endpoint['url']} ({'/'.join(endpoint['roles'])}, "
+            f"{endpoint['in_flight']} in flight)"
+            for endpoint in pool.status()
+        ))
+
+    stage_rows = [
+        {
+            'Stage': row['stage'],
+            'Labels': ", ".join(f"{k}={v}" for k, v in row['labels'].items()) or '-',
+            'Count': row['count'],
+            'p50 (ms)': round(row['p50_ms'], 1),
+            'p95 (ms)': round(row['p95_ms'], 1),
+            'Mean (ms)': round(row['mean_ms'], 1),
+        }
+        for row in snap['stages']
+    ]
+    if stage_rows:
+        st.dataframe(stage_rows, width='stretch', hide_index=True)
+
+    with st.expander("🔢 Counters"):
+        st.dataframe(
+            [
+                {
+                    'Counter': c['counter'],
+                    'Labels': ", ".join(f"{k}={v}" for k, v in c['labels'].items()) or '-',
+                    'Value': c['value'],
+                }
+                for c in snap['counters']
+            ],
+            width='stretch',
+            hide_index=True
+        )
+
+    st.download_button(
+        label="📥 Export Metrics (Prometheus)",
+        data=metrics.to_prometheus(),
+        file_name=f"cv_analyzer_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prom",
+        mime="text/plain",
+        key="download_metrics"
+    )
+
+def clear_background_jobs():
+    """Forget the current batch / verdict jobs and cancel anything still queued"""
+    if st.session_state.multi_cv_batch:
+        job_queue.cancel(group_id=st.session_state.multi_cv_batch)
+    if st.session_state.multi_cv_match_batch:
+        job_queue.cancel(group_id=st.session_state.multi_cv_match_batch)
+    if st.session_state.multi_cv_verdict_job:
+        job_queue.cancel(job_id=st.session_state.multi_cv_verdict_job)
+    st.session_state.multi_cv_batch = None
+    st.session_state.multi_cv_match_batch = None
+    st.session_state.multi_cv_batch_prefiltered = None
+    st.session_state.multi_cv_batch_collected = False
+    st.session_state.multi_cv_batch_restored = False
+    st.session_state.multi_cv_batch_errors = []
+    st.session_state.multi_cv_ingest_summary = None
+    st.session_state.multi_cv_verdict_job = None
+    st.query_params.pop('batch', None)
+    st.query_params.pop('match_batch', None)
+    st.query_params.pop('verdict_job', None)
+
+def prefilter_batch(group_id):
+    """Turn a finished batch of parse jobs into prefiltered candidates (no match scores yet)"""
+    new_candidates, errors, parsed_rows = CandidateStore(), [], {}
+    for job in job_queue.group(group_id):
+        file_name = job['payload'].get('file_name', 'CV')
+        if job['status'] == DONE:
+            parsed = job['result']['parsed']
+            pdf_hash = job['payload'].get('content_hash')
+            signature = text_signature(parsed['text'])
+            row = new_candidates.find_duplicate(signature, parsed.get('structured_info', {}))
+            if row is None:
+                row = prefilter_candidate(new_candidates, file_name, parsed, pdf_hash, signature,
+                                          job['payload'].get('job_description'))
+                parsed_rows[row] = (job, parsed)
+            else:
+                new_candidates.add_duplicate(row, file_name)
+            for duplicate_name in job['payload'].get('duplicate_files', []):
+                new_candidates.add_duplicate(row, duplicate_name)
+            if pdf_hash:
+                parse_cache.put(parse_cache_key(pdf_hash, job['payload'].get('layout_aware')), parsed)
+        elif job['status'] == FAILED:
+            errors.append(f"{file_name}: {(job['error'] or '').splitlines()[0]}")
+        st.session_state.multi_cv_jd = job['payload'].get('job_description', st.session_state.multi_cv_jd)
+    return new_candidates, errors, parsed_rows
+
+def queue_batch_matches(group_id):
+    """Prefilter a parsed batch and queue match jobs for the CVs that pass; False when none do"""
+    new_candidates, errors, parsed_rows = prefilter_batch(group_id)
+    st.session_state.multi_cv_candidates = new_candidates
+    st.session_state.multi_cv_batch_errors = errors
+    st.session_state.multi_cv_batch_prefiltered = group_id
+    if not parsed_rows:
+        return False
+    first_payload = next(iter(parsed_rows.values()))[0]['payload']
+    selected = cascade_selection(new_candidates, list(parsed_rows), CascadeConfig(**first_payload.get('cascade', {})))
+    if not selected:
+        return False
+
+    match_group = uuid.uuid4().hex
+    for row in selected:
+        job, parsed = parsed_rows[row]
+        job_queue.enqueue(
+            'match',
+            {'job_description': job['payload']['job_description'], 'file_name': job['payload'].get('file_name', 'CV'),
+             'chunks': parsed['chunks'], 'chunk_terms': parsed.get('chunk_terms'),
+             'match_mode': job['payload'].get('match_mode')},
+            group_id=match_group,
+            session_id=st.session_state.session_id
+        )
+    st.session_state.multi_cv_match_batch = match_group
+    st.query_params['match_batch'] = match_group
+    return True
+
+def collect_batch_matches():
+    """Store the scores of a finished batch of match jobs on the prefiltered candidates"""
+    if st.session_state.multi_cv_batch_prefiltered != st.session_state.multi_cv_batch:
+        # Restored from the URL: rebuild the prefiltered ranking the match jobs belong to
+        new_candidates, errors, _ = prefilter_batch(st.session_state.multi_cv_batch)
+        st.session_state.multi_cv_candidates = new_candidates
+        st.session_state.multi_cv_batch_errors = errors
+        st.session_state.multi_cv_batch_prefiltered = st.session_state.multi_cv_batch
+    candidates = st.session_state.multi_cv_candidates
+    rows_by_file = {name: row for row, name in enumerate(candidates.column('file_name'))}
+    for job in job_queue.group(st.session_state.multi_cv_match_batch):
+        file_name = job['payload'].get('file_name', 'CV')
+        if job['status'] == DONE and file_name in rows_by_file:
+            match = job['result']['match']
+            candidates.set_match(rows_by_file[file_name], match)
+            if not st.session_state.multi_cv_batch_restored:
+                history.record(
+                    'Match Score',
+                    filename=file_name,
+                    score=match['max_score'],
+                    duration_ms=(job['finished_at'] - job['started_at']) * 1000,
+                    session_id=st.session_state.session_id
+                )
+        elif job['status'] == FAILED:
+            st.session_state.multi_cv_batch_errors.append(f"{file_name}: {(job['error'] or '').splitlines()[0]}")
+
+def render_batch_progress():
+    """Poll the background batch: parse and prefilter every CV, then match the ones that pass"""
+    matching = bool(st.session_state.multi_cv_match_batch)
+    group_id = st.session_state.multi_cv_match_batch if matching else st.session_state.multi_cv_batch
+    progress = job_queue.group_progress(group_id)
+    total = sum(progress.values())
+    if total == 0:
+        clear_background_jobs()
+        return
+
+    finished = sum(progress.get(state, 0) for state in FINISHED_STATES)
+    if finished < total:
+        stage = "CVs matched" if matching else "CVs parsed"
+        st.progress(finished / total, text=f"⏳ Background analysis: {finished}/{total} {stage}")
+        if progress.get(QUEUED) and job_queue.live_workers() == 0:
+            st.warning("⚠️ No worker processes are running. Start them with `python -m services.worker`.")
+        if st.button("⏹️ Cancel Batch", key="cancel_batch"):
+            clear_background_jobs()
+            st.rerun(scope="app")
+        return
+
+    if matching:
+        collect_batch_matches()
+        st.session_state.multi_cv_batch_collected = True
+    elif not queue_batch_matches(group_id):
+        st.session_state.multi_cv_batch_collected = True
+    st.rerun(scope="app")
+
+def render_verdict_progress():
+    """Poll the background final-verdict job"""
+    job = job_queue.get(st.session_state.multi_cv_verdict_job)
+    if job is None or job['status'] not in FINISHED_STATES:
+        st.info("⏳ Generating final verdict in the background...")
+        return
+    if job['status'] == DONE:
+        st.session_state.multi_cv_final_verdict = job['result']['text']
+    elif job['status'] == FAILED:
+        st.session_state.multi_cv_batch_errors = [f"Final verdict: {(job['error'] or '').splitlines()[0]}"]
+    st.session_state.multi_cv_verdict_job = None
+    st.query_params.pop('verdict_job', None)
+    st.rerun(scope="app")
+
+RANKING_SORT_OPTIONS = {
+    "Overall Rating": "overall_rating",
+    "Max Score": "max_score",
+    "Avg Score": "avg_score",
+    "Experience": "experience_years",
+    "ATS Score": "ats_score",
+    "Prefilter Score": "prefilter_score",
+}
+
+def render_candidate_table(candidates):
+    """Filter, sort and paginate the ranking on the store's numeric columns; only the visible page is rendered"""
+    filter_col1, filter_col2, filter_col3, filter_col4 = st.columns([1, 1, 2, 1])
+    with filter_col1:
+        sort_label = st.selectbox("Sort by", list(RANKING_SORT_OPTIONS), key="ranking_sort")
+        ascending = st.toggle("Ascending", key="ranking_ascending")
+    with filter_col2:
+        min_score = st.slider("Min Overall Rating (%)", 0, 100, 0, key="ranking_min_score")
+    with filter_col3:
+        skill_options = candidates.skills
+        # Drop selections that no longer exist (e.g. after the candidates were cleared)
+        st.session_state.ranking_skills = [
+            skill for skill in st.session_state.get("ranking_skills", []) if skill in skill_options
+        ]
+        required_skills = st.multiselect("Required Skills", skill_options, key="ranking_skills")
+    with filter_col4:
+        min_experience = st.number_input("Min Experience (Yrs)", min_value=0, max_value=60, step=1,
+                                         key="ranking_min_experience")
+
+    indices = candidates.select(
+        sort_by=RANKING_SORT_OPTIONS[sort_label],
+        descending=not ascending,
+        min_score=min_score / 100 if min_score else None,
+        skills=required_skills,
+        min_experience=min_experience or None
+    )
+    total = len(indices)
+    if total == 0:
+        st.info("🔍 No candidates match the current filters")
+        return
+
+    page_col1, page_col2, page_col3 = st.columns([1, 1, 3])
+    with page_col1:
+        page_size = st.selectbox("Rows per Page", [10, 25, 50, 100], key="ranking_page_size")
+    page_count = -(-total // page_size)
+    if st.session_state.get("ranking_page", 1) > page_count:
+        st.session_state.ranking_page = page_count
+    with page_col2:
+        page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="ranking_page")
+    start = (page - 1) * page_size
+    visible = indices[start:start + page_size]
+    with page_col3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        duplicates = candidates.duplicate_count()
+        screened_out = len(candidates) - candidates.matched_count()
+        st.caption(f"Showing {start + 1}–{start + len(visible)} of {total} matching candidates "
+                   f"({len(candidates)} total"
+                   + (f", {screened_out} not matched after the keyword prefilter" if screened_out else "")
+                   + (f", {duplicates} duplicate CVs folded into existing candidates)" if duplicates else ")"))
+
+    import numpy as np
+    import pandas as pd
+
+    columns = candidates.take(visible)
+    df = pd.DataFrame({
+        '#': np.arange(start + 1, start + len(visible) + 1),
+        'Candidate Name': columns['name'],
+        'Email': columns['email'],
+        'LinkedIn': columns['linkedin'],
+        'GitHub': columns['github'],
+        'Experience (Yrs)': columns['experience_years'],
+        'Max Score': columns['max_score'] * 100,
+        'Avg Score': columns['avg_score'] * 100,
+        'Overall Rating': columns['overall_rating'] * 100,
+        'ATS Score': columns['ats_score'],
+        'Prefilter': columns['prefilter_score'] * 100,
+        'Versions': columns['versions'],
+    })
+
+    # Highlight the best candidate overall (not just the best on this page)
+    is_best = np.abs(columns['overall_rating'] - candidates.best_rating()) < 0.001
+    row_styles = np.where(is_best, 'background-color: #5a9c5c', '')  # green
+    styled_df = df.style.apply(
+        lambda frame: np.repeat(row_styles[:, None], frame.shape[1], axis=1), axis=None
+    ).format(
+        {'Experience (Yrs)': '{:.0f}', 'Max Score': '{:.1f}%', 'Avg Score': '{:.1f}%', 'Overall Rating': '{:.1f}%',
+         'ATS Score': '{:.0f}', 'Prefilter': '{:.0f}%'},
+        na_rep='-'
+    )
+    st.dataframe(styled_df, width='stretch', hide_index=True)
+
 # Main tabs
 tab1, tab2, tab3 = st.tabs(["🎯 Candidate Portal", "👔 Recruiter Dashboard", "📈 Analytics"])
 
@@ -384,23 +1110,26 @@ with tab1:
 
         analysis_type = st.radio(
             "Analysis Type",
-            ["Quick Review", "Detailed Analysis"],
-            help="Quick Review provides key points, Detailed Analysis gives comprehensive feedback"
+            list(REVIEW_DEPTH_OPTIONS),
+            help="Quick Review uses a smaller model and a short prompt on the most relevant parts of your CV "
+                 "and returns key points in seconds; Detailed Analysis gives comprehensive feedback"
         )
 
+    if not uploaded_cv:
+        speculate('candidate')
     if uploaded_cv:
         # Create cache key
-        cache_key = f"{uploaded_cv.name}_{uploaded_cv.size}"
+        cache_key = content_hash(uploaded_cv.getvalue())
         
-        # Save uploaded file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(uploaded_cv.read())
-            tmp_path = tmp_file.name
-
-        # Parse CV
-        parsed = safe_parse_cv(tmp_path, cache_key)
+        # Parse CV straight from the in-memory upload
+        parsed = safe_parse_cv(uploaded_cv, cache_key)
         
         if parsed:
+            feedback_key = f"{cache_key}_{target_role}_{analysis_type}"
+            # AI feedback is the usual next click; start it while the preview is read
+            speculate('candidate', [([feedback_stage(feedback_key, target_role, REVIEW_DEPTH_OPTIONS[analysis_type])], parsed)]
+                      if speculative_llm and feedback_key not in st.session_state.feedback_cache else [])
+
             # Display CV preview in an expander
             with st.expander("📄 CV Content Preview", expanded=False):
                 # Show first 1000 characters
@@ -414,18 +1143,30 @@ with tab1:
                 with col2:
                     st.metric("Character Count", len(parsed["text"]))
                 with col3:
-                    st.metric("Chunks", len(parsed["chunks"]))
+                    chunk_stats = parsed.get("chunk_stats") or {}
+                    if "tokens_total" not in chunk_stats:
+                        # Character chunkings carry only their count; size the previewed CV's chunks here
+                        chunk_stats = token_stats(parsed["chunks"], agents['cv_parser'].embed_model)
+                    st.metric("Chunks", len(parsed["chunks"]),
+                              help=(f"Tokens per chunk: min {chunk_stats['tokens_min']}, mean {chunk_stats['tokens_mean']}, "
+                                    f"max {chunk_stats['tokens_max']} ({chunk_stats['tokens_total']} in total, "
+                                    f"{chunk_stats['tokenizer']} tokenizer)") if chunk_stats else None)
+                if chunk_stats and chunk_stats["over_context"]:
+                    st.warning(f"⚠️ {chunk_stats['over_context']} chunk(s) exceed the embedding model's "
+                               f"{chunk_stats['context_window']}-token context and will be truncated; "
+                               "lower the chunk size or chunk by tokens")
 
             # Action buttons
             col1, col2, col3 = st.columns(3)
             
             with col1:
                 if st.button("🚀 Get AI Feedback", type="primary", width="stretch"):
-                    feedback_key = f"{cache_key}_{target_role}_{analysis_type}"
                     suggestions = safe_get_feedback(
                         parsed["text"],
                         target_role,
-                        feedback_key if enable_caching else None
+                        feedback_key if enable_caching else None,
+                        REVIEW_DEPTH_OPTIONS[analysis_type],
+                        parsed
                     )
                     
                     if suggestions:
@@ -448,25 +1189,30 @@ with tab1:
                     if not job_description or not job_description.strip():
                         st.warning("⚠️ Please provide a job description for ATS Score analysis. This is required to accurately match your CV against the job requirements.")
                     else:
+                        # The keyword score is instant; the LLM only explains it
+                        keyword_result = keyword_ats_score(parsed, job_description)
+                        st.markdown("---")
+                        st.markdown("### 🔍 ATS Compatibility Analysis")
+                        render_keyword_ats(keyword_result)
+                        keyword_report = format_report(keyword_result)
+
                         ats_key = f"{cache_key}_{target_role}_{hash(job_description)}_ats"
                         ats_analysis = safe_check_ats_score(
                             parsed["text"],
                             target_role,
                             job_description,
-                            ats_key if enable_caching else None
+                            ats_key if enable_caching else None,
+                            keyword_report
                         )
 
                         if ats_analysis:
-                            st.markdown("---")
-                            st.markdown("### 🔍 ATS Compatibility Analysis")
-
                             # Display ATS analysis in a nice container
                             st.info(ats_analysis)
 
                             # Download button for ATS analysis
                             st.download_button(
                                 label="📥 Download ATS Report",
-                                data=ats_analysis,
+                                data=f"{keyword_report}\n\n{ats_analysis}",
                                 file_name=f"ats_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
                                 mime="text/plain"
                             )
@@ -511,9 +1257,10 @@ with tab2:
             st.session_state.recruiter_parsed = None
             st.session_state.recruiter_cache_key = None
             st.session_state.recruiter_cv_name = None
-            st.session_state.multi_cv_candidates = []
+            st.session_state.multi_cv_candidates = CandidateStore()
             st.session_state.multi_cv_jd = None
             st.session_state.multi_cv_final_verdict = None
+            clear_background_jobs()
             st.rerun()
 
     # Toggle for Single/Multiple CV mode
@@ -545,17 +1292,27 @@ with tab2:
             if uploaded_cv:
                 st.success(f"✅ File uploaded: {uploaded_cv.name}")
 
+        # Parse, embed and (optionally) write the report while the job description is pasted
+        if uploaded_cv and speculative:
+            pdf_hash = content_hash(uploaded_cv.getvalue())
+            parse = parse_stage(uploaded_cv.getvalue(), parse_cache_key(pdf_hash, layout_aware))
+            pipelines = []
+            if match_mode != "lexical":
+                pipelines.append(([parse, embed_stage(parse_cache_key(pdf_hash, layout_aware))], None))
+            if speculative_llm and f"{pdf_hash}_summary" not in st.session_state.summary_cache:
+                # A separate pipeline, so a failed embedding does not cancel the report
+                pipelines.append(([parse, summary_stage(f"{pdf_hash}_summary")], None))
+            speculate('recruiter', pipelines or [([parse], None)])
+        else:
+            speculate('recruiter')
+
         # Add button to trigger match analysis
         if uploaded_cv and jd_input:
             if st.button("🎯 Generate Match Analysis", type="primary", width="stretch"):
                 # Create cache key
-                cache_key = f"{uploaded_cv.name}_{uploaded_cv.size}"
-
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                    tmp_file.write(uploaded_cv.read())
-                    tmp_path = tmp_file.name
+                cache_key = content_hash(uploaded_cv.getvalue())
 
-                parsed = safe_parse_cv(tmp_path, cache_key)
+                parsed = safe_parse_cv(uploaded_cv, cache_key)
 
                 if parsed:
                     # Store parsed data in session state for later use
@@ -563,8 +1320,12 @@ with tab2:
                     st.session_state.recruiter_cache_key = cache_key
                     st.session_state.recruiter_jd = jd_input
 
+                    if match_mode != "lexical":
+                        # Chunk vectors embedded on upload are in the vector store once this returns
+                        speculator.claim(embed_stage(parse_cache_key(cache_key, layout_aware))[0])
+
                     # Match scores
-                    result = safe_match_jd(parsed["chunks"], jd_input)
+                    result = safe_match_jd(parsed["chunks"], jd_input, uploaded_cv.name, parsed.get("chunk_terms"))
 
                     if result:
                         st.session_state.recruiter_match_result = result
@@ -627,7 +1388,13 @@ with tab2:
                     )[:3]
 
                     for idx, score in sorted_scores:
-                        st.write(f"**Chunk {idx+1}** - Score: {score:.2%}")
+                        components = []
+                        if 'dense_scores' in result:
+                            components.append(f"semantic {result['dense_scores'][idx]:.2%}")
+                        if 'lexical_scores' in result:
+                            components.append(f"keyword {result['lexical_scores'][idx]:.2%}")
+                        st.write(f"**Chunk {idx+1}** - Score: {score:.2%}"
+                                 + (f" ({', '.join(components)})" if len(components) > 1 else ""))
                         st.text(parsed["chunks"][idx][:200] + "...")
 
             # Action buttons
@@ -727,100 +1494,156 @@ DETAILED ANALYSIS:
 
         with upload_col1:
             uploaded_cvs = st.file_uploader(
-                "📄 Upload Candidate CVs (PDF)",
-                type=["pdf"],
+                "📄 Upload Candidate CVs (PDF, or ZIP/TAR exports)",
+                type=list(UPLOAD_TYPES),
                 key="multi_cv_upload",
                 accept_multiple_files=True,
-                help="Upload multiple candidate CVs for ranking"
+                help="Upload multiple candidate CVs for ranking. Job-board exports can be uploaded as ZIP or "
+                     "TAR archives: they are read in memory, only real PDFs are kept and identical files count once"
             )
+            with st.expander("📁 Upload a Folder"):
+                uploaded_folder = st.file_uploader(
+                    "Folder of CVs",
+                    type=list(UPLOAD_TYPES),
+                    key="multi_cv_folder",
+                    accept_multiple_files="directory",
+                    help="Every PDF and archive in the folder and its subfolders"
+                )
+            uploaded_cvs = (uploaded_cvs or []) + (uploaded_folder or [])
 
         with upload_col2:
             st.markdown("<br>", unsafe_allow_html=True)
             add_more = st.button("➕ Add More", key="add_more_cv", width="stretch",
                                 help="Click to add more CVs to the existing list")
 
+        # Parse uploads ahead of the click; background batches are parsed by the workers instead
+        if uploaded_cvs and speculative and not use_background_jobs:
+            # The uploads are only read again (for their bytes) when the wanted parse keys changed
+            speculate('multi_cv',
+                      lambda: [([parse_stage(pdf.data, parse_cache_key(pdf.content_hash, layout_aware))], None)
+                               for pdf in iter_uploads(uploaded_cvs, Ingestor())],
+                      keys=[f"parse:{parse_cache_key(pdf_hash, layout_aware)}"
+                            for _, pdf_hash in upload_manifest(uploaded_cvs)])
+        else:
+            speculate('multi_cv')
+
         # Process uploaded CVs
         if uploaded_cvs and multi_jd_input:
             if st.button("🎯 Analyze All Candidates", type="primary", width="stretch"):
+                if use_background_jobs:
+                    # Queue one parse job per CV; render_batch_progress prefilters the results
+                    # and queues match jobs for the CVs that pass
+                    clear_background_jobs()
+                    group_id = uuid.uuid4().hex
+                    # Each PDF is queued as soon as it is read from its upload or archive, so the workers
+                    # start while the rest is decompressed. Byte-identical files share one job;
+                    # near-duplicates are folded in when collecting
+                    ingestor = Ingestor()
+                    payload = {'job_description': multi_jd_input,
+                               'chunk_size': chunk_size, 'chunk_overlap': chunk_overlap, 'chunk_unit': chunk_unit,
+                               'layout_aware': layout_aware, 'match_mode': match_mode,
+                               'cascade': vars(cascade_config)}
+                    queue_status = st.empty()
+
+                    def stream_uploads():
+                        for queued, pdf in enumerate(iter_uploads(uploaded_cvs, ingestor), 1):
+                            queue_status.text(f"📦 Queued {queued} CVs for the workers: {pdf.name}")
+                            yield pdf
+                    jobs = enqueue_parse_jobs(job_queue, stream_uploads(), payload, group_id,
+                                              st.session_state.session_id, ingestor)
+                    st.session_state.multi_cv_ingest_summary = ingestor.summary()
+                    st.session_state.multi_cv_batch_errors = ingestor.errors
+                    st.session_state.multi_cv_ingested = None
+                    if jobs:
+                        st.session_state.multi_cv_batch = group_id
+                        st.query_params['batch'] = group_id
+                        st.session_state.multi_cv_final_verdict = None
+                    st.rerun()
+
                 progress_bar = st.progress(0)
                 status_text = st.empty()
 
-                new_candidates = []
-                total_files = len(uploaded_cvs)
+                # "Add More" appends to the current ranking, otherwise it is rebuilt
+                candidates = st.session_state.multi_cv_candidates if add_more else CandidateStore()
+                # PDFs are read from the uploads one at a time; the manifest only supplies the count
+                ingestor = Ingestor()
+                total_files = len(upload_manifest(uploaded_cvs))
 
-                for i, cv_file in enumerate(uploaded_cvs):
-                    status_text.text(f"Processing {cv_file.name}... ({i+1}/{total_files})")
-                    progress_bar.progress((i + 1) / total_files)
+                # Stage 1: parse every CV and score it on keywords and skills
+                parsed_rows, rows_by_hash = {}, {}
+                for i, pdf in enumerate(iter_uploads(uploaded_cvs, ingestor)):
+                    status_text.text(f"Parsing {pdf.name}... ({i+1}/{total_files})")
+                    progress_bar.progress((i + 1) / total_files / 2)
 
                     # Check if already processed
-                    existing_names = [c.get('file_name') for c in st.session_state.multi_cv_candidates]
-                    if cv_file.name in existing_names and not add_more:
+                    if candidates.contains_file(pdf.name):
                         continue
 
                     # Create cache key
-                    cache_key = f"{cv_file.name}_{cv_file.size}"
-
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                        tmp_file.write(cv_file.read())
-                        tmp_path = tmp_file.name
+                    cache_key = pdf.content_hash
 
                     # Parse CV
-                    parsed = safe_parse_cv(tmp_path, cache_key)
+                    parsed = safe_parse_cv(pdf.data, cache_key)
 
                     if parsed:
-                        # Match scores
-                        result = safe_match_jd(parsed["chunks"], multi_jd_input)
-
+                        # Fold re-submitted CVs (same email/phone or near-identical text)
+                        # into the existing candidate before paying for embeddings
+                        with metrics.timed("dedup"):
+                            signature = text_signature(parsed["text"])
+                            duplicate_row = candidates.find_duplicate(signature, parsed.get("structured_info", {}))
+                        if duplicate_row is not None:
+                            candidates.add_duplicate(duplicate_row, pdf.name)
+                            rows_by_hash[pdf.content_hash] = duplicate_row
+                            metrics.incr("duplicates_skipped")
+                            continue
+
+                        row = prefilter_candidate(candidates, pdf.name, parsed, cache_key, signature, multi_jd_input)
+                        parsed_rows[row] = (pdf.name, parsed)
+                        rows_by_hash[pdf.content_hash] = row
+
+                st.session_state.multi_cv_ingest_summary = ingestor.summary()
+                st.session_state.multi_cv_batch_errors = list(ingestor.errors)
+
+                # Byte-identical files were only read once
+                for pdf_hash, duplicate_names in ingestor.duplicates.items():
+                    if pdf_hash in rows_by_hash:
+                        for duplicate_name in duplicate_names:
+                            if not candidates.contains_file(duplicate_name):
+                                candidates.add_duplicate(rows_by_hash[pdf_hash], duplicate_name)
+
+                # Stage 2: embed and match only the CVs that passed the prefilter, at batch priority
+                selected = cascade_selection(candidates, list(parsed_rows), cascade_config)
+                with scheduling("batch"):
+                    for i, row in enumerate(selected):
+                        file_name, parsed = parsed_rows[row]
+                        status_text.text(f"Matching {file_name}... ({i+1}/{len(selected)})")
+                        progress_bar.progress(0.5 + (i + 1) / len(selected) / 2)
+                        result = safe_match_jd(parsed["chunks"], multi_jd_input, file_name, parsed.get("chunk_terms"))
                         if result:
-                            # Extract structured info
-                            struct_info = parsed.get("structured_info", {})
-
-                            # Calculate overall rating (weighted average)
-                            overall_rating = (result['max_score'] * 0.6 + result['avg_score'] * 0.4)
-
-                            # Get candidate name with fallback to filename
-                            candidate_name = struct_info.get('name')
-                            if not candidate_name:
-                                # Try to extract name from filename (e.g., "John_Doe_Resume.pdf")
-                                filename_base = cv_file.name.rsplit('.', 1)[0]  # Remove extension
-                                # Clean up common suffixes
-                                for suffix in ['_resume', '_cv', '_Resume', '_CV', '-resume', '-cv', ' resume', ' cv']:
-                                    filename_base = filename_base.replace(suffix, '')
-                                # Replace underscores/dashes with spaces and title case
-                                filename_name = filename_base.replace('_', ' ').replace('-', ' ').strip()
-                                if filename_name and len(filename_name) > 2:
-                                    candidate_name = filename_name.title()
-                                else:
-                                    candidate_name = '-'
-
-                            candidate_data = {
-                                'file_name': cv_file.name,
-                                'name': candidate_name,
-                                'email': struct_info.get('email') or '-',
-                                'linkedin': struct_info.get('linkedin') or '-',
-                                'github': struct_info.get('github') or '-',
-                                'experience_years': struct_info.get('experience_years') or '-',
-                                'max_score': result['max_score'],
-                                'avg_score': result['avg_score'],
-                                'overall_rating': overall_rating,
-                                'parsed_data': parsed,
-                                'match_result': result
-                            }
-                            new_candidates.append(candidate_data)
-
-                # Add to existing candidates or replace
-                if add_more:
-                    st.session_state.multi_cv_candidates.extend(new_candidates)
-                else:
-                    st.session_state.multi_cv_candidates = new_candidates
+                            candidates.set_match(row, result)
+
+                st.session_state.multi_cv_candidates = candidates
 
                 # Clear the final verdict when new candidates are added
                 st.session_state.multi_cv_final_verdict = None
 
-                status_text.text("✅ Analysis complete!")
+                screened_out = len(parsed_rows) - len(selected)
+                status_text.text("✅ Analysis complete!" + (
+                    f" {screened_out} of {len(parsed_rows)} CVs were screened out by the keyword prefilter."
+                    if screened_out else ""))
                 time.sleep(1)
                 st.rerun()
 
+        # Background batch progress
+        if st.session_state.multi_cv_batch and not st.session_state.multi_cv_batch_collected:
+            st.fragment(run_every=2)(render_batch_progress)()
+
+        if st.session_state.get('multi_cv_ingest_summary'):
+            st.caption(f"📦 Uploads: {st.session_state.multi_cv_ingest_summary}")
+
+        for batch_error in st.session_state.multi_cv_batch_errors:
+            st.error(f"❌ {batch_error}")
+
         # Display candidates table if available
         if st.session_state.multi_cv_candidates:
             st.markdown("---")
@@ -833,54 +1656,8 @@ DETAILED ANALYSIS:
                 # PDF Download will be handled after table display
                 pass
 
-            # Sort candidates by overall rating
-            sorted_candidates = sorted(
-                st.session_state.multi_cv_candidates,
-                key=lambda x: x['overall_rating'],
-                reverse=True
-            )
-
-            # Find the best candidate
-            best_rating = max(c['overall_rating'] for c in sorted_candidates)
-
-            # Build table data
-            table_data = []
-            for idx, candidate in enumerate(sorted_candidates, 1):
-                # Convert experience_years to string to avoid mixed type issues
-                exp_years = candidate['experience_years']
-                exp_str = str(exp_years) if exp_years and exp_years != '-' else '-'
-
-                row = {
-                    '#': idx,
-                    'Candidate Name': candidate['name'],
-                    'Email': candidate['email'],
-                    'LinkedIn': candidate['linkedin'],
-                    'GitHub': candidate['github'],
-                    'Experience (Yrs)': exp_str,
-                    'Max Score': f"{candidate['max_score']:.1%}",
-                    'Avg Score': f"{candidate['avg_score']:.1%}",
-                    'Overall Rating': f"{candidate['overall_rating']:.1%}"
-                }
-                table_data.append(row)
-
-            df = pd.DataFrame(table_data)
-
-            # Custom CSS for highlighting best candidate
-            def highlight_best(row):
-                # Check if this row has the best overall rating
-                rating_str = row['Overall Rating'].rstrip('%')
-                try:
-                    rating = float(rating_str) / 100
-                    if abs(rating - best_rating) < 0.001:  # Best candidate
-                        return ['background-color: #5a9c5c'] * len(row)  # green
-                except:
-                    pass
-                return [''] * len(row)
-
-            styled_df = df.style.apply(highlight_best, axis=1)
-
-            # Display the table
-            st.dataframe(styled_df, width='stretch', hide_index=True)
+            candidates = st.session_state.multi_cv_candidates
+            render_candidate_table(candidates)
 
             # Add more CVs button (alternative placement)
             st.markdown("")
@@ -890,17 +1667,25 @@ DETAILED ANALYSIS:
 
             with action_col1:
                 # Generate Final Verdict button
-                if st.button("🏆 Generate Final Verdict", type="primary", width="stretch"):
+                verdict_requested = st.button("🏆 Generate Final Verdict", type="primary", width="stretch")
+                if verdict_requested and not candidates.matched_count():
+                    st.warning("⚠️ No candidate has been matched yet")
+                elif verdict_requested:
                     with st.spinner("🤔 Analyzing candidates and generating verdict..."):
-                        # Build summary of all candidates for LLM
+                        # Cascade stage 3: only the shortlist of matched candidates goes to the LLM
                         candidates_summary = []
-                        for idx, candidate in enumerate(sorted_candidates, 1):
+                        shortlist = candidates.select(sort_by='overall_rating', matched_only=True)
+                        shortlist = shortlist[:cascade_config.shortlist_size]
+                        ranked = candidates.rows(shortlist)
+                        for idx, candidate in enumerate(ranked, 1):
                             summary = f"""
 Candidate {idx}: {candidate['name']}
 - Experience: {candidate['experience_years']} years
 - Max Match Score: {candidate['max_score']:.1%}
 - Average Match Score: {candidate['avg_score']:.1%}
 - Overall Rating: {candidate['overall_rating']:.1%}
+- Keyword ATS Score: {candidate['ats_score']}/100
+- Keyword Prefilter Score: {candidate['prefilter_score']:.0%}
 - Email: {candidate['email']}
 - LinkedIn: {candidate['linkedin']}
 - GitHub: {candidate['github']}
@@ -914,7 +1699,7 @@ Candidate {idx}: {candidate['name']}
 JOB DESCRIPTION:
 {st.session_state.multi_cv_jd}
 
-CANDIDATES ANALYSIS:
+CANDIDATES ANALYSIS (top {len(shortlist)} of {len(candidates)} candidates by match score):
 {all_candidates_text}
 
 Please provide:
@@ -923,11 +1708,22 @@ Please provide:
 3. Any notable strengths and concerns for the top candidate
 4. Runner-up candidate (if applicable)
 """
-                        try:
-                            verdict = agents['summary_agent'].generate_summary(verdict_prompt)
-                            st.session_state.multi_cv_final_verdict = verdict
-                        except Exception as e:
-                            st.error(f"Error generating verdict: {str(e)}")
+                        if use_background_jobs:
+                            job_id = job_queue.enqueue(
+                                'summary',
+                                {'cv_text': verdict_prompt},
+                                session_id=st.session_state.session_id
+                            )
+                            st.session_state.multi_cv_verdict_job = job_id
+                            st.query_params['verdict_job'] = job_id
+                        else:
+                            try:
+                                # Bulk work: batch priority, so candidate-facing analyses are served first
+                                with scheduling("batch"):
+                                    verdict = agents['summary_agent'].generate_summary(verdict_prompt)
+                                st.session_state.multi_cv_final_verdict = verdict
+                            except Exception as e:
+                                st.error(f"Error generating verdict: {str(e)}")
 
             with action_col2:
                 # Download PDF Report
@@ -946,7 +1742,9 @@ JOB DESCRIPTION:
 CANDIDATE RANKINGS:
 {'='*60}
 """
-                    for idx, candidate in enumerate(sorted_candidates, 1):
+                    best_rating = candidates.best_rating()
+                    ranked = candidates.rows(candidates.select(sort_by='overall_rating'))
+                    for idx, candidate in enumerate(ranked, 1):
                         is_best = "⭐ BEST CANDIDATE" if abs(candidate['overall_rating'] - best_rating) < 0.001 else ""
                         report_content += f"""
 {'-'*40}
@@ -959,9 +1757,16 @@ GitHub: {candidate['github']}
 Experience: {candidate['experience_years']} years
 
 MATCH SCORES:
-- Maximum Score: {candidate['max_score']:.1%}
+"""
+                        if candidate['matched']:
+                            report_content += f"""- Maximum Score: {candidate['max_score']:.1%}
 - Average Score: {candidate['avg_score']:.1%}
 - Overall Rating: {candidate['overall_rating']:.1%}
+"""
+                        else:
+                            report_content += "- Not matched (screened out by the keyword prefilter)\n"
+                        report_content += f"""- Keyword ATS Score: {candidate['ats_score']}/100
+- Keyword Prefilter Score: {candidate['prefilter_score']:.0%}
 """
 
                     if st.session_state.multi_cv_final_verdict:
@@ -983,10 +1788,14 @@ FINAL VERDICT:
             with action_col3:
                 # Remove selected / Clear candidates
                 if st.button("🗑️ Clear Candidates", width="stretch"):
-                    st.session_state.multi_cv_candidates = []
+                    st.session_state.multi_cv_candidates = CandidateStore()
                     st.session_state.multi_cv_final_verdict = None
+                    clear_background_jobs()
                     st.rerun()
 
+            if st.session_state.multi_cv_verdict_job:
+                st.fragment(run_every=2)(render_verdict_progress)()
+
             # Display Final Verdict if available
             if st.session_state.multi_cv_final_verdict:
                 st.markdown("---")
@@ -998,60 +1807,98 @@ FINAL VERDICT:
 # --- Analytics Tab ---
 with tab3:
     st.markdown("### 📈 Analytics Dashboard")
-    
-    if st.session_state.analysis_history:
+
+    # Time window -> timeline bucket size (seconds)
+    analytics_windows = {
+        "Last 24 hours": (86400, 3600),
+        "Last 7 days": (7 * 86400, 6 * 3600),
+        "Last 30 days": (30 * 86400, 86400),
+        "Last 12 months": (365 * 86400, 7 * 86400),
+        "All time": (None, 7 * 86400),
+    }
+    filter_col1, filter_col2 = st.columns([1, 1])
+    with filter_col1:
+        window_label = st.selectbox("Time Window", list(analytics_windows), index=1, key="analytics_window")
+    with filter_col2:
+        scope = st.radio("Scope", ["This session", "All sessions"], horizontal=True, key="analytics_scope")
+
+    window_seconds, bucket_seconds = analytics_windows[window_label]
+    since = time.time() - window_seconds if window_seconds else None
+    scope_session = st.session_state.session_id if scope == "This session" else None
+
+    type_summary = history.summary(since=since, session_id=scope_session)
+
+    if type_summary:
         # Create metrics
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total Analyses", len(st.session_state.analysis_history))
+            st.metric("Total Analyses", sum(v['count'] for v in type_summary.values()))
         
         with col2:
-            feedback_count = len([x for x in st.session_state.analysis_history if x['type'] == 'Feedback'])
+            feedback_count = type_summary.get('Feedback', {}).get('count', 0)
             st.metric("CV Reviews", feedback_count)
         
         with col3:
-            match_count = len([x for x in st.session_state.analysis_history if x['type'] == 'Match Score'])
+            match_count = type_summary.get('Match Score', {}).get('count', 0)
             st.metric("Match Analyses", match_count)
         
         with col4:
             if match_count > 0:
-                avg_score = sum([x['score'] for x in st.session_state.analysis_history if x['type'] == 'Match Score']) / match_count
+                avg_score = type_summary['Match Score']['avg_score'] or 0.0
                 st.metric("Avg Match Score", f"{avg_score:.1%}")
         
         st.markdown("---")
         
-        # Analysis timeline
+        # Analysis timeline, aggregated per bucket by the store
         st.markdown("#### 📅 Analysis Timeline")
-        
-        # Convert to dataframe for visualization
-        if len(st.session_state.analysis_history) > 0:
-            df = pd.DataFrame(st.session_state.analysis_history)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-            # Create timeline chart
-            fig = px.scatter(
-                df,
-                x='timestamp',
-                y='type',
-                color='type',
+
+        timeline = history.timeline(bucket_seconds, since=since, session_id=scope_session)
+        if timeline:
+            import plotly.express as px
+
+            fig = px.bar(
+                x=[datetime.fromtimestamp(row['bucket']) for row in timeline],
+                y=[row['count'] for row in timeline],
+                color=[row['type'] for row in timeline],
                 title="Analysis Activity Over Time",
-                hover_data=['filename'] if 'filename' in df.columns else None
+                labels={'x': 'Time', 'y': 'Analyses', 'color': 'Type'}
             )
             st.plotly_chart(fig, width="stretch")
-            
-            # Recent activity table
-            st.markdown("#### 📊 Recent Activity")
-            st.dataframe(
-                df[['timestamp', 'type', 'filename']].tail(10).sort_values('timestamp', ascending=False),
-                width='stretch',
-                hide_index=True
-            )
+
+        # Per-type durations
+        st.markdown("#### ⏱️ Average Duration by Type")
+        st.dataframe(
+            [
+                {
+                    'Type': event_type,
+                    'Count': values['count'],
+                    'Avg Duration (s)': round(values['avg_duration_ms'] / 1000, 2) if values['avg_duration_ms'] else None,
+                }
+                for event_type, values in sorted(type_summary.items())
+            ],
+            width='stretch',
+            hide_index=True
+        )
+
+        # Recent activity table
+        st.markdown("#### 📊 Recent Activity")
+        st.dataframe(
+            [
+                {
+                    'timestamp': datetime.fromtimestamp(row['ts']).isoformat(sep=' ', timespec='seconds'),
+                    'type': row['type'],
+                    'filename': row['filename'],
+                }
+                for row in history.recent(10, since=since, session_id=scope_session)
+            ],
+            width='stretch',
+            hide_index=True
+        )
         
         # Clear history button
-        if st.button("🗑️ Clear Analysis History"):
-            st.session_state.analysis_history = []
-            st.session_state.parsed_cv_cache = {}
+        if st.button("🗑️ Clear Analysis History", help="Removes this session's analyses and cached results"):
+            history.clear(session_id=st.session_state.session_id)
             st.session_state.feedback_cache = {}
             st.session_state.summary_cache = {}
             st.session_state.ats_cache = {}
@@ -1060,14 +1907,24 @@ with tab3:
             st.session_state.recruiter_parsed = None
             st.session_state.recruiter_cache_key = None
             st.session_state.recruiter_cv_name = None
-            st.session_state.multi_cv_candidates = []
+            st.session_state.multi_cv_candidates = CandidateStore()
             st.session_state.multi_cv_jd = None
             st.session_state.multi_cv_final_verdict = None
+            clear_background_jobs()
             st.success("✅ History cleared!")
             st.rerun()
     else:
         st.info("📊 No analysis data available yet. Start by analyzing some CVs!")
 
+    st.markdown("---")
+    metrics_header_col1, metrics_header_col2 = st.columns([3, 1])
+    with metrics_header_col1:
+        st.markdown("#### ⏱️ Performance Metrics")
+    with metrics_header_col2:
+        live_metrics = st.toggle("Live refresh", value=False, key="live_metrics",
+                                 help="Refresh the metrics panel every 5 seconds")
+    st.fragment(run_every=5 if live_metrics else None)(render_metrics_panel)()
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1 @@
+"""Application services shared by the dashboard: persistence, background work and APIs."""
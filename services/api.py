@@ -0,0 +1,457 @@
+"""HTTP API exposing the agents for programmatic, concurrent use.
+
+Endpoints:
+    POST /parse                   PDF (multipart "file" or raw application/pdf body) -> parsed CV
+    POST /match                   multipart file + job_description, or JSON {chunks, job_description};
+                                  optional mode hybrid|dense|lexical (lexical needs no embedding call)
+    POST /feedback/{analysis}     analysis in improvements|ats|skills; JSON {cv_text, target_role,
+                                  job_description} or multipart file + fields; ?stream=true for SSE;
+                                  improvements takes depth quick|detailed (model routing)
+    POST /summary                 JSON {cv_text} or multipart file; ?stream=true for SSE
+    POST /ats                     multipart file + job_description, or JSON {cv_text, job_description}
+                                  -> deterministic keyword ATS score (no model call)
+    GET  /health, GET /metrics
+
+Model calls are tagged for the process-wide scheduler (agents/scheduler.py):
+the X-Priority header (interactive, the default, or batch) sets the priority
+class and X-User the user that is queued fairly against others (default: the
+client address).
+
+Uploads are streamed into memory (multipart bodies too, so nothing is spooled
+to a temporary file), rejected with 413 as soon as they pass CV_API_MAX_UPLOAD_MB,
+and parsed from a buffer.
+Set the layout_aware field (or query parameter) to true for multi-column CVs,
+and chunk_unit to tokens to pack CV sections into chunks sized for the
+embedding model's context window (chunk_stats reports count and token sizes).
+Parsing runs on a dedicated thread pool, embedding requests from concurrent
+callers are coalesced into batched Ollama calls, and every kind of work sits
+behind a concurrency gate that answers 503 + Retry-After when its wait queue is
+full, so the Ollama backend is never overloaded.
+
+Usage:
+    python -m services.api --port 8000
+"""
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from agents import metrics
+from agents._ollama import stream_text
+from agents.ats_scorer import ATSScorer, format_report
+from agents.cv_parser_agent import CHUNK_UNITS
+from agents.embedding_batcher import (DEFAULT_CONCURRENT_BATCHES, DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT_MS,
+                                     EmbeddingBatcher)
+from agents.jd_matcher_agent import MATCH_MODES
+from agents.model_routing import DEFAULT_DEPTH
+from agents.endpoint_pool import get_pool
+from agents.scheduler import KINDS, PRIORITIES, get_scheduler, scheduling
+from agents.warmup import get_warmer, start_warmup
+
+MAX_UPLOAD_BYTES = int(os.environ.get("CV_API_MAX_UPLOAD_MB", "20")) * 1024 * 1024
+FEEDBACK_ANALYSES = {
+    "improvements": ("suggest_improvements", "improvements_prompt"),
+    "ats": ("check_ats_score", "ats_prompt"),
+    "skills": ("analyze_skills", "skills_prompt"),
+}
+
+
+class APIConfig:
+    def __init__(self, parse_concurrency: int = None, llm_concurrency: int = None,
+                 embed_concurrency: int = None, max_waiting: int = None,
+                 embed_batch_size: int = DEFAULT_MAX_BATCH, embed_batch_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 embed_requests: int = None):
+        """
+        Args:
+            parse_concurrency: PDFs parsed at once
+            llm_concurrency: LLM requests served at once
+            embed_concurrency: Embedding batches in flight at once
+            max_waiting: Requests that may wait for each gate before new ones get 503 (x4 for embedding)
+            embed_batch_size: Texts per embedding batch
+            embed_batch_wait_ms: Longest time a request waits for others to share its batch
+            embed_requests: Match requests embedding at once; several are coalesced into one batch,
+                so this defaults to embed_batch_size
+
+        The embedding settings are applied to the matcher's batcher, which is shared by the whole process.
+        """
+        env = os.environ.get
+        self.parse_concurrency = parse_concurrency or int(env("CV_API_PARSE_CONCURRENCY", os.cpu_count() or 2))
+        # Ollama serves OLLAMA_NUM_PARALLEL requests per model at once; more only queue inside Ollama
+        self.llm_concurrency = llm_concurrency or int(env("CV_API_LLM_CONCURRENCY", env("OLLAMA_NUM_PARALLEL", "2")))
+        self.embed_concurrency = embed_concurrency or int(env("CV_API_EMBED_CONCURRENCY", DEFAULT_CONCURRENT_BATCHES))
+        self.max_waiting = max_waiting or int(env("CV_API_MAX_WAITING", "32"))
+        self.embed_batch_size = embed_batch_size
+        self.embed_batch_wait_ms = embed_batch_wait_ms
+        self.embed_requests = embed_requests or int(env("CV_API_EMBED_REQUESTS", embed_batch_size))
+
+
+class ConcurrencyGate:
+    """Bound concurrent work of one kind and reject requests when too many are already waiting"""
+
+    def __init__(self, name: str, limit: int, max_waiting: int):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def check(self):
+        """Raise 503 if a new request would have to wait behind a full queue"""
+        if self.waiting >= self.max_waiting:
+            metrics.incr("api_rejected", gate=self.name)
+            raise HTTPException(503, f"Too many pending {self.name} requests", headers={"Retry-After": "2"})
+
+    async def acquire(self):
+        self.check()
+        self.waiting += 1
+        metrics.set_gauge("api_waiting", self.waiting, gate=self.name)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+            metrics.set_gauge("api_waiting", self.waiting, gate=self.name)
+        self.active += 1
+        metrics.set_gauge("api_active", self.active, gate=self.name)
+
+    def release(self):
+        self.active -= 1
+        metrics.set_gauge("api_active", self.active, gate=self.name)
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def status(self) -> Dict:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting, "max_waiting": self.max_waiting}
+
+
+async def _read_multipart(request: Request, content_type: str):
+    """Return (bytes of the "file" part or None, text fields) of a multipart body, parsed as it streams in"""
+    _, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise HTTPException(400, "Missing multipart boundary")
+    parts = []
+    header = {"field": b"", "value": b""}
+
+    def on_part_begin():
+        parts.append({"headers": {}, "data": bytearray()})
+
+    def on_header_field(data, start, end):
+        header["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        header["value"] += data[start:end]
+
+    def on_header_end():
+        parts[-1]["headers"][header["field"].lower()] = header["value"]
+        header["field"] = header["value"] = b""
+
+    def on_part_data(data, start, end):
+        parts[-1]["data"] += data[start:end]
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_part_data": on_part_data,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            # Only the part being received can have grown past the limit
+            if parts and len(parts[-1]["data"]) > MAX_UPLOAD_BYTES:
+                raise HTTPException(413, "Upload too large")
+        parser.finalize()
+    except FormParserError as e:
+        raise HTTPException(400, f"Malformed multipart body: {e}")
+
+    data, fields = None, {}
+    for received in parts:
+        _, disposition = parse_options_header(received["headers"].get(b"content-disposition"))
+        name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in disposition:
+            if name == "file":
+                data = bytes(received["data"])
+        else:
+            fields[name] = received["data"].decode("utf-8", "replace")
+    return data, fields
+
+
+async def _read_upload(request: Request):
+    """Return (pdf_bytes or None, form/json fields) from a multipart, raw PDF or JSON request"""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        return await _read_multipart(request, content_type)
+    if content_type.startswith(("application/pdf", "application/octet-stream")):
+        buffer = bytearray()
+        async for chunk in request.stream():
+            buffer += chunk
+            if len(buffer) > MAX_UPLOAD_BYTES:
+                raise HTTPException(413, "Upload too large")
+        return bytes(buffer), dict(request.query_params)
+    try:
+        fields = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Expected multipart/form-data, application/pdf or JSON body")
+    if not isinstance(fields, dict):
+        raise HTTPException(400, "JSON body must be an object")
+    return None, fields
+
+
+def create_app(config: Optional[APIConfig] = None, agents: Optional[Dict] = None) -> FastAPI:
+    """Build the API app; agents are created at startup unless provided"""
+    config = config or APIConfig()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        from agents import CVParserAgent, FeedbackAgent, JDMatcherAgent, SummaryAgent
+
+        state = app.state
+        state.agents = agents
+        if state.agents is None:
+            from .vector_store import open_model_store
+
+            matcher = JDMatcherAgent()
+            # Share stored chunk vectors with the dashboard and workers, so known CVs only embed the JD
+            matcher.vector_store = open_model_store(matcher.model_name)
+            state.agents = {
+                "cv_parser": CVParserAgent(),
+                "jd_matcher": matcher,
+                "feedback_agent": FeedbackAgent(),
+                "summary_agent": SummaryAgent(),
+            }
+        start_warmup(state.agents.values())
+        # Keyword ATS scoring needs no model; /feedback/ats hands its result to the LLM
+        state.ats_scorer = ATSScorer()
+        state.parse_pool = ThreadPoolExecutor(config.parse_concurrency, thread_name_prefix="cv-parse")
+        state.gates = {
+            "parse": ConcurrencyGate("parse", config.parse_concurrency, config.max_waiting),
+            "embed": ConcurrencyGate("embed", config.embed_requests, config.max_waiting * 4),
+            "llm": ConcurrencyGate("llm", config.llm_concurrency, config.max_waiting),
+        }
+        # Matches go through the matcher's process-wide batcher, so API calls and in-process
+        # matches are coalesced together; plain embedders (batched=False) get a batcher of their own
+        matcher = state.agents["jd_matcher"]
+        if isinstance(matcher.embedder, EmbeddingBatcher):
+            matcher.embedder.configure(config.embed_batch_size, config.embed_batch_wait_ms, config.embed_concurrency)
+        else:
+            matcher.embedder = EmbeddingBatcher(
+                matcher.embedder,
+                max_batch=config.embed_batch_size,
+                max_wait_ms=config.embed_batch_wait_ms,
+                concurrent_batches=config.embed_concurrency,
+            )
+        state.batcher = matcher.embedder
+        yield
+        state.parse_pool.shutdown(wait=False, cancel_futures=True)
+
+    app = FastAPI(title="AI CV Analyzer API", lifespan=lifespan)
+
+    @app.middleware("http")
+    async def tag_scheduling(request: Request, call_next):
+        priority = request.headers.get("x-priority", "interactive")
+        if priority not in PRIORITIES:
+            return JSONResponse({"detail": f"X-Priority must be one of {', '.join(PRIORITIES)}"}, 400)
+        user = request.headers.get("x-user") or (request.client.host if request.client else None)
+        with scheduling(priority, user):
+            return await call_next(request)
+
+    async def parse_pdf(request: Request, data: bytes, fields: Dict) -> Dict:
+        state = request.app.state
+        layout_aware = str(fields.get("layout_aware", "")).lower() in ("1", "true", "yes")
+        chunk_unit = fields.get("chunk_unit") or None
+        if chunk_unit not in (None,) + CHUNK_UNITS:
+            raise HTTPException(400, f"chunk_unit must be one of {', '.join(CHUNK_UNITS)}")
+        parse_cv = partial(state.agents["cv_parser"].parse_cv, layout_aware=layout_aware, chunk_unit=chunk_unit)
+        async with state.gates["parse"].slot():
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(state.parse_pool, parse_cv, data)
+            except Exception as e:
+                raise HTTPException(422, str(e))
+
+    async def parsed_cv_and_fields(request: Request):
+        """Parsed CV from an uploaded PDF, or a minimal one built from a cv_text field"""
+        data, fields = await _read_upload(request)
+        if data is not None:
+            parsed = await parse_pdf(request, data, fields)
+        elif fields.get("cv_text"):
+            text = " ".join(str(fields["cv_text"]).split())
+            parsed = {"text": text,
+                      "structured_info": request.app.state.agents["cv_parser"].extract_structured_info(text)}
+        else:
+            raise HTTPException(400, "Provide a PDF file or cv_text")
+        fields["cv_text"] = parsed["text"]
+        return parsed, fields
+
+    async def cv_text_and_fields(request: Request):
+        return (await parsed_cv_and_fields(request))[1]
+
+    async def run_llm(request: Request, agent_name: str, method: str, prompt_method: str, operation: str, args, stream: bool,
+                      streamer=None):
+        state = request.app.state
+        agent = state.agents[agent_name]
+        gate = state.gates["llm"]
+        if not stream:
+            async with gate.slot():
+                text = await asyncio.to_thread(getattr(agent, method), *args)
+            return JSONResponse({"text": text})
+
+        prompt = getattr(agent, prompt_method)(*args)
+        # Answer 503 before the stream starts; the slot itself is taken by the body, so a
+        # response that is never iterated (client gone, send error) holds none
+        gate.check()
+
+        async def events():
+            try:
+                async with gate.slot():
+                    chunks = streamer(prompt) if streamer else stream_text(agent.llm, prompt, operation=operation)
+                    async for chunk in iterate_in_threadpool(chunks):
+                        yield f"data: {json.dumps({'text': chunk})}\n\n"
+                yield "event: done\ndata: {}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/health")
+    async def health(request: Request):
+        return {"status": "ok", "gates": {name: gate.status() for name, gate in request.app.state.gates.items()},
+                "scheduler": {kind: get_scheduler(kind).status() for kind in KINDS},
+                "endpoints": get_pool().status() if get_pool() is not None else None,
+                "models": get_warmer().status() if get_warmer() is not None else None}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def prometheus_metrics():
+        return metrics.to_prometheus()
+
+    @app.post("/parse")
+    async def parse(request: Request):
+        data, fields = await _read_upload(request)
+        if not data:
+            raise HTTPException(400, "Provide a PDF as multipart 'file' or an application/pdf body")
+        return await parse_pdf(request, data, fields)
+
+    @app.post("/match")
+    async def match(request: Request):
+        data, fields = await _read_upload(request)
+        job_description = fields.get("job_description")
+        if not job_description:
+            raise HTTPException(400, "job_description is required")
+        matcher = request.app.state.agents["jd_matcher"]
+        mode = fields.get("mode") or matcher.mode
+        if mode not in MATCH_MODES:
+            raise HTTPException(400, f"mode must be one of {', '.join(MATCH_MODES)}")
+        response, chunk_terms = {}, None
+        if data is not None:
+            parsed = await parse_pdf(request, data, fields)
+            chunks, chunk_terms = parsed["chunks"], parsed.get("chunk_terms")
+            response["structured_info"] = parsed["structured_info"]
+        else:
+            chunks = fields.get("chunks")
+            if chunks is not None and (not isinstance(chunks, list)
+                                       or not all(isinstance(chunk, str) for chunk in chunks)):
+                raise HTTPException(400, "chunks must be a list of strings")
+        if not chunks:
+            raise HTTPException(400, "Provide a PDF file or a non-empty chunks list")
+
+        # The matcher embeds through the shared batcher and reuses chunk vectors already in its vector store,
+        # so API scores are the dashboard's scores
+        run_match = partial(matcher.match, list(chunks), job_description, chunk_terms)
+        if mode == "lexical":
+            response["match"] = await asyncio.to_thread(run_match, mode)
+            return response
+        try:
+            async with request.app.state.gates["embed"].slot():
+                result = await asyncio.to_thread(run_match, mode)
+        except HTTPException as e:
+            # A full embed queue (503) degrades a hybrid match to lexical scores
+            if mode == "dense":
+                raise
+            metrics.incr("lexical_fallbacks")
+            result = await asyncio.to_thread(run_match, "lexical")
+            result["fallback_reason"] = e.detail
+        except Exception as e:
+            # Only dense matches raise on backend errors; hybrid ones fall back inside match()
+            raise HTTPException(502, f"Embedding backend error: {e}")
+        response["match"] = result
+        return response
+
+    @app.post("/feedback/{analysis}")
+    async def feedback(analysis: str, request: Request, stream: bool = False):
+        if analysis not in FEEDBACK_ANALYSES:
+            raise HTTPException(404, f"Unknown analysis '{analysis}'")
+        parsed, fields = await parsed_cv_and_fields(request)
+        method, prompt_method = FEEDBACK_ANALYSES[analysis]
+        agent = request.app.state.agents["feedback_agent"]
+        args = [fields["cv_text"], fields.get("target_role")]
+        streamer, operation = None, method
+        if analysis == "improvements":
+            depth = fields.get("depth") or DEFAULT_DEPTH
+            if depth not in agent.routes:
+                raise HTTPException(400, f"depth must be one of {', '.join(agent.routes)}")
+            args += [depth, parsed.get("chunks"), parsed.get("chunk_terms")]
+            if depth != DEFAULT_DEPTH:
+                operation = f"{method}_{depth}"
+            # Streams through the depth's route, falling back to the configured model like the blocking call
+            streamer = partial(agent.stream_for, depth=depth, operation=operation)
+        else:
+            args.append(fields.get("job_description"))
+        if analysis == "ats" and fields.get("job_description"):
+            args.append(format_report(request.app.state.ats_scorer.score(parsed, fields["job_description"])))
+        return await run_llm(request, "feedback_agent", method, prompt_method, operation, args, stream, streamer)
+
+    @app.post("/ats")
+    async def ats(request: Request):
+        parsed, fields = await parsed_cv_and_fields(request)
+        if not fields.get("job_description"):
+            raise HTTPException(400, "job_description is required")
+        return request.app.state.ats_scorer.score(parsed, fields["job_description"])
+
+    @app.post("/summary")
+    async def summary(request: Request, stream: bool = False):
+        fields = await cv_text_and_fields(request)
+        return await run_llm(request, "summary_agent", "generate_summary", "summary_prompt",
+                             "generate_summary", [fields["cv_text"]], stream)
+
+    return app
+
+
+app = create_app()
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the CV analyzer HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    uvicorn.run("services.api:app", host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
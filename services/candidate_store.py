@@ -0,0 +1,352 @@
+"""Compact, column-oriented storage for multi-CV ranking sessions.
+
+A ranking session used to keep one dict per candidate, each holding the full
+parsed CV (text and chunks) and match result. CandidateStore keeps only what
+the ranking view needs: scores and experience in NumPy arrays, metadata as
+int32 codes into a shared table of interned strings, skills as a boolean
+matrix, and the content hash of the PDF. The parsed CV itself lives once in
+the shared ParseCache under that hash. Sorting and filtering run vectorised
+over the columns.
+
+Each row also keeps a MinHash signature and email/phone keys (services/dedup.py),
+so a re-submitted, lightly edited CV is folded into the existing candidate as
+another version instead of becoming a new row.
+
+With cascade ranking (services/cascade.py) a row can be added with only its
+keyword prefilter score; its match scores stay NaN until set_match() fills
+them in, so unmatched candidates sort after every matched one.
+"""
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from .dedup import DEFAULT_MIN_SIMILARITY, NUM_PERMUTATIONS, identity_keys, similarities
+
+_STRING_COLUMNS = ("file_name", "name", "email", "linkedin", "github", "content_hash")
+_IDENTITY_COLUMNS = ("email_key", "phone_key")
+_NUMERIC_COLUMNS = ("max_score", "avg_score", "overall_rating", "experience_years", "ats_score", "prefilter_score")
+SORT_COLUMNS = _NUMERIC_COLUMNS
+
+_NAME_SUFFIXES = ['_resume', '_cv', '_Resume', '_CV', '-resume', '-cv', ' resume', ' cv']
+
+
+def content_hash(data) -> str:
+    """Stable identifier for a PDF's bytes, used as the parse cache key"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def overall_rating(max_score: float, avg_score: float) -> float:
+    """Weighted average used to rank candidates"""
+    return max_score * 0.6 + avg_score * 0.4
+
+
+def candidate_name(struct_info: Dict, file_name: str) -> str:
+    """Extracted name, falling back to one derived from the file name (e.g. "John_Doe_Resume.pdf")"""
+    name = struct_info.get('name')
+    if name:
+        return name
+    filename_base = file_name.rsplit('.', 1)[0]
+    for suffix in _NAME_SUFFIXES:
+        filename_base = filename_base.replace(suffix, '')
+    filename_name = filename_base.replace('_', ' ').replace('-', ' ').strip()
+    if filename_name and len(filename_name) > 2:
+        return filename_name.title()
+    return '-'
+
+
+class ParseCache:
+    """Thread-safe LRU of parsed CVs keyed by content hash, shared by all sessions"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            parsed = self._entries.get(key)
+            if parsed is not None:
+                self._entries.move_to_end(key)
+            return parsed
+
+    def put(self, key: str, parsed: Dict) -> None:
+        with self._lock:
+            self._entries[key] = parsed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CandidateStore:
+    def __init__(self, capacity: int = 64):
+        """
+        Empty candidate store
+
+        Args:
+            capacity: Initial number of rows; columns double in size when full
+        """
+        self._size = 0
+        self._strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        self._skills: List[str] = []
+        self._skill_codes: Dict[str, int] = {}
+        self._numeric = {col: np.full(capacity, np.nan, dtype=np.float32) for col in _NUMERIC_COLUMNS}
+        self._codes = {col: np.zeros(capacity, dtype=np.int32) for col in _STRING_COLUMNS + _IDENTITY_COLUMNS}
+        # Rows x skill column capacity; the first len(self._skills) columns are in use
+        self._skill_matrix = np.zeros((capacity, 0), dtype=bool)
+        self._signatures = np.zeros((capacity, NUM_PERMUTATIONS), dtype=np.uint32)
+        self._versions = np.ones(capacity, dtype=np.int32)
+        self._duplicates: Dict[int, List[str]] = {}
+        self._file_names = set()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.rows()
+
+    @property
+    def _capacity(self) -> int:
+        return len(self._skill_matrix)
+
+    def _intern(self, value: Optional[str]) -> int:
+        value = sys.intern(str(value)) if value else '-'
+        code = self._string_codes.get(value)
+        if code is None:
+            code = self._string_codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    def _skill_column(self, skill: str) -> int:
+        code = self._skill_codes.get(skill)
+        if code is None:
+            code = self._skill_codes[skill] = len(self._skills)
+            self._skills.append(sys.intern(skill))
+            if code == self._skill_matrix.shape[1]:
+                # Double the column capacity so adding k skills copies the matrix O(log k) times, not k times
+                matrix = np.zeros((self._capacity, max(8, 2 * code)), dtype=bool)
+                matrix[:, :code] = self._skill_matrix
+                self._skill_matrix = matrix
+        return code
+
+    def _grow(self):
+        capacity = max(1, 2 * self._capacity)
+        for col, values in self._numeric.items():
+            grown = np.full(capacity, np.nan, dtype=np.float32)
+            grown[:self._size] = values[:self._size]
+            self._numeric[col] = grown
+        for col, codes in self._codes.items():
+            grown = np.zeros(capacity, dtype=np.int32)
+            grown[:self._size] = codes[:self._size]
+            self._codes[col] = grown
+        matrix = np.zeros((capacity, self._skill_matrix.shape[1]), dtype=bool)
+        matrix[:self._size] = self._skill_matrix[:self._size]
+        self._skill_matrix = matrix
+        signatures = np.zeros((capacity, NUM_PERMUTATIONS), dtype=np.uint32)
+        signatures[:self._size] = self._signatures[:self._size]
+        self._signatures = signatures
+        versions = np.ones(capacity, dtype=np.int32)
+        versions[:self._size] = self._versions[:self._size]
+        self._versions = versions
+
+    def add(self, file_name: str, parsed: Dict, match_result: Optional[Dict], pdf_hash: str = None,
+            signature: Optional[np.ndarray] = None, ats_score: Optional[float] = None,
+            prefilter_score: Optional[float] = None) -> int:
+        """
+        Append one parsed CV and return its row index
+
+        Args:
+            file_name: Uploaded file name
+            parsed: parse_cv() result
+            match_result: JD match result, or None when the CV has not been matched (yet)
+            pdf_hash: Content hash of the PDF (its parse cache key)
+            signature: MinHash signature of the CV text
+            ats_score: Keyword ATS score (0-100)
+            prefilter_score: Cascade prefilter score (0-1)
+        """
+        if self._size == self._capacity:
+            self._grow()
+        row = self._size
+        struct_info = parsed.get("structured_info", {})
+        experience = struct_info.get('experience_years')
+
+        if match_result is not None:
+            self.set_match(row, match_result)
+        self._numeric['experience_years'][row] = experience if experience else np.nan
+        self._numeric['ats_score'][row] = np.nan if ats_score is None else ats_score
+        self._numeric['prefilter_score'][row] = np.nan if prefilter_score is None else prefilter_score
+
+        values = {
+            'file_name': file_name,
+            'name': candidate_name(struct_info, file_name),
+            'email': struct_info.get('email'),
+            'linkedin': struct_info.get('linkedin'),
+            'github': struct_info.get('github'),
+            'content_hash': pdf_hash,
+        }
+        values['email_key'], values['phone_key'] = identity_keys(struct_info)
+        for col, value in values.items():
+            self._codes[col][row] = self._intern(value)
+        if signature is not None:
+            self._signatures[row] = signature
+        self._file_names.add(file_name)
+        for skill in struct_info.get('skills', []):
+            column = self._skill_column(skill)  # may widen the matrix, so index it afterwards
+            self._skill_matrix[row, column] = True
+
+        self._size += 1
+        return row
+
+    def set_match(self, row: int, match_result: Dict) -> None:
+        """Store the JD match scores of a row (e.g. once it passed the cascade prefilter)"""
+        self._numeric['max_score'][row] = match_result['max_score']
+        self._numeric['avg_score'][row] = match_result['avg_score']
+        self._numeric['overall_rating'][row] = overall_rating(match_result['max_score'], match_result['avg_score'])
+
+    def matched_count(self) -> int:
+        """Number of candidates with match scores"""
+        return int(np.count_nonzero(~np.isnan(self._numeric['overall_rating'][:self._size])))
+
+    def find_duplicate(self, signature: Optional[np.ndarray], structured_info: Dict,
+                       min_similarity: float = DEFAULT_MIN_SIMILARITY) -> Optional[int]:
+        """
+        Row of an existing candidate this CV duplicates, or None
+
+        Args:
+            signature: MinHash signature of the CV text (None when the PDF had no text)
+            structured_info: Parsed structured info; a matching email or phone is a duplicate
+            min_similarity: Estimated Jaccard similarity of the texts at which CVs count as duplicates
+        """
+        if not self._size:
+            return None
+        mask = np.zeros(self._size, dtype=bool)
+        for col, key in zip(_IDENTITY_COLUMNS, identity_keys(structured_info)):
+            code = self._string_codes.get(key) if key else None
+            if code is not None:
+                mask |= self._codes[col][:self._size] == code
+        if signature is not None:
+            mask |= similarities(signature, self._signatures[:self._size]) >= min_similarity
+        matches = np.flatnonzero(mask)
+        return int(matches[0]) if len(matches) else None
+
+    def add_duplicate(self, row: int, file_name: str) -> None:
+        """Record file_name as another version of the candidate in row (its scores are kept)"""
+        self._versions[row] += 1
+        self._duplicates.setdefault(row, []).append(sys.intern(file_name))
+        self._file_names.add(file_name)
+
+    def duplicate_count(self) -> int:
+        """Number of uploaded CVs folded into other candidates"""
+        return int(self._versions[:self._size].sum()) - self._size
+
+    def duplicates_of(self, row: int) -> List[str]:
+        """File names folded into this candidate as duplicates"""
+        return list(self._duplicates.get(row, ()))
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of a numeric column, or the decoded values of a string column"""
+        if name in self._numeric:
+            view = self._numeric[name][:self._size]
+            view.flags.writeable = False
+            return view
+        strings = np.array(self._strings, dtype=object)
+        return strings[self._codes[name][:self._size]]
+
+    def contains_file(self, file_name: str) -> bool:
+        """Whether the file was added, either as a candidate or as a duplicate version"""
+        return file_name in self._file_names
+
+    @property
+    def skills(self) -> List[str]:
+        """Every skill seen in this store, in first-seen order"""
+        return list(self._skills)
+
+    def skills_of(self, row: int) -> List[str]:
+        return [self._skills[i] for i in np.flatnonzero(self._skill_matrix[row])]
+
+    def best_rating(self) -> float:
+        ratings = self._numeric['overall_rating'][:self._size]
+        ratings = ratings[~np.isnan(ratings)]
+        return float(ratings.max()) if len(ratings) else 0.0
+
+    def select(self, sort_by: str = 'overall_rating', descending: bool = True, min_score: float = None,
+               skills: Iterable[str] = None, min_experience: float = None,
+               matched_only: bool = False) -> np.ndarray:
+        """
+        Row indices matching the filters, in sorted order
+
+        Args:
+            sort_by: Numeric column to sort by
+            descending: Sort order; ties keep insertion order
+            min_score: Minimum overall rating (0-1)
+            skills: Skills every returned candidate must have
+            min_experience: Minimum years of experience; candidates without a value are excluded
+            matched_only: Leave out candidates without match scores (screened out by the prefilter)
+        """
+        if sort_by not in self._numeric:
+            raise ValueError(f"Cannot sort by {sort_by!r}; choose one of {', '.join(SORT_COLUMNS)}")
+        mask = np.ones(self._size, dtype=bool)
+        if matched_only:
+            mask &= ~np.isnan(self._numeric['overall_rating'][:self._size])
+        if min_score is not None:
+            mask &= self._numeric['overall_rating'][:self._size] >= min_score
+        if min_experience is not None:
+            # NaN (unknown experience) compares False, so those rows drop out
+            mask &= self._numeric['experience_years'][:self._size] >= min_experience
+        for skill in skills or ():
+            code = self._skill_codes.get(skill)
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            mask &= self._skill_matrix[:self._size, code]
+
+        rows = np.flatnonzero(mask)
+        values = self._numeric[sort_by][rows]
+        # Missing values sort last in either direction
+        keys = np.where(np.isnan(values), -np.inf if descending else np.inf, values)
+        order = np.argsort(-keys if descending else keys, kind='stable')
+        return rows[order]
+
+    def row(self, index: int) -> Dict:
+        """Decode one candidate into the dict shape used by the ranking view and reports"""
+        candidate = {col: self._strings[self._codes[col][index]] for col in _STRING_COLUMNS}
+        for col in ('max_score', 'avg_score', 'overall_rating'):
+            candidate[col] = float(self._numeric[col][index])
+        experience = self._numeric['experience_years'][index]
+        candidate['experience_years'] = '-' if np.isnan(experience) else int(experience)
+        ats_score = self._numeric['ats_score'][index]
+        candidate['ats_score'] = '-' if np.isnan(ats_score) else int(ats_score)
+        candidate['prefilter_score'] = float(self._numeric['prefilter_score'][index])
+        candidate['matched'] = not np.isnan(self._numeric['overall_rating'][index])
+        candidate['versions'] = int(self._versions[index])
+        return candidate
+
+    def take(self, indices: np.ndarray) -> Dict[str, np.ndarray]:
+        """Columns for just the given rows (e.g. one page of the ranking view)"""
+        indices = np.asarray(indices, dtype=np.intp)
+        strings = np.array(self._strings, dtype=object)
+        page = {col: strings[self._codes[col][indices]] for col in _STRING_COLUMNS}
+        page.update({col: self._numeric[col][indices] for col in _NUMERIC_COLUMNS})
+        page['versions'] = self._versions[indices]
+        return page
+
+    def rows(self, indices: Iterable[int] = None) -> Iterator[Dict]:
+        for index in range(self._size) if indices is None else indices:
+            yield self.row(int(index))
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and the string table"""
+        arrays = sum(a.nbytes for a in self._numeric.values()) + sum(a.nbytes for a in self._codes.values())
+        arrays += self._skill_matrix.nbytes + self._signatures.nbytes + self._versions.nbytes
+        strings = sum(sys.getsizeof(s) for s in self._strings) + sum(sys.getsizeof(s) for s in self._skills)
+        return arrays + strings
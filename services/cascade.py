@@ -0,0 +1,98 @@
+"""Cascade ranking for multi-CV sessions.
+
+Embedding every uploaded CV makes large batches slow even though most CVs are
+clearly irrelevant to the job. Candidates go through a funnel instead:
+
+1. Prefilter: every CV gets a cheap lexical score, the weighted share of job
+   description keywords found in its text (ATSScorer) blended with the share
+   of the job's taxonomy skills (aliases included) the CV names. No model is
+   called.
+2. Matching: only the best-scoring fraction (never fewer than min_keep CVs,
+   and none below min_score) is embedded and matched; the others keep their
+   prefilter score and no match scores.
+3. Shortlist: the final-verdict LLM call only sees the top shortlist_size
+   matched candidates.
+"""
+import math
+import os
+from typing import Dict, Iterable, Set
+
+import numpy as np
+
+from agents.ats_scorer import extract_keywords
+
+DEFAULT_KEEP_FRACTION = float(os.environ.get("CV_CASCADE_KEEP_FRACTION", "0.3"))
+DEFAULT_MIN_KEEP = int(os.environ.get("CV_CASCADE_MIN_KEEP", "10"))
+DEFAULT_MIN_SCORE = float(os.environ.get("CV_CASCADE_MIN_SCORE", "0"))
+DEFAULT_SHORTLIST_SIZE = int(os.environ.get("CV_CASCADE_SHORTLIST", "5"))
+# Share of the prefilter score that comes from skill coverage; the rest is keyword coverage
+SKILL_OVERLAP_WEIGHT = 0.3
+
+
+class CascadeConfig:
+    def __init__(self, enabled: bool = True, keep_fraction: float = None, min_keep: int = None,
+                 min_score: float = None, shortlist_size: int = None):
+        """
+        Funnel sizes of the ranking cascade
+
+        Args:
+            enabled: When False every CV is matched, as without a cascade
+            keep_fraction: Share of the prefiltered CVs (0-1) that are embedded and matched
+            min_keep: CVs matched regardless of keep_fraction (small batches are matched in full)
+            min_score: Prefilter score (0-1) a CV needs to be matched at all
+            shortlist_size: Top matched candidates handed to the final verdict
+        """
+        self.enabled = enabled
+        self.keep_fraction = DEFAULT_KEEP_FRACTION if keep_fraction is None else keep_fraction
+        self.min_keep = DEFAULT_MIN_KEEP if min_keep is None else min_keep
+        self.min_score = DEFAULT_MIN_SCORE if min_score is None else min_score
+        self.shortlist_size = DEFAULT_SHORTLIST_SIZE if shortlist_size is None else shortlist_size
+
+
+def required_skills(job_description: str) -> Set[str]:
+    """Taxonomy skills named in the job description (cached with its keywords)"""
+    return {keyword.term for keyword in extract_keywords(job_description) if keyword.kind == "skill"}
+
+
+def skill_overlap(ats_result: Dict, skills: Set[str]) -> float:
+    """
+    Share of the job's skills found in the CV (0-1)
+
+    The CV side uses the ATSScorer's taxonomy match (aliases such as "k8s" count), not the parser's
+    structured_info["skills"], whose vocabulary differs from the taxonomy's skill names
+    """
+    if not skills:
+        return 0.0
+    found = {item["keyword"] for item in ats_result["matched_keywords"]}
+    return len(skills & found) / len(skills)
+
+
+def prefilter_score(ats_result: Dict, job_description: str) -> float:
+    """
+    Stage-1 relevance of a CV (0-1)
+
+    Args:
+        ats_result: ATSScorer.score() of the CV against the job description
+        job_description: Job description text
+    """
+    skills = required_skills(job_description)
+    keyword_rate = ats_result["weighted_match_rate"]
+    if not skills:
+        return keyword_rate
+    return (1 - SKILL_OVERLAP_WEIGHT) * keyword_rate + SKILL_OVERLAP_WEIGHT * skill_overlap(ats_result, skills)
+
+
+def select_for_matching(scores: Iterable[float], config: CascadeConfig) -> np.ndarray:
+    """
+    Positions of the prefilter scores that go on to embedding, best first
+
+    Args:
+        scores: Prefilter score of each CV
+        config: Funnel sizes; a disabled cascade keeps every CV in its original order
+    """
+    scores = np.asarray(list(scores), dtype=np.float32)
+    if not config.enabled:
+        return np.arange(len(scores))
+    keep = min(len(scores), max(config.min_keep, math.ceil(config.keep_fraction * len(scores))))
+    order = np.argsort(-scores, kind="stable")[:keep]
+    return order[scores[order] >= config.min_score]
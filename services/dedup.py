@@ -0,0 +1,72 @@
+"""Near-duplicate detection for CVs uploaded in the same ranking session.
+
+Candidates often re-apply with a lightly edited CV. Each parsed CV gets a
+MinHash signature of its cleaned text (64 hash functions over word 3-shingles),
+whose agreement rate estimates the Jaccard similarity of the two shingle sets,
+plus normalised email/phone identity keys. Two CVs are the same candidate when
+an identity key matches or their estimated similarity is above a threshold.
+"""
+import hashlib
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+NUM_PERMUTATIONS = 64
+DEFAULT_MIN_SIMILARITY = float(os.environ.get("CV_DEDUP_MIN_SIMILARITY", "0.6"))
+
+_TOKEN_RE = re.compile(r"\w+")
+_SHINGLE_SIZE = 3
+# Multiply-shift hash functions (odd multiplier, keep the high 32 bits); uint64 arithmetic wraps mod 2**64
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(0, np.iinfo(np.uint64).max, size=NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, np.iinfo(np.uint64).max, size=NUM_PERMUTATIONS, dtype=np.uint64)
+# Fewer digits than this is more likely a date or an ID than a phone number; E.164 numbers have at most 15
+_MIN_PHONE_DIGITS = 9
+_MAX_PHONE_DIGITS = 15
+_YEAR_RE = re.compile(r"(?:19|20)\d\d")
+
+
+def text_signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (uint32 array of NUM_PERMUTATIONS values) of the text's word shingles, or None without text"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return None
+    shingles = {" ".join(tokens[i:i + _SHINGLE_SIZE]) for i in range(max(1, len(tokens) - _SHINGLE_SIZE + 1))}
+    digests = b"".join(hashlib.blake2b(s.encode(), digest_size=8).digest() for s in shingles)
+    hashes = np.frombuffer(digests, dtype="<u8")
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarities(signature: np.ndarray, signatures: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity between signature and each row of a (n, NUM_PERMUTATIONS) array"""
+    return (signatures == signature).mean(axis=1)
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    return email.strip().lower() if email else None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Digits of a plausible phone number, or None
+
+    The parser's phone pattern also matches runs of years ("2019 2020 2021") and
+    date ranges; a four-digit group that reads as a year disqualifies a number
+    unless it is written like one (international prefix or area code in brackets).
+    """
+    phone = (phone or "").strip()
+    groups = re.findall(r"\d+", phone)
+    digits = "".join(groups)
+    if not _MIN_PHONE_DIGITS <= len(digits) <= _MAX_PHONE_DIGITS:
+        return None
+    formatted = phone.startswith(("+", "00", "(")) or "(" in phone
+    if not formatted and len(groups) > 1 and any(len(g) == 4 and _YEAR_RE.fullmatch(g) for g in groups):
+        return None
+    return digits
+
+
+def identity_keys(structured_info: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """(email, phone) normalised for comparison; None where missing or implausible"""
+    return normalize_email(structured_info.get("email")), normalize_phone(structured_info.get("phone"))
@@ -0,0 +1,140 @@
+"""Persistent, append-only store for analysis events.
+
+Events are kept in a local SQLite database (WAL mode, so readers never block
+the writer) with indexes on time, type and session. Analytics queries are
+aggregated in SQL over a time window instead of materialising the full
+history in Python.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_DB_PATH = os.path.join(
+    os.environ.get("CV_ANALYZER_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")),
+    "history.db",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    session_id TEXT,
+    type TEXT NOT NULL,
+    filename TEXT,
+    role TEXT,
+    score REAL,
+    duration_ms REAL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON analysis_events (ts);
+CREATE INDEX IF NOT EXISTS idx_events_type_ts ON analysis_events (type, ts);
+CREATE INDEX IF NOT EXISTS idx_events_session_ts ON analysis_events (session_id, ts);
+"""
+
+
+class HistoryStore:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """
+        Open (or create) the history database
+
+        Args:
+            db_path: Path of the SQLite file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # One connection per thread; Streamlit runs each session on its own thread
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql: str, params=()) -> List[tuple]:
+        conn = self._conn()
+        with conn:
+            return conn.execute(sql, params).fetchall()
+
+    def record(self, event_type: str, filename: str = None, role: str = None,
+               score: float = None, duration_ms: float = None,
+               session_id: str = None, extra: Dict = None, ts: float = None):
+        """Append one analysis event"""
+        self._execute(
+            "INSERT INTO analysis_events (ts, session_id, type, filename, role, score, duration_ms, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (ts if ts is not None else time.time(), session_id, event_type, filename, role,
+             score, duration_ms, json.dumps(extra) if extra else None),
+        )
+
+    @staticmethod
+    def _where(since: float = None, session_id: str = None, event_type: str = None):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if event_type is not None:
+            clauses.append("type = ?")
+            params.append(event_type)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def summary(self, since: float = None, session_id: str = None) -> Dict[str, Dict]:
+        """Per-type event count, average score and average duration"""
+        where, params = self._where(since, session_id)
+        rows = self._execute(
+            "SELECT type, COUNT(*), AVG(score), AVG(duration_ms) FROM analysis_events"
+            f"{where} GROUP BY type",
+            params,
+        )
+        return {
+            row[0]: {"count": row[1], "avg_score": row[2], "avg_duration_ms": row[3]}
+            for row in rows
+        }
+
+    def timeline(self, bucket_seconds: int, since: float = None, session_id: str = None) -> List[Dict]:
+        """Event counts per time bucket and type"""
+        where, params = self._where(since, session_id)
+        rows = self._execute(
+            f"SELECT CAST(ts / ? AS INTEGER) * ? AS bucket, type, COUNT(*), AVG(duration_ms) "
+            f"FROM analysis_events{where} GROUP BY bucket, type ORDER BY bucket",
+            [bucket_seconds, bucket_seconds] + params,
+        )
+        return [
+            {"bucket": row[0], "type": row[1], "count": row[2], "avg_duration_ms": row[3]}
+            for row in rows
+        ]
+
+    def recent(self, limit: int = 10, since: float = None, session_id: str = None) -> List[Dict]:
+        """Most recent events, newest first"""
+        where, params = self._where(since, session_id)
+        rows = self._execute(
+            "SELECT ts, type, filename, role, score, duration_ms FROM analysis_events"
+            f"{where} ORDER BY ts DESC LIMIT ?",
+            params + [limit],
+        )
+        return [
+            {"ts": row[0], "type": row[1], "filename": row[2], "role": row[3],
+             "score": row[4], "duration_ms": row[5]}
+            for row in rows
+        ]
+
+    def count(self, since: float = None, session_id: str = None) -> int:
+        where, params = self._where(since, session_id)
+        return self._execute(f"SELECT COUNT(*) FROM analysis_events{where}", params)[0][0]
+
+    def clear(self, session_id: Optional[str] = None):
+        """Delete events for one session, or all events when session_id is None"""
+        if session_id is None:
+            self._execute("DELETE FROM analysis_events")
+        else:
+            self._execute("DELETE FROM analysis_events WHERE session_id = ?", (session_id,))
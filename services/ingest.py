@@ -0,0 +1,267 @@
+"""Bulk CV ingestion from ZIP/TAR archives and directories.
+
+Job boards export applications as archives. The Ingestor streams their
+members straight from the upload buffer or file: ZIP members are decompressed
+one at a time, TAR archives (plain, gz, bz2, xz) are read in a single forward
+pass, and nothing is extracted to disk. Directories are walked recursively,
+and archives found in them are opened too.
+
+A member is only decompressed beyond its first KiB when that KiB holds the
+%PDF header, whatever its file name says. Members larger than
+CV_INGEST_MAX_FILE_MB are skipped, and byte-identical PDFs are yielded once
+(their other names are kept in duplicates). Because PDFs are yielded while the
+archive is still being read, enqueue_parse_jobs() hands each one to the parse
+workers at once: a large export starts parsing within seconds of the upload.
+
+Usage (queues the parse jobs and prints the dashboard URL of the batch):
+    python -m services.ingest exports/applications.zip cvs/ --job-description jd.txt
+"""
+import argparse
+import io
+import os
+import tarfile
+import uuid
+import zipfile
+import zlib
+from collections import Counter
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Union
+
+from agents import metrics
+from agents.cv_parser_agent import CHUNK_UNITS
+
+from .candidate_store import content_hash
+from .job_queue import DEFAULT_QUEUE_PATH, JobQueue
+
+PDF_MAGIC = b"%PDF-"
+# PDF readers accept the header anywhere in the first KiB
+MAGIC_WINDOW = 1024
+DEFAULT_MAX_FILE_BYTES = int(float(os.environ.get("CV_INGEST_MAX_FILE_MB", "20")) * 1024 * 1024)
+# File name extensions an upload widget should accept (contents are still checked by magic bytes)
+UPLOAD_TYPES = ("pdf", "zip", "tar", "gz", "tgz", "bz2", "tbz2", "xz", "txz")
+
+IngestSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+class IngestedPDF(NamedTuple):
+    name: str  # Path inside the upload, e.g. "applications.zip/jane_doe/cv.pdf"
+    data: bytes
+    content_hash: str
+
+
+def _archive_kind(head: bytes) -> Optional[str]:
+    """"zip", "tar" or None from the first bytes of a file"""
+    if head.startswith((b"PK\x03\x04", b"PK\x05\x06")):
+        # Word and OpenDocument files are ZIP containers too; they are skipped as a whole
+        if b"[Content_Types].xml" in head or b"mimetypeapplication/vnd.oasis" in head:
+            return None
+        return "zip"
+    # gzip, bzip2 and xz streams are opened as (compressed) tar archives
+    if head.startswith((b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")) or head[257:262] == b"ustar":
+        return "tar"
+    return None
+
+
+class Ingestor:
+    def __init__(self, max_file_bytes: int = DEFAULT_MAX_FILE_BYTES):
+        """
+        Streaming PDF extraction from uploads, archives and directories; one instance per batch
+
+        Args:
+            max_file_bytes: Members larger than this are skipped (also guards against decompression bombs)
+        """
+        self.max_file_bytes = max_file_bytes
+        # pdfs, duplicates, not_pdf, too_large, errors
+        self.stats = Counter()
+        self.errors: List[str] = []
+        # content hash -> names of the PDFs skipped as copies of the one yielded under that hash
+        self.duplicates: Dict[str, List[str]] = {}
+        self._seen = set()
+
+    def _count(self, outcome: str, name: str = None, error: Exception = None):
+        self.stats[outcome] += 1
+        metrics.incr("ingested_files", outcome=outcome)
+        if error is not None:
+            self.errors.append(f"{name}: {error}")
+
+    def _accept(self, name: str, head: bytes, stream: BinaryIO) -> Optional[IngestedPDF]:
+        """The PDF whose first bytes are head and rest is in stream, unless it is not a new PDF"""
+        if PDF_MAGIC not in head[:MAGIC_WINDOW]:
+            self._count("not_pdf")
+            return None
+        data = head + stream.read(self.max_file_bytes + 1 - len(head))
+        if len(data) > self.max_file_bytes:
+            self._count("too_large")
+            return None
+        digest = content_hash(data)
+        if digest in self._seen:
+            self.duplicates.setdefault(digest, []).append(name)
+            self._count("duplicates")
+            return None
+        self._seen.add(digest)
+        self._count("pdfs")
+        return IngestedPDF(name, data, digest)
+
+    def iter_pdfs(self, source: IngestSource, name: str = None) -> Iterator[IngestedPDF]:
+        """
+        Yield the PDFs of an upload as they are read
+
+        Args:
+            source: A PDF, ZIP or TAR archive as a path, bytes or seekable binary file object
+                (e.g. a Streamlit upload), or the path of a directory
+            name: Prefix of the yielded names; defaults to the path or the file object's name
+        """
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+            name = name or os.path.basename(os.path.normpath(path))
+            if os.path.isdir(path):
+                yield from self._iter_directory(path, name)
+                return
+            with open(path, "rb") as f:
+                yield from self._iter_file(f, name)
+            return
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        else:
+            # The whole upload, even if something already read from it
+            source.seek(0)
+        yield from self._iter_file(source, name or getattr(source, "name", None) or "upload")
+
+    def _iter_directory(self, path: str, name: str) -> Iterator[IngestedPDF]:
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                member_name = f"{name}/{os.path.relpath(file_path, path)}"
+                try:
+                    with open(file_path, "rb") as f:
+                        yield from self._iter_file(f, member_name)
+                except OSError as e:
+                    self._count("errors", member_name, e)
+
+    def _iter_file(self, f: BinaryIO, name: str) -> Iterator[IngestedPDF]:
+        start = f.tell()
+        head = f.read(MAGIC_WINDOW)
+        kind = _archive_kind(head)
+        if kind is None:
+            pdf = self._accept(name, head, f)
+            if pdf is not None:
+                yield pdf
+            return
+        f.seek(start)
+        try:
+            if kind == "zip":
+                yield from self._iter_zip(f, name)
+            else:
+                yield from self._iter_tar(f, name)
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError, zlib.error) as e:
+            # A corrupt archive keeps the PDFs read before the damage
+            self._count("errors", name, e)
+
+    def _iter_zip(self, f: BinaryIO, name: str) -> Iterator[IngestedPDF]:
+        with zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                member_name = f"{name}/{info.filename}"
+                if info.file_size > self.max_file_bytes:
+                    self._count("too_large")
+                    continue
+                try:
+                    with archive.open(info) as member:
+                        pdf = self._accept(member_name, member.read(MAGIC_WINDOW), member)
+                except (RuntimeError, zipfile.BadZipFile, NotImplementedError, OSError, zlib.error) as e:
+                    # Encrypted members, unsupported compression, CRC errors
+                    self._count("errors", member_name, e)
+                    continue
+                if pdf is not None:
+                    yield pdf
+
+    def _iter_tar(self, f: BinaryIO, name: str) -> Iterator[IngestedPDF]:
+        # "r|*": one forward pass over the (compressed) stream, no seeking back
+        with tarfile.open(fileobj=f, mode="r|*") as archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                if info.size > self.max_file_bytes:
+                    self._count("too_large")
+                    continue
+                member = archive.extractfile(info)
+                pdf = self._accept(f"{name}/{info.name}", member.read(MAGIC_WINDOW), member)
+                if pdf is not None:
+                    yield pdf
+
+    def summary(self) -> str:
+        """One line for the UI, e.g. "120 PDFs, 3 duplicates, 14 other files skipped\""""
+        parts = [f"{self.stats['pdfs']} PDF{'s' if self.stats['pdfs'] != 1 else ''}"]
+        if self.stats["duplicates"]:
+            parts.append(f"{self.stats['duplicates']} duplicate{'s' if self.stats['duplicates'] != 1 else ''}")
+        if self.stats["not_pdf"]:
+            parts.append(f"{self.stats['not_pdf']} other file{'s' if self.stats['not_pdf'] != 1 else ''} skipped")
+        if self.stats["too_large"]:
+            parts.append(f"{self.stats['too_large']} over {self.max_file_bytes / (1024 * 1024):g} MB skipped")
+        if self.stats["errors"]:
+            parts.append(f"{self.stats['errors']} unreadable")
+        return ", ".join(parts)
+
+
+def enqueue_parse_jobs(job_queue: JobQueue, pdfs: Iterator[IngestedPDF], payload: Dict, group_id: str,
+                       session_id: str = None, ingestor: Ingestor = None) -> Dict[str, str]:
+    """
+    Queue a 'parse' job for each PDF as soon as it is read, so workers start while the rest is decompressed
+
+    Args:
+        job_queue: Queue the workers poll
+        pdfs: Ingestor.iter_pdfs output (several uploads can be chained)
+        payload: Job payload shared by the batch (job description, chunk settings, ...); file_name and
+            content_hash are set per PDF
+        group_id: Batch the jobs belong to
+        session_id: Owner of the jobs
+        ingestor: The Ingestor that produced pdfs; its duplicates are recorded as the jobs'
+            duplicate_files once every upload was read
+
+    Returns:
+        Content hash -> job id
+    """
+    jobs = {}
+    for pdf in pdfs:
+        jobs[pdf.content_hash] = job_queue.enqueue(
+            'parse',
+            {**payload, 'file_name': pdf.name, 'content_hash': pdf.content_hash, 'duplicate_files': []},
+            blob=pdf.data,
+            group_id=group_id,
+            session_id=session_id
+        )
+    if ingestor is not None:
+        for digest, names in ingestor.duplicates.items():
+            if digest in jobs:
+                job_queue.update_payload(jobs[digest], duplicate_files=names)
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Queue the PDFs of archives and directories for the parse workers")
+    parser.add_argument("sources", nargs="+", help="PDFs, ZIP/TAR archives or directories")
+    parser.add_argument("--job-description", required=True, help="Text file with the job description")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Path of the job queue database")
+    parser.add_argument("--layout-aware", action="store_true", help="Rebuild reading order of multi-column CVs")
+    parser.add_argument("--chunk-unit", choices=CHUNK_UNITS)
+    parser.add_argument("--dashboard-url", default="http://localhost:8501")
+    args = parser.parse_args(argv)
+
+    from .cascade import CascadeConfig
+
+    with open(args.job_description) as f:
+        job_description = f.read()
+    payload = {'job_description': job_description, 'layout_aware': args.layout_aware,
+               'chunk_unit': args.chunk_unit, 'cascade': vars(CascadeConfig())}
+    ingestor, group_id = Ingestor(), uuid.uuid4().hex
+    pdfs = (pdf for source in args.sources for pdf in ingestor.iter_pdfs(source))
+    enqueue_parse_jobs(JobQueue(args.queue), pdfs, payload, group_id, ingestor=ingestor)
+    print(f"Queued {ingestor.summary()}")
+    for error in ingestor.errors:
+        print(f"  {error}")
+    print(f"Follow the batch at {args.dashboard_url}/?batch={group_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Durable job queue for long-running analyses.
+
+Jobs live in a local SQLite database, so they survive Streamlit reruns,
+browser refreshes and dashboard restarts. Worker processes (services/worker.py)
+claim jobs with a lease; a job whose worker stops heartbeating is handed to
+another worker once the lease expires.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+DEFAULT_QUEUE_PATH = os.path.join(
+    os.environ.get("CV_ANALYZER_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")),
+    "jobs.db",
+)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT,
+    blob BLOB,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    group_id TEXT,
+    session_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_group ON jobs (group_id);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    pid INTEGER,
+    started_at REAL,
+    heartbeat_at REAL
+);
+"""
+
+_JOB_COLUMNS = ("id", "kind", "payload", "status", "priority", "group_id", "session_id", "attempts",
+                "worker", "created_at", "started_at", "heartbeat_at", "finished_at", "result", "error")
+
+
+def _row_to_job(row) -> Dict:
+    job = dict(zip(_JOB_COLUMNS, row))
+    job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class JobQueue:
+    def __init__(self, db_path: str = DEFAULT_QUEUE_PATH, lease_seconds: float = 120, max_attempts: int = 3):
+        """
+        Open (or create) the job queue
+
+        Args:
+            db_path: Path of the SQLite file shared by the dashboard and workers
+            lease_seconds: A running job without a heartbeat for this long is re-queued
+            max_attempts: Jobs are marked failed after this many claims
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are managed explicitly (BEGIN IMMEDIATE in claim)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql: str, params=()) -> List[tuple]:
+        return self._conn().execute(sql, params).fetchall()
+
+    def enqueue(self, kind: str, payload: Dict = None, blob: bytes = None, priority: int = 0,
+                group_id: str = None, session_id: str = None) -> str:
+        """Add a job and return its id"""
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, payload, blob, status, priority, group_id, session_id, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload or {}), blob, QUEUED, priority, group_id, session_id, time.time()),
+        )
+        return job_id
+
+    def update_payload(self, job_id: str, **fields) -> None:
+        """Set fields of a job's payload (fields the worker does not read, such as bookkeeping for the collector)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchall()
+            if rows:
+                payload = {**(json.loads(rows[0][0]) if rows[0][0] else {}), **fields}
+                conn.execute("UPDATE jobs SET payload = ? WHERE id = ?", (json.dumps(payload), job_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, worker_id: str, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        """Atomically take the next runnable job, or return None if the queue is empty"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-queue jobs whose worker stopped heartbeating
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat_at < ?",
+                (QUEUED, RUNNING, now - self.lease_seconds),
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND attempts >= ?",
+                (FAILED, "Exceeded maximum attempts", now, QUEUED, self.max_attempts),
+            )
+            sql = "SELECT id FROM jobs WHERE status = ?"
+            params = [QUEUED]
+            if kinds:
+                sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+                params += list(kinds)
+            sql += " ORDER BY priority DESC, created_at LIMIT 1"
+            row = conn.execute(sql, params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (RUNNING, worker_id, now, now, row[0]),
+            )
+            job_row = conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)}, blob FROM jobs WHERE id = ?", (row[0],)
+            ).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = _row_to_job(job_row[:-1])
+        job["blob"] = job_row[-1]
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease of a running job; False if worker_id no longer owns it (re-queued or cancelled)"""
+        cursor = self._conn().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ? AND worker = ?",
+            (time.time(), job_id, RUNNING, worker_id),
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, worker_id: str, result) -> bool:
+        """
+        Store the job's result; the input blob is dropped since it is no longer needed
+
+        Returns:
+            False if worker_id no longer owns the job, in which case the result is discarded
+        """
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, blob = NULL, finished_at = ? "
+            "WHERE id = ? AND status = ? AND worker = ?",
+            (DONE, json.dumps(result), time.time(), job_id, RUNNING, worker_id),
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Mark the job failed; False if worker_id no longer owns it"""
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = ?, error = ?, blob = NULL, finished_at = ? "
+            "WHERE id = ? AND status = ? AND worker = ?",
+            (FAILED, error, time.time(), job_id, RUNNING, worker_id),
+        )
+        return cursor.rowcount > 0
+
+    def cancel(self, job_id: str = None, group_id: str = None) -> None:
+        """Cancel queued jobs by id or group; running jobs finish but their results are ignored"""
+        if job_id:
+            self._execute("UPDATE jobs SET status = ?, blob = NULL, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                          (CANCELLED, time.time(), job_id, QUEUED, RUNNING))
+        if group_id:
+            self._execute("UPDATE jobs SET status = ?, blob = NULL, finished_at = ? WHERE group_id = ? AND status IN (?, ?)",
+                          (CANCELLED, time.time(), group_id, QUEUED, RUNNING))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        rows = self._execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,))
+        return _row_to_job(rows[0]) if rows else None
+
+    def group(self, group_id: str) -> List[Dict]:
+        """All jobs of a group in submission order"""
+        rows = self._execute(
+            f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE group_id = ? ORDER BY created_at", (group_id,)
+        )
+        return [_row_to_job(row) for row in rows]
+
+    def group_progress(self, group_id: str) -> Dict[str, int]:
+        """Job counts per status for a group"""
+        rows = self._execute("SELECT status, COUNT(*) FROM jobs WHERE group_id = ? GROUP BY status", (group_id,))
+        return dict(rows)
+
+    def depth(self) -> Dict[str, int]:
+        """Job counts per status across the whole queue"""
+        return dict(self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def purge(self, older_than_seconds: float = 7 * 86400) -> None:
+        """Delete finished jobs older than the given age"""
+        self._execute(
+            f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATES))}) AND finished_at < ?",
+            list(FINISHED_STATES) + [time.time() - older_than_seconds],
+        )
+
+    def register_worker(self, worker_id: str) -> None:
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO workers (id, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?)",
+            (worker_id, os.getpid(), now, now),
+        )
+
+    def worker_heartbeat(self, worker_id: str) -> None:
+        self._execute("UPDATE workers SET heartbeat_at = ? WHERE id = ?", (time.time(), worker_id))
+
+    def unregister_worker(self, worker_id: str) -> None:
+        self._execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def live_workers(self, max_age_seconds: float = 30) -> int:
+        """Number of workers that heartbeated recently"""
+        return self._execute("SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?",
+                             (time.time() - max_age_seconds,))[0][0]
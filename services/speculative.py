@@ -0,0 +1,197 @@
+"""Speculative precomputation of the work an upload will most likely need.
+
+When a CV is uploaded it will almost certainly be parsed and embedded, and
+often sent to one LLM analysis. The dashboard starts that work as soon as the
+upload lands: a pipeline of stages (e.g. parse -> embed chunks -> feedback)
+runs on a small thread pool shared by all sessions, each stage writing to the
+usual shared caches (parse cache, vector store) and leaving its result
+claimable under a key.
+
+When the user then asks for the result, claim() returns it at once if the
+stage finished, waits if it is running, and cancels it if it has not started
+yet (the caller then does the work itself, as without speculation). Stages
+belong to owners (session ids): an owner that moves on to another upload, or
+stops interacting for idle_timeout seconds, loses its stages, and pending
+stages nobody owns are cancelled. A running stage cannot be interrupted, but
+the pipeline stops before the next one. Unclaimed results expire after
+result_ttl seconds; failed stages are forgotten at the next sweep. Speculative model calls run at batch priority
+(agents/scheduler.py).
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from agents import metrics
+from agents.scheduler import scheduling
+
+DEFAULT_WORKERS = int(os.environ.get("CV_SPECULATIVE_WORKERS", "1"))
+DEFAULT_IDLE_TIMEOUT = float(os.environ.get("CV_SPECULATIVE_IDLE_TIMEOUT", "300"))
+DEFAULT_RESULT_TTL = float(os.environ.get("CV_SPECULATIVE_TTL", "1800"))
+
+
+class _Stage:
+    __slots__ = ("name", "future", "owners", "finished_at", "claimed")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.future = Future()
+        self.owners = set()
+        self.finished_at = None
+        self.claimed = False
+
+
+def _failed(future: Future) -> bool:
+    return future.done() and not future.cancelled() and future.exception() is not None
+
+
+class Speculator:
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 result_ttl: float = DEFAULT_RESULT_TTL):
+        """
+        Shared runner for speculative work
+
+        Args:
+            max_workers: Pipelines run at once; kept small so speculation never crowds out requested work
+            idle_timeout: Seconds without touch() after which an owner's pending stages are cancelled
+            result_ttl: Seconds a finished, unclaimed result is kept
+        """
+        self.idle_timeout = idle_timeout
+        self.result_ttl = result_ttl
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="speculative")
+        self._stages: Dict[str, _Stage] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, owner: str) -> None:
+        """Record that owner is still active"""
+        with self._lock:
+            self._last_seen[owner] = time.monotonic()
+
+    def start(self, owner: str, stages: Sequence[Tuple[str, str, Callable[[Any], Any]]], initial: Any = None) -> None:
+        """
+        Run stages in order on behalf of owner; stages already running or done are reused
+
+        Args:
+            owner: Session id the results are for
+            stages: (key, name, fn) triples; fn receives the previous stage's result (initial for the
+                first) and its return value is claimable under key. name labels the metrics
+            initial: Input of the first stage (e.g. a CV that was already parsed)
+        """
+        entries, new = [], False
+        with self._lock:
+            self._last_seen[owner] = time.monotonic()
+            for key, name, fn in stages:
+                stage = self._stages.get(key)
+                if stage is None or stage.future.cancelled() or _failed(stage.future):
+                    stage = self._stages[key] = _Stage(name)
+                    new = True
+                stage.owners.add(owner)
+                entries.append((stage, fn))
+        if new:
+            metrics.incr("speculative_started")
+            self._pool.submit(self._run, owner, entries, initial)
+
+    def _run(self, owner, entries, previous):
+        # Nobody is waiting for this yet: batch priority, so requested work is served first
+        with scheduling("batch", owner):
+            self._run_stages(entries, previous)
+
+    def _run_stages(self, entries, previous):
+        for i, (stage, fn) in enumerate(entries):
+            self.sweep()
+            future = stage.future
+            with self._lock:
+                # Pipelines sharing a stage (e.g. the parse of one upload) run it once
+                shared = future.running() or future.done()
+                if not shared and not future.set_running_or_notify_cancel():
+                    break
+            if shared:
+                try:
+                    previous = future.result()
+                    continue
+                except Exception:
+                    break
+            started = time.perf_counter()
+            try:
+                previous = fn(previous)
+            except Exception as e:
+                metrics.incr("speculative_errors", stage=stage.name)
+                stage.finished_at = time.monotonic()
+                future.set_exception(e)
+                break
+            metrics.observe("speculative", time.perf_counter() - started, stage=stage.name)
+            stage.finished_at = time.monotonic()
+            future.set_result(previous)
+        else:
+            return
+        # Later stages depend on the one that stopped the pipeline
+        for stage, _ in entries[i + 1:]:
+            if stage.future.cancel():
+                metrics.incr("speculative_cancelled", stage=stage.name)
+
+    def claim(self, key: str, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Result of a speculative stage, or None when the caller should do the work itself
+
+        Waits for a running stage (up to timeout seconds) and cancels one that has not started
+        """
+        with self._lock:
+            stage = self._stages.get(key)
+        if stage is None:
+            return None
+        if not (stage.future.running() or stage.future.done()):
+            if stage.future.cancel():
+                metrics.incr("speculative_cancelled", stage=stage.name)
+            return None
+        try:
+            result = stage.future.result(timeout)
+        except Exception:
+            return None
+        if not stage.claimed:
+            stage.claimed = True
+            metrics.incr("speculative_hits", stage=stage.name)
+        return result
+
+    def cancel(self, owner: str, keys: Optional[Iterable[str]] = None) -> None:
+        """Drop owner's interest in the given stages (default: all); pending stages nobody else wants are cancelled"""
+        keys = None if keys is None else set(keys)
+        with self._lock:
+            for key, stage in self._stages.items():
+                if (keys is not None and key not in keys) or owner not in stage.owners:
+                    continue
+                stage.owners.discard(owner)
+                if not stage.owners and stage.future.cancel():
+                    metrics.incr("speculative_cancelled", stage=stage.name)
+
+    def sweep(self) -> None:
+        """Cancel the stages of idle owners and forget cancelled and failed stages and expired results"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [owner for owner, seen in self._last_seen.items() if now - seen > self.idle_timeout]
+        for owner in idle:
+            self.cancel(owner)
+            with self._lock:
+                self._last_seen.pop(owner, None)
+        with self._lock:
+            # A failed stage holds no result (claim() returns None), only its exception and traceback
+            for key in [key for key, stage in self._stages.items()
+                        if stage.future.cancelled() or _failed(stage.future)
+                        or (stage.finished_at and now - stage.finished_at > self.result_ttl)]:
+                stage = self._stages.pop(key)
+                if stage.finished_at and not stage.claimed and not _failed(stage.future):
+                    metrics.incr("speculative_unclaimed", stage=stage.name)
+
+    def status(self, key: str) -> Optional[str]:
+        """"pending", "running", "done", "failed", "cancelled" or None for an unknown key"""
+        with self._lock:
+            stage = self._stages.get(key)
+        if stage is None:
+            return None
+        future = stage.future
+        if future.cancelled():
+            return "cancelled"
+        if future.done():
+            return "failed" if future.exception() is not None else "done"
+        return "running" if future.running() else "pending"
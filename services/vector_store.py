@@ -0,0 +1,295 @@
+"""Compact, persistent storage for CV chunk embeddings.
+
+Vectors are L2-normalised and stored quantized, so cosine similarity is a dot
+product computed directly on the stored form:
+
+- "int8": each vector is scaled so its largest component maps to 127 and the
+  per-vector scale is kept (1 byte per dimension + 4 bytes per vector)
+- "float16": half-precision copy (2 bytes per dimension)
+
+At 768 dimensions a talent pool of 100k CVs with ~10 chunks each takes about
+740 MB as int8 (1.5 GB as float16). The arrays live in .npy files that are
+memory-mapped, so only the pages being scored need to be resident. Row
+allocation and the key -> rows index live in SQLite, so the dashboard and
+worker processes can append to the same store.
+
+Growing the store copies the arrays into a new file generation. The previous
+generation is kept until the next grow, so a reader that has just read the
+generation number can still map its files; readers that lose that race anyway
+(another process grew twice) re-read the generation and retry.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .candidate_store import overall_rating
+
+DEFAULT_STORE_DIR = os.path.join(
+    os.environ.get("CV_ANALYZER_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")),
+    "vectors",
+)
+DEFAULT_DTYPE = os.environ.get("CV_VECTOR_DTYPE", "int8")
+DTYPES = {"int8": np.int8, "float16": np.float16}
+# Rows dequantized at a time while scoring; small enough (12 MB of float32 at 768 dims) to stay in cache
+SCORE_BLOCK_ROWS = 4096
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value
+);
+CREATE TABLE IF NOT EXISTS documents (
+    key TEXT PRIMARY KEY,
+    first_row INTEGER NOT NULL,
+    num_rows INTEGER NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_rows ON documents (first_row);
+"""
+
+
+def quantize(vectors, dtype: str = DEFAULT_DTYPE) -> Tuple[np.ndarray, np.ndarray]:
+    """L2-normalise vectors (n, dim) and return (codes, per-vector float32 scales)"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    unit = vectors / norms
+    if dtype == "float16":
+        return unit.astype(np.float16), np.ones(len(unit), dtype=np.float32)
+    scales = np.abs(unit).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    codes = np.rint(unit / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * scales[:, None]
+
+
+class VectorStore:
+    def __init__(self, path: str = DEFAULT_STORE_DIR, dtype: str = DEFAULT_DTYPE, initial_capacity: int = 1024):
+        """
+        Open (or create) a vector store directory
+
+        Args:
+            path: Directory holding index.db and the memory-mapped arrays
+            dtype: "int8" or "float16"; ignored when the store already exists
+            initial_capacity: Rows allocated when the first vectors are added
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {sorted(DTYPES)}")
+        self.path = path
+        self.initial_capacity = initial_capacity
+        os.makedirs(path, exist_ok=True)
+        self._local = threading.local()
+        # Guards the mapped arrays and the document index; re-entrant because add() maps arrays while growing
+        self._lock = threading.RLock()
+        self._mapped = None  # (generation, codes, scales)
+        self._doc_index = ([], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('dtype', ?)", (dtype,))
+        self.dtype = self._meta()["dtype"]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are managed explicitly (BEGIN IMMEDIATE in add)
+            conn = sqlite3.connect(os.path.join(self.path, "index.db"), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _meta(self, conn=None) -> Dict:
+        meta = dict((conn or self._conn()).execute("SELECT name, value FROM meta").fetchall())
+        meta.setdefault("rows", 0)
+        meta.setdefault("generation", 0)
+        return meta
+
+    def _files(self, generation: int) -> Tuple[str, str]:
+        return (os.path.join(self.path, f"codes-{generation}.npy"),
+                os.path.join(self.path, f"scales-{generation}.npy"))
+
+    def _arrays(self, generation: int):
+        """Memory-mapped (codes, scales) of the given file generation"""
+        with self._lock:
+            if self._mapped is None or self._mapped[0] != generation:
+                codes_path, scales_path = self._files(generation)
+                self._mapped = (generation, np.load(codes_path, mmap_mode="r+"), np.load(scales_path, mmap_mode="r+"))
+            return self._mapped[1], self._mapped[2]
+
+    def _grow(self, meta: Dict, dim: int, needed: int) -> Dict:
+        """Copy the arrays into files with room for `needed` rows; called inside the write transaction"""
+        capacity = max(self.initial_capacity, 2 * meta.get("capacity", 0), needed)
+        generation = meta["generation"] + 1
+        codes_path, scales_path = self._files(generation)
+        codes = np.lib.format.open_memmap(codes_path, mode="w+", dtype=DTYPES[self.dtype], shape=(capacity, dim))
+        scales = np.lib.format.open_memmap(scales_path, mode="w+", dtype=np.float32, shape=(capacity,))
+        if meta["rows"]:
+            old_codes, old_scales = self._arrays(meta["generation"])
+            codes[:meta["rows"]] = old_codes[:meta["rows"]]
+            scales[:meta["rows"]] = old_scales[:meta["rows"]]
+        codes.flush()
+        scales.flush()
+        return {**meta, "capacity": capacity, "generation": generation, "dim": dim}
+
+    def _snapshot(self) -> Tuple[Dict, Optional[np.ndarray], Optional[np.ndarray]]:
+        """Meta and the (codes, scales) arrays of its generation, or None arrays while the store is empty"""
+        while True:
+            with self._lock:
+                meta = self._meta()
+                if not meta["rows"]:
+                    return meta, None, None
+                try:
+                    codes, scales = self._arrays(meta["generation"])
+                    return meta, codes, scales
+                except FileNotFoundError:
+                    # Another process grew the store twice since meta was read; its generation is newer now
+                    continue
+
+    def _remove_generation(self, generation: int):
+        # POSIX keeps unlinked files valid for readers that already mapped them
+        with self._lock:
+            for path in self._files(generation):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def add(self, key: str, vectors) -> bool:
+        """Store the vectors of one document under key; returns False if the key is already stored"""
+        codes, scales = quantize(vectors, self.dtype)
+        if not len(codes):
+            raise ValueError("Cannot store a document without vectors")
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM documents WHERE key = ?", (key,)).fetchone():
+                conn.execute("COMMIT")
+                return False
+            meta = self._meta(conn)
+            dim = meta.get("dim", codes.shape[1])
+            if codes.shape[1] != dim:
+                raise ValueError(f"Expected {dim}-dimensional vectors, got {codes.shape[1]}")
+            first_row, old_generation = meta["rows"], meta["generation"]
+            if first_row + len(codes) > meta.get("capacity", 0):
+                meta = self._grow(meta, dim, first_row + len(codes))
+            stored_codes, stored_scales = self._arrays(meta["generation"])
+            stored_codes[first_row:first_row + len(codes)] = codes
+            stored_scales[first_row:first_row + len(codes)] = scales
+            stored_codes.flush()
+            stored_scales.flush()
+            meta["rows"] = first_row + len(codes)
+            conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                             [(name, meta[name]) for name in ("rows", "capacity", "generation", "dim")])
+            conn.execute("INSERT INTO documents (key, first_row, num_rows, added_at) VALUES (?, ?, ?, ?)",
+                         (key, first_row, len(codes), time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if old_generation > 1 and old_generation != meta["generation"]:
+            # Keep old_generation for readers that read its number before this commit; drop the one before it
+            self._remove_generation(old_generation - 1)
+        return True
+
+    def _rows_of(self, key: str) -> Optional[Tuple[int, int]]:
+        return self._conn().execute("SELECT first_row, num_rows FROM documents WHERE key = ?", (key,)).fetchone()
+
+    def __contains__(self, key: str) -> bool:
+        return self._rows_of(key) is not None
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    @property
+    def num_vectors(self) -> int:
+        return self._meta()["rows"]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of stored vectors and scales (the mapped files may hold spare capacity)"""
+        meta = self._meta()
+        return meta["rows"] * (meta.get("dim", 0) * np.dtype(DTYPES[self.dtype]).itemsize + 4)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Dequantized unit vectors of a document, or None if it is not stored"""
+        rows = self._rows_of(key)
+        if rows is None:
+            return None
+        _, codes, scales = self._snapshot()
+        first_row, num_rows = rows
+        return dequantize(codes[first_row:first_row + num_rows], scales[first_row:first_row + num_rows])
+
+    def _score_rows(self, query: np.ndarray, codes, scales, start: int, stop: int) -> np.ndarray:
+        scores = np.empty(stop - start, dtype=np.float32)
+        for block in range(start, stop, SCORE_BLOCK_ROWS):
+            end = min(block + SCORE_BLOCK_ROWS, stop)
+            scores[block - start:end - start] = codes[block:end].astype(np.float32) @ query
+        if self.dtype == "int8":
+            scores *= scales[start:stop]
+        return scores
+
+    @staticmethod
+    def _unit(query) -> np.ndarray:
+        query = np.asarray(query, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def scores(self, key: str, query) -> Optional[np.ndarray]:
+        """Cosine similarity of query against each stored vector of a document"""
+        rows = self._rows_of(key)
+        if rows is None:
+            return None
+        _, codes, scales = self._snapshot()
+        return self._score_rows(self._unit(query), codes, scales, rows[0], rows[0] + rows[1])
+
+    def _documents(self, rows: int):
+        """(keys, first rows, row counts) of every document below `rows`, refreshed incrementally"""
+        with self._lock:
+            keys, starts, counts = self._doc_index
+            known = int(starts[-1] + counts[-1]) if len(starts) else 0
+            if known < rows:
+                new = self._conn().execute(
+                    "SELECT key, first_row, num_rows FROM documents WHERE first_row >= ? AND first_row < ? "
+                    "ORDER BY first_row", (known, rows)).fetchall()
+                keys = keys + [row[0] for row in new]
+                starts = np.concatenate([starts, np.array([row[1] for row in new], dtype=np.int64)])
+                counts = np.concatenate([counts, np.array([row[2] for row in new], dtype=np.int64)])
+                self._doc_index = (keys, starts, counts)
+        # Another thread may have extended the index past the rows this caller read
+        end = int(np.searchsorted(starts, rows))
+        if end < len(starts):
+            return keys[:end], starts[:end], counts[:end]
+        return keys, starts, counts
+
+    def top_documents(self, query, k: int = 10) -> List[Dict]:
+        """
+        Rank every stored document against query in one pass over the quantized vectors
+
+        Returns:
+            Up to k dicts with key, max_score, avg_score and overall_rating, best first
+        """
+        meta, codes, scales = self._snapshot()
+        if not meta["rows"]:
+            return []
+        keys, starts, counts = self._documents(meta["rows"])
+        scores = self._score_rows(self._unit(query), codes, scales, 0, meta["rows"])
+        max_scores = np.maximum.reduceat(scores, starts)
+        avg_scores = np.add.reduceat(scores, starts) / counts
+        ratings = overall_rating(max_scores, avg_scores)
+        k = min(k, len(keys))
+        best = np.argpartition(-ratings, k - 1)[:k]
+        best = best[np.argsort(-ratings[best], kind="stable")]
+        return [{"key": keys[i], "max_score": float(max_scores[i]), "avg_score": float(avg_scores[i]),
+                 "overall_rating": float(ratings[i])} for i in best]
+
+
+def open_model_store(model_name: str, root: str = DEFAULT_STORE_DIR, dtype: str = DEFAULT_DTYPE) -> VectorStore:
+    """Store for one embedding model; models differ in dimension, so each gets its own directory"""
+    return VectorStore(os.path.join(root, model_name.replace(":", "_").replace("/", "_")), dtype)
@@ -0,0 +1,210 @@
+"""Worker processes that execute jobs from the durable job queue.
+
+Each process claims one job at a time, runs it with its own agent instances
+and stores the JSON result back in the queue. Agents are created lazily per
+job kind, so a worker that only parses CVs never loads the LLM clients.
+
+Usage:
+    python -m services.worker --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+from agents.scheduler import scheduling
+
+from .job_queue import DEFAULT_QUEUE_PATH, JobQueue
+
+
+class _LazyAgents:
+    """Create each agent on first use"""
+
+    _FACTORIES = {
+        "cv_parser": "CVParserAgent",
+        "jd_matcher": "JDMatcherAgent",
+        "feedback_agent": "FeedbackAgent",
+        "summary_agent": "SummaryAgent",
+    }
+
+    def __init__(self):
+        self._agents = {}
+
+    def __getitem__(self, name):
+        if name not in self._agents:
+            import agents
+
+            if name == "jd_matcher":
+                from .vector_store import open_model_store
+
+                matcher = agents.JDMatcherAgent()
+                matcher.vector_store = open_model_store(matcher.model_name)
+                self._agents[name] = matcher
+            else:
+                self._agents[name] = getattr(agents, self._FACTORIES[name])()
+        return self._agents[name]
+
+
+def _parse_blob(agents, payload, blob):
+    return agents["cv_parser"].parse_cv(blob, chunk_size=payload.get("chunk_size"),
+                                        chunk_overlap=payload.get("chunk_overlap"),
+                                        layout_aware=bool(payload.get("layout_aware")),
+                                        chunk_unit=payload.get("chunk_unit"))
+
+
+def handle_parse(agents, payload, blob, check_owned):
+    return {"parsed": _parse_blob(agents, payload, blob)}
+
+
+def handle_match(agents, payload, blob, check_owned):
+    return {"match": agents["jd_matcher"].match(payload["chunks"], payload["job_description"],
+                                                payload.get("chunk_terms"), payload.get("match_mode"))}
+
+
+def handle_parse_match(agents, payload, blob, check_owned):
+    parsed = _parse_blob(agents, payload, blob)
+    # Don't start matching for a job that was re-queued or cancelled while parsing
+    check_owned()
+    match = agents["jd_matcher"].match(parsed["chunks"], payload["job_description"], parsed.get("chunk_terms"),
+                                       payload.get("match_mode"))
+    return {"parsed": parsed, "match": match}
+
+
+def handle_feedback(agents, payload, blob, check_owned):
+    feedback_agent = agents["feedback_agent"]
+    analysis = payload.get("analysis", "improvements")
+    if analysis == "ats":
+        text = feedback_agent.check_ats_score(payload["cv_text"], payload.get("target_role"), payload.get("job_description"),
+                                              payload.get("keyword_report"))
+    elif analysis == "skills":
+        text = feedback_agent.analyze_skills(payload["cv_text"], payload.get("target_role"), payload.get("job_description"))
+    else:
+        text = feedback_agent.suggest_improvements(payload["cv_text"], payload.get("target_role"),
+                                                   payload.get("depth", "detailed"), payload.get("chunks"),
+                                                   payload.get("chunk_terms"))
+    return {"text": text}
+
+
+def handle_summary(agents, payload, blob, check_owned):
+    return {"text": agents["summary_agent"].generate_summary(payload["cv_text"])}
+
+
+HANDLERS = {
+    "parse": handle_parse,
+    "match": handle_match,
+    "parse_match": handle_parse_match,
+    "feedback": handle_feedback,
+    "summary": handle_summary,
+}
+
+
+def _heartbeat_loop(queue_path, worker_id, current, stop, interval):
+    queue = JobQueue(queue_path)
+    while not stop.wait(interval):
+        queue.worker_heartbeat(worker_id)
+        job_id = current.get("job_id")
+        if job_id and not queue.heartbeat(job_id, worker_id):
+            # The lease expired and another worker claimed the job, or it was cancelled: stop working for it
+            current["lost"] = job_id
+
+
+class JobLost(Exception):
+    """The running job is no longer owned by this worker"""
+
+
+def _check_owned(current):
+    if "lost" in current and current["lost"] == current.get("job_id"):
+        raise JobLost(current["job_id"])
+
+
+def run_worker(queue_path: str = DEFAULT_QUEUE_PATH, poll_interval: float = 0.5,
+               heartbeat_interval: float = 10, max_jobs: int = None):
+    """Claim and run jobs until interrupted (or until max_jobs have been processed)"""
+    queue = JobQueue(queue_path)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    queue.register_worker(worker_id)
+
+    agents = _LazyAgents()
+    current = {}
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    heartbeat = threading.Thread(
+        target=_heartbeat_loop, args=(queue_path, worker_id, current, stop, heartbeat_interval), daemon=True
+    )
+    heartbeat.start()
+
+    processed = 0
+    try:
+        while not stop.is_set() and (max_jobs is None or processed < max_jobs):
+            job = queue.claim(worker_id, kinds=list(HANDLERS))
+            if job is None:
+                stop.wait(poll_interval)
+                continue
+            current["job_id"] = job["id"]
+            try:
+                # Queued work is batch work; jobs of different sessions share this process's slots fairly
+                with scheduling("batch", job["session_id"]):
+                    result = HANDLERS[job["kind"]](agents, job["payload"], job["blob"],
+                                                   lambda: _check_owned(current))
+                _check_owned(current)
+                queue.complete(job["id"], worker_id, result)
+            except JobLost:
+                # Another worker (or nobody, if cancelled) owns the job now; its outcome is not ours to record
+                pass
+            except Exception as e:
+                queue.fail(job["id"], worker_id, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=3)}")
+            finally:
+                current.pop("job_id", None)
+                current.pop("lost", None)
+                processed += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        queue.unregister_worker(worker_id)
+
+
+def run_pool(processes: int, queue_path: str = DEFAULT_QUEUE_PATH, poll_interval: float = 0.5):
+    """Run several worker processes on this host until interrupted"""
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=run_worker, args=(queue_path, poll_interval), daemon=False)
+        for _ in range(processes)
+    ]
+    for proc in workers:
+        proc.start()
+
+    def _terminate(*_):
+        for proc in workers:
+            if proc.is_alive():
+                proc.terminate()
+
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        while any(proc.is_alive() for proc in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        _terminate()
+    for proc in workers:
+        proc.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run job-queue worker processes")
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Path of the job queue database")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    args = parser.parse_args(argv)
+    if args.processes == 1:
+        run_worker(args.queue, args.poll_interval)
+    else:
+        run_pool(args.processes, args.queue, args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
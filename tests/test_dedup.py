@@ -0,0 +1,74 @@
+"""Identity keys and MinHash near-duplicate detection (services/dedup.py, CandidateStore.find_duplicate)."""
+import numpy as np
+import pytest
+
+from services.candidate_store import CandidateStore
+from services.dedup import normalize_phone, similarities, text_signature
+
+CV_TEXT = (
+    "Jane Doe Senior Backend Engineer. Eight years building Python services with Django and FastAPI, "
+    "PostgreSQL and Redis on AWS. Led the migration of a monolith to Kubernetes, cut deployment time by half "
+    "and mentored four engineers. Education: MSc Computer Science, University of Leeds."
+)
+OTHER_TEXT = (
+    "John Smith Marketing Manager. Ran brand campaigns for consumer electronics across Europe, managed a "
+    "budget of two million euros and grew the newsletter audience threefold. Fluent in French and German."
+)
+
+
+@pytest.mark.parametrize("text", [
+    "2019 2020 2021",
+    "2012 2016 2019",
+    "2012-2016 2019",
+    "1998 2004 2010 2015",
+    "555-2019-1234",
+    "12345",
+    "1234567890123456",
+    None,
+    "",
+])
+def test_years_and_implausible_numbers_are_not_phone_keys(text):
+    assert normalize_phone(text) is None
+
+
+@pytest.mark.parametrize("text, digits", [
+    ("+1-234-567-8900", "12345678900"),
+    ("+44 20 7946 0958", "442079460958"),
+    ("(555) 2019 1234", "55520191234"),
+    ("555.123.4567", "5551234567"),
+    ("07911 123456", "07911123456"),
+])
+def test_formatted_phone_numbers_are_normalised(text, digits):
+    assert normalize_phone(text) == digits
+
+
+def test_signature_similarity_separates_edited_copies_from_other_cvs():
+    edited = CV_TEXT.replace("cut deployment time by half", "halved deployment time")
+    original = text_signature(CV_TEXT)
+    signatures = [text_signature(edited), text_signature(OTHER_TEXT)]
+    same, other = similarities(original, np.stack(signatures))
+    assert same >= 0.6
+    assert other < 0.1
+    assert text_signature("") is None
+
+
+def _add(store, file_name, text, **info):
+    store.add(file_name, {"text": text, "structured_info": {"name": file_name, **info}},
+              {"max_score": 0.5, "avg_score": 0.4}, signature=text_signature(text))
+
+
+def test_find_duplicate_by_text_email_and_phone():
+    store = CandidateStore()
+    _add(store, "jane.pdf", CV_TEXT, email="Jane@Example.com", phone="+44 20 7946 0958")
+
+    edited = CV_TEXT.replace("Leeds", "Leeds, 2015")
+    assert store.find_duplicate(text_signature(edited), {}) == 0
+    assert store.find_duplicate(text_signature(OTHER_TEXT), {"email": " jane@example.com "}) == 0
+    assert store.find_duplicate(text_signature(OTHER_TEXT), {"phone": "+44 (20) 7946-0958"}) == 0
+    assert store.find_duplicate(text_signature(OTHER_TEXT), {"email": "john@example.com"}) is None
+
+
+def test_year_runs_do_not_merge_different_candidates():
+    store = CandidateStore()
+    _add(store, "jane.pdf", CV_TEXT, phone="2019 2020 2021")
+    assert store.find_duplicate(text_signature(OTHER_TEXT), {"phone": "2019 2020 2021"}) is None
@@ -0,0 +1,123 @@
+"""Lease, retry and ownership rules of the durable job queue (services/job_queue.py)."""
+import threading
+import time
+
+import pytest
+
+from services.job_queue import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobQueue
+from services.worker import JobLost, _check_owned, _heartbeat_loop
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"), lease_seconds=30, max_attempts=2)
+
+
+def expire_lease(queue, job_id):
+    """Backdate the job's heartbeat past the lease instead of sleeping through it"""
+    queue._execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 10 * queue.lease_seconds, job_id))
+
+
+def test_claim_takes_highest_priority_then_oldest(queue):
+    low = queue.enqueue("parse", {"n": 1})
+    high = queue.enqueue("parse", {"n": 2}, priority=5)
+    assert queue.claim("w1")["id"] == high
+    assert queue.claim("w1")["id"] == low
+    assert queue.claim("w1") is None
+
+
+def test_claim_filters_by_kind(queue):
+    queue.enqueue("summary")
+    assert queue.claim("w1", kinds=["parse"]) is None
+    assert queue.claim("w1", kinds=["summary"])["kind"] == "summary"
+
+
+def test_expired_lease_is_requeued_for_another_worker(queue):
+    job_id = queue.enqueue("parse", blob=b"%PDF-")
+    assert queue.claim("w1")["id"] == job_id
+    assert queue.claim("w2") is None  # lease still valid
+
+    expire_lease(queue, job_id)
+    job = queue.claim("w2")
+    assert job["id"] == job_id
+    assert job["worker"] == "w2"
+    assert job["attempts"] == 2
+    assert job["blob"] == b"%PDF-"
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    job_id = queue.enqueue("parse")
+    queue.claim("w1")
+    expire_lease(queue, job_id)
+    assert queue.heartbeat(job_id, "w1")
+    assert queue.claim("w2") is None
+
+
+def test_job_fails_after_max_attempts(queue):
+    job_id = queue.enqueue("parse")
+    for worker in ("w1", "w2"):
+        assert queue.claim(worker)["id"] == job_id
+        expire_lease(queue, job_id)
+    assert queue.claim("w3") is None
+    job = queue.get(job_id)
+    assert job["status"] == FAILED
+    assert job["error"] == "Exceeded maximum attempts"
+
+
+def test_stale_worker_cannot_heartbeat_complete_or_fail(queue):
+    job_id = queue.enqueue("parse")
+    queue.claim("w1")
+    expire_lease(queue, job_id)
+    queue.claim("w2")
+
+    assert not queue.heartbeat(job_id, "w1")
+    assert not queue.complete(job_id, "w1", {"from": "w1"})
+    assert not queue.fail(job_id, "w1", "boom")
+    assert queue.get(job_id)["status"] == RUNNING
+
+    assert queue.complete(job_id, "w2", {"from": "w2"})
+    job = queue.get(job_id)
+    assert job["status"] == DONE
+    assert job["result"] == {"from": "w2"}
+
+
+def test_cancelled_job_rejects_its_worker(queue):
+    job_id = queue.enqueue("parse")
+    queue.claim("w1")
+    queue.cancel(job_id)
+    assert not queue.heartbeat(job_id, "w1")
+    assert not queue.complete(job_id, "w1", {})
+    assert queue.get(job_id)["status"] == CANCELLED
+
+
+def test_group_progress(queue):
+    queue.enqueue("parse", {"file_name": "a.pdf"}, group_id="g")
+    queue.enqueue("parse", {"file_name": "b.pdf"}, group_id="g")
+    queue.enqueue("parse", {"file_name": "c.pdf"}, group_id="other")
+    assert queue.group_progress("g") == {QUEUED: 2}
+
+
+def test_update_payload_merges_fields(queue):
+    job_id = queue.enqueue("parse", {"file_name": "a.pdf"})
+    queue.update_payload(job_id, duplicate_files=["a_copy.pdf"])
+    assert queue.get(job_id)["payload"] == {"file_name": "a.pdf", "duplicate_files": ["a_copy.pdf"]}
+
+
+def test_worker_heartbeat_marks_a_reclaimed_job_lost(queue):
+    job_id = queue.enqueue("parse")
+    queue.claim("w1")
+    expire_lease(queue, job_id)
+    queue.claim("w2")
+
+    current, stop = {"job_id": job_id}, threading.Event()
+    thread = threading.Thread(target=_heartbeat_loop, args=(queue.db_path, "w1", current, stop, 0.01))
+    thread.start()
+    try:
+        deadline = time.time() + 5
+        while "lost" not in current and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        thread.join()
+    with pytest.raises(JobLost):
+        _check_owned(current)